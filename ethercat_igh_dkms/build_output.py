@@ -0,0 +1,299 @@
+import os
+import re
+import json
+import time
+import codecs
+import threading
+
+from .typecheck import typechecked
+from typing import Optional
+
+
+# Output of the commands run by exec_cmd, kept apart from the log: the raw
+# output goes to one file per process and each command gets a line in
+# index.jsonl with its step, its segments (offset, length) in the raw file,
+# its exit code and the compiler diagnostics found in its output. A command
+# without exit code either timed out ("timed_out") or could not be run
+# ("error", e.g. missing executable).
+
+build_output_dir_suffix = ".build_output"
+# Step of the commands run outside of any install step or phase
+outside_step_name = "main"
+build_output_index_name = "index.jsonl"
+max_diagnostics_per_command = 1000
+
+# gcc/clang: «file:line[:column]: severity: message»
+compiler_diagnostic_reg = re.compile(
+    r"^(?P<file>[^\s:][^:]*):(?P<line>[0-9]+):(?:(?P<column>[0-9]+):)?\s+(?P<severity>fatal error|error|warning):\s+(?P<message>.*)$")
+# make: «make[2]: *** [Makefile:12: all] Error 2»
+make_error_reg = re.compile(
+    r"^make(?:\[[0-9]+\])?: \*\*\* (?P<message>.*)$")
+# Kernel module post processing: «ERROR: modpost: "sym" [mod.ko] undefined!»
+modpost_error_reg = re.compile(r"^ERROR: modpost: (?P<message>.*)$")
+
+error_severities = ["fatal error", "error", "modpost error"]
+
+
+@typechecked
+def parse_diagnostic_line(line: str) -> Optional[dict]:
+    m = compiler_diagnostic_reg.match(line)
+    if m is not None:
+        return {
+            "file": m.group("file"),
+            "line": int(m.group("line")),
+            "column": None if m.group("column") is None else int(m.group("column")),
+            "severity": m.group("severity"),
+            "message": m.group("message").strip()
+        }
+    m = modpost_error_reg.match(line)
+    if m is not None:
+        return {"file": None, "line": None, "column": None,
+                "severity": "modpost error", "message": m.group("message").strip()}
+    m = make_error_reg.match(line)
+    if m is not None:
+        return {"file": None, "line": None, "column": None,
+                "severity": "make error", "message": m.group("message").strip()}
+    return None
+
+
+class DiagnosticsParser:
+    """
+    Incremental parser of the diagnostics of an output, fed with chunks
+    that may split lines.
+    """
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.partial = ""
+        self.diagnostics = []
+        self.counts = {}
+
+    def _parse_line(self, line: str):
+        d = parse_diagnostic_line(line.rstrip("\r"))
+        if d is None:
+            return
+        self.counts[d["severity"]] = self.counts.get(d["severity"], 0) + 1
+        if len(self.diagnostics) < max_diagnostics_per_command:
+            self.diagnostics.append(d)
+
+    def feed(self, chunk: bytes):
+        lines = (self.partial + self.decoder.decode(chunk)).split("\n")
+        self.partial = lines.pop()
+        for l in lines:
+            self._parse_line(l)
+
+    def close(self):
+        self.partial += self.decoder.decode(b"", final=True)
+        if "" != self.partial:
+            self._parse_line(self.partial)
+            self.partial = ""
+
+
+class CommandOutput:
+    """
+    Output of one command in a BuildOutputStore.
+    """
+
+    def __init__(self, store, cmd: list, step: str):
+        self.store = store
+        self.entry = {
+            "step": step,
+            "cmd": cmd,
+            "pid": os.getpid(),
+            "raw": store.raw_name(),
+            "segments": [],
+            "start": time.time(),
+            "duration": None,
+            "returncode": None,
+            "timed_out": False,
+            "error": None
+        }
+        self.parser = DiagnosticsParser()
+
+    def write(self, chunk: bytes):
+        offset = self.store.append_raw(chunk)
+        segments = self.entry["segments"]
+        # Merge with the previous segment when no other command wrote
+        # in between
+        if len(segments) > 0 and segments[-1][0] + segments[-1][1] == offset:
+            segments[-1][1] += len(chunk)
+        else:
+            segments.append([offset, len(chunk)])
+        self.parser.feed(chunk)
+
+    def end(self, returncode: Optional[int], timed_out: bool = False, error: Optional[str] = None):
+        self.parser.close()
+        self.entry["duration"] = time.time() - self.entry["start"]
+        self.entry["returncode"] = returncode
+        self.entry["timed_out"] = timed_out
+        self.entry["error"] = error
+        self.entry["counts"] = self.parser.counts
+        self.entry["diagnostics"] = self.parser.diagnostics
+        self.store.append_index(self.entry)
+
+
+class BuildOutputStore:
+    """
+    Store of the outputs of the commands in directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.raw_file = None
+        self.raw_pid = None
+
+    def raw_name(self) -> str:
+        return f"output-{os.getpid()}.raw"
+
+    def append_raw(self, chunk: bytes) -> int:
+        with self.lock:
+            # One raw file per process: forked processes get their own
+            if self.raw_file is None or os.getpid() != self.raw_pid:
+                self.raw_file = open(os.path.join(
+                    self.directory, self.raw_name()), "ab")
+                self.raw_pid = os.getpid()
+            offset = self.raw_file.tell()
+            self.raw_file.write(chunk)
+            self.raw_file.flush()
+            return offset
+
+    def append_index(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            # A single append per entry: the processes sharing the
+            # index do not interleave their lines
+            fd = os.open(os.path.join(self.directory, build_output_index_name),
+                         os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+            finally:
+                os.close(fd)
+
+    def begin(self, cmd: list, step: Optional[str]) -> CommandOutput:
+        return CommandOutput(self, cmd, outside_step_name if step is None else step)
+
+
+@typechecked
+def open_build_output_store(directory: str) -> BuildOutputStore:
+    # A new store for each run: the previous outputs are removed
+    os.makedirs(directory, exist_ok=True)
+    for f in os.listdir(directory):
+        if f.endswith(".raw") or build_output_index_name == f:
+            os.remove(os.path.join(directory, f))
+    return BuildOutputStore(directory)
+
+
+@typechecked
+def read_build_output_index(directory: str) -> list:
+    entries = []
+    try:
+        with open(os.path.join(directory, build_output_index_name), "r") as f:
+            for l in f:
+                try:
+                    entries.append(json.loads(l))
+                except ValueError:
+                    # Line cut by a crash
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+@typechecked
+def read_command_output(directory: str, entry: dict, max_bytes: Optional[int] = None) -> str:
+    """
+    Output of the command of an index entry, only its last max_bytes if
+    given: only these bytes are read.
+    """
+    segments = entry["segments"]
+    if 0 == len(segments):
+        # No output, the raw file may not exist
+        return ""
+    if max_bytes is not None:
+        kept = []
+        remaining = max_bytes
+        for offset, length in reversed(segments):
+            if remaining <= 0:
+                break
+            if length > remaining:
+                offset += length - remaining
+                length = remaining
+            kept.insert(0, (offset, length))
+            remaining -= length
+        segments = kept
+    data = []
+    with open(os.path.join(directory, entry["raw"]), "rb") as f:
+        for offset, length in segments:
+            f.seek(offset)
+            data.append(f.read(length))
+    return b"".join(data).decode("utf-8", errors="replace")
+
+
+@typechecked
+def first_build_error(directory: str) -> Optional[dict]:
+    """
+    The first error of the failed commands: compiler or modpost error,
+    otherwise make error. Returns the index entry of the command with
+    the error, None if no command failed.
+    """
+    entries = read_build_output_index(directory)
+    # returncode None: the command timed out or could not be run
+    failed = [e for e in entries if 0 != e["returncode"]]
+    for severities in [error_severities, ["make error"]]:
+        for e in failed:
+            for d in e["diagnostics"]:
+                if d["severity"] in severities:
+                    return {"entry": e, "diagnostic": d}
+    if len(failed) > 0:
+        return {"entry": failed[0], "diagnostic": None}
+    return None
+
+
+@typechecked
+def format_diagnostic(d: dict) -> str:
+    location = ""
+    if d["file"] is not None:
+        location = f"{d['file']}:{d['line']}:"
+        if d["column"] is not None:
+            location += f"{d['column']}:"
+        location += " "
+    return f"{location}{d['severity']}: {d['message']}"
+
+
+@typechecked
+def build_summary(directory: str, tail_bytes: int = 4096) -> str:
+    """
+    Summary of the commands of a store: their count, the diagnostics
+    counts, and for the first failed command its first error and the end
+    of its output.
+    """
+    entries = read_build_output_index(directory)
+    counts = {}
+    for e in entries:
+        for severity, n in e["counts"].items():
+            counts[severity] = counts.get(severity, 0) + n
+    lines = [f"{len(entries)} commands in {directory}"]
+    if len(counts) > 0:
+        lines.append(", ".join(f"{n} {severity}" for severity,
+                     n in sorted(counts.items())))
+    error = first_build_error(directory)
+    if error is None:
+        lines.append("No command failed")
+        return "\n".join(lines)
+    e = error["entry"]
+    if e.get("timed_out", False):
+        status = "timed out"
+    elif e.get("error") is not None:
+        status = f"could not be run: {e['error']}"
+    elif e["returncode"] is None:
+        status = "did not complete"
+    else:
+        status = f"failed with exit code {e['returncode']}"
+    lines.append(
+        f"Command «{' '.join(e['cmd'])}» of step {e['step']} {status}")
+    if error["diagnostic"] is not None:
+        lines.append(f"First error: {format_diagnostic(error['diagnostic'])}")
+    lines.append("End of its output:")
+    lines.append(read_command_output(directory, e, tail_bytes).rstrip())
+    return "\n".join(lines)
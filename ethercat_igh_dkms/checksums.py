@@ -0,0 +1,120 @@
+import os
+import hashlib
+import json
+
+from logging import Logger
+from .typecheck import typechecked
+from typing import Callable, Optional
+
+
+# Checksums of the files handled by the post install, to skip the steps
+# whose inputs and outputs did not change since the last run.
+
+
+@typechecked
+def file_digest(path: str) -> Optional[str]:
+    # sha256 of the content of a file, None if it does not exist
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+@typechecked
+def tree_stat_digest(paths: list[str]) -> str:
+    """
+    Digest of the path, size and modification time of every file under
+    paths (files or directories). Cheap: no file is read.
+    """
+    h = hashlib.sha256()
+    for top in paths:
+        h.update(f"{top}\0".encode())
+        if os.path.isfile(top):
+            st = os.stat(top)
+            h.update(f"{st.st_size}:{st.st_mtime_ns}\n".encode())
+            continue
+        for root, dirs, files in os.walk(top):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(path, top)
+                h.update(
+                    f"{rel_path}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+@typechecked
+def tree_content_digests(top: str, subdirs: list[str], ignored: Optional[Callable[[str], bool]] = None) -> dict:
+    """
+    sha256 of the content of every file under the subdirs of top, keyed by
+    its path relative to top: the digests do not depend on where the tree
+    is nor on the modification times. The files and directories whose
+    name is ignored are skipped.
+    """
+    digests = {}
+    for d in subdirs:
+        for root, dirs, files in os.walk(os.path.join(top, d)):
+            if ignored is not None:
+                dirs[:] = [n for n in dirs if not ignored(n)]
+            for name in files:
+                if ignored is not None and ignored(name):
+                    continue
+                path = os.path.join(root, name)
+                digests[os.path.relpath(path, top)] = file_digest(path)
+    return digests
+
+
+@typechecked
+def files_modified_since(top: str, since_ns: int) -> list[str]:
+    # Paths relative to top of the files modified since since_ns
+    modified = []
+    for root, dirs, files in os.walk(top):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if st.st_mtime_ns >= since_ns:
+                modified.append(os.path.relpath(path, top))
+    return sorted(modified)
+
+
+@typechecked
+def files_content_digests(top: str, rel_paths: list[str]) -> dict:
+    # sha256 of the files given by their path relative to top, None for
+    # the missing ones
+    return {p: file_digest(os.path.join(top, p)) for p in rel_paths}
+
+
+@typechecked
+def strings_digest(values: list) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+@typechecked
+def load_checksum_manifest(manifest_file: str, logger: Logger) -> dict:
+    try:
+        with open(manifest_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring the checksum manifest {manifest_file}: {e}")
+        return {}
+
+
+@typechecked
+def save_checksum_manifest(manifest_file: str, manifest: dict):
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
@@ -4,29 +4,52 @@ import subprocess
 import shutil
 import logging
 from logging import Logger
-from typing import Tuple
-from typeguard import typechecked
+from .typecheck import typechecked
 import re
 from pathlib import Path
 import importlib
 import json
+import hashlib
+import time
+import collections
+import codecs
+import selectors
+import signal
 
 from .parameters import *
 from .get_mac import *
 from .get_hw_info import *
+from .module_cache import *
+from .git_refs import *
+from .packages import *
+from .phase_report import *
+from .install_steps import *
+from .checksums import *
+from .interface_ranking import *
+from .sysfs_probe import *
+from .log_pipeline import *
+from .build_output import *
+from .module_inventory import *
+from .install_manifest import *
 
 
 ###############################
 # Global variables
 ###############################
 
-# Get the current kernel version
-kernel_version = subprocess.check_output(["uname", "-r"]).strip().decode()
+# Release of the running kernel, read by get_kernel_version when needed
+kernel_version = None
 project_dir = Path(os.path.abspath(__file__)).parent.parent
 in_use_device_modules = set()
 installed_files_tracker = {}
 installed_files_tracker_name = "installed_files.json"
+phase_report_name = "install_phases.json"
+post_install_manifest_name = "post_install_manifest.json"
+multi_kernel_build_report_name = "multi_kernel_build_report.json"
+modules_root_dir = "/lib/modules"
 logger = None
+logger_pipeline = None
+build_output_store = None
 
 ###############################
 # Utility Functions and classes
@@ -62,9 +85,20 @@ def record_directory(dir_path: str):
             raise Exception(f"Directory {dir_path} already recorded as a file")
 
 
+@typechecked
+def save_phase_report():
+    # Timing and resource usage of the phases, next to the installed files tracker
+    save_file_path = os.path.join(project_dir, phase_report_name)
+    phase_recorder.save(save_file_path)
+    logger.info(f"Phase report written to {save_file_path}")
+
+
 @typechecked
 def save_installed_files():
     global installed_files_tracker
+    # Record the size, modification time and hash of the files for verify
+    installed_files_tracker = update_installed_files_state(
+        installed_files_tracker)
     save_file_path = os.path.join(project_dir, installed_files_tracker_name)
     with open(save_file_path, "w") as f:
         json.dump(installed_files_tracker, f, indent=2)
@@ -79,6 +113,21 @@ def load_installed_files():
             installed_files_tracker = json.load(f)
 
 
+@typechecked
+def verify_installation(rehash: bool = False) -> list:
+    """
+    Check the installed files against the installed files tracker, see
+    verify_installed_files. Only the files whose stat data changed are
+    hashed, all of them with rehash.
+    """
+    save_file_path = os.path.join(project_dir, installed_files_tracker_name)
+    if not os.path.exists(save_file_path):
+        raise Exception(f"No installed files tracker {save_file_path}")
+    with open(save_file_path, "r") as f:
+        tracker = json.load(f)
+    return verify_installed_files(tracker, rehash=rehash)
+
+
 @typechecked
 def clean_installed_files():
     """
@@ -112,50 +161,31 @@ def handle_subprocess_error(e: Exception, cmd: str, exit: bool = False, raise_ex
         raise Exception(cmd)
 
 
-@typechecked
-def keep_one_file_log_history(logger_name: str, log_file_path: str):
-    # Keep only one log file
-    log_files = [f for f in os.listdir(log_file_path) if f.endswith(".log")]
-    # find all log_files containing logger_name
-    log_files = [f for f in log_files if logger_name in f]
-    if 1 < len(log_files):
-        # Sort the log files by date
-        log_files.sort(key=lambda x: os.path.getmtime(
-            os.path.join(log_file_path, x)))
-        # Remove all log files except the most recent one
-        for log_file in log_files[:-1]:
-            os.remove(os.path.join(log_file_path, log_file))
-    # Rename the remaining log file appending _prev to its base name
-    if 1 <= len(log_files):
-        remaining_file = log_files[-1]
-        os.rename(os.path.join(log_file_path, remaining_file),
-                  os.path.join(log_file_path, remaining_file.replace(".log", "_prev.log")))
-
-
-class FlushFileHandler(logging.FileHandler):
-    """
-    A handler class which writes logging records flushing after each record.
-    """
-
-    def emit(self, record):
-        super().emit(record)
-        self.flush()  # Ensure flushing happens right after emit
-
-
 @typechecked
 def init_logging(logger_name: str, log_file_path: str) -> Logger:
+    global logger_pipeline
     # Setup logging service
     logger = Logger.manager.getLogger(logger_name)
     logger.setLevel(logging.DEBUG)
-    # create file handler which logs even debug messages
-    fh = FlushFileHandler(os.path.join(log_file_path, logger_name + ".log"))
-    fh.setLevel(logging.DEBUG)
-    # create formatter and add it to the handler
+    # Replace the pipeline of a previous initialization
+    if logger_pipeline is not None:
+        logger.removeHandler(logger_pipeline.handler)
+        stop_log_pipeline(logger_pipeline)
+    # create formatter for the background writer which logs even debug messages
     formatter = logging.Formatter(
         '%(asctime)s - logger : %(name)s - %(levelname)s - psid : %(processName)s - filename : %(filename)s - funcname: %(funcName)s - Line num : %(lineno)d -> %(message)s')
-    fh.setFormatter(formatter)
+    logger_pipeline = start_log_pipeline(os.path.join(log_file_path, logger_name + ".log"),
+                                         formatter,
+                                         log_flush_interval,
+                                         log_flush_size,
+                                         log_max_bytes,
+                                         log_backup_count)
+    logger_pipeline.handler.setLevel(logging.DEBUG)
     # add the handler to logger
-    logger.addHandler(fh)
+    logger.addHandler(logger_pipeline.handler)
+    # prefix the records with the install step running them
+    if not any(isinstance(f, StepLogFilter) for f in logger.filters):
+        logger.addFilter(StepLogFilter())
     #
     logger.info('Logger initialized !')
     return logger
@@ -189,7 +219,7 @@ def interactively_choose_master_devices(logger: Logger) -> dict:
         if None != hw_addr:
             hw_type = get_hw_type(interface, logger)
             if EthernetHardwares.UNKNOWN != hw_type:
-                info = get_more_hw_info(hw_addr, hw_type, logger)
+                info = get_more_hw_info(hw_addr, hw_type, logger, interface)
                 if None != info:
                     print(info)
         print()
@@ -251,6 +281,66 @@ def ethernet_interfaces_are_valid(interfaces: list, logger: Logger) -> bool:
     return True
 
 
+@typechecked
+def native_igh_drivers() -> dict:
+    # Kernel drivers replaced by a native IgH device module
+    for driver, module in native_device_module_drivers.items():
+        if module not in known_device_modules:
+            logger.error(
+                f"Invalid device module for the driver {driver}: {module}")
+            raise Exception("Invalid value in native_device_module_drivers")
+    return native_device_module_drivers
+
+
+@typechecked
+def interfaces_of_master_devices(master_devices: dict) -> list:
+    # Names of the interfaces with the MAC addresses of master_devices
+    macs = [v.lower() for k, v in sorted(master_devices.items())]
+    found = {}
+    for link in get_net_inventory().links.values():
+        if link.mac is not None and link.mac.lower() in macs:
+            found[link.mac.lower()] = link.name
+    return [found[m] for m in macs if m in found]
+
+
+@typechecked
+def propose_device_modules(interfaces: list) -> list:
+    """
+    Device modules for the EtherCAT interfaces: the native IgH module of
+    the kernel driver of each interface when there is one, and generic.
+    """
+    native_drivers = native_igh_drivers()
+    proposed = set(["generic"])
+    inventory = get_net_inventory()
+    for interface in interfaces:
+        link = inventory.get(interface)
+        driver = None if link is None else link.driver
+        if driver in native_drivers:
+            logger.info(
+                f"Interface {interface} is driven by {driver}: native module ec_{native_drivers[driver]} available")
+            proposed.add(native_drivers[driver])
+        else:
+            logger.info(
+                f"No native module for the driver {driver} of the interface {interface}, using generic")
+    return [m for m in known_device_modules if m in proposed]
+
+
+@typechecked
+def guess_ethercat_interfaces() -> list:
+    # The interfaces that update_ethercat_config will use, before it runs
+    if used_ethernet_interfaces is not None:
+        return list(used_ethernet_interfaces)
+    if MASTER_DEVICES is not None:
+        return interfaces_of_master_devices(MASTER_DEVICES)
+    if guess_used_ethernet_interface:
+        ranking = rank_ethernet_interfaces(
+            identify_ethernet_interfaces(logger), native_igh_drivers(), logger)
+        for r in ranking:
+            if r["info"]["mac"] is not None:
+                return [r["interface"]]
+    return []
+
+
 @typechecked
 def update_ethercat_config(cfg_file: str):
     global used_ethernet_interfaces, logger, MASTER_DEVICES, guess_used_ethernet_interface, interactive, known_device_modules, device_modules
@@ -285,8 +375,11 @@ def update_ethercat_config(cfg_file: str):
         else:
             # Try to guess the MASTER_DEVICES dictionary
             if guess_used_ethernet_interface:
-                # Try to guess the used Ethernet interfaces
-                used_ethernet_interfaces = identify_ethernet_interfaces(logger)
+                # Try to guess the used Ethernet interfaces, the best
+                # suited for EtherCAT first
+                ranking = rank_ethernet_interfaces(
+                    identify_ethernet_interfaces(logger), native_igh_drivers(), logger)
+                used_ethernet_interfaces = [r["interface"] for r in ranking]
                 # Try to guess the MAC addresses of the used Ethernet interfaces
                 guessed_master_devices = {}
                 guessed_interface = None
@@ -312,7 +405,13 @@ def update_ethercat_config(cfg_file: str):
                     # Ask the user to confirm the guessed values or to enter new values
                     hw_addr = get_hw_info(guessed_interface, logger)
                     hw_type = get_hw_type(guessed_interface, logger)
-                    info = get_more_hw_info(hw_addr, hw_type, logger)
+                    info = get_more_hw_info(
+                        hw_addr, hw_type, logger, guessed_interface)
+                    reasons = [r["reasons"] for r in ranking
+                               if r["interface"] == guessed_interface]
+                    if len(reasons) > 0 and len(reasons[0]) > 0:
+                        info = f"{info}\nChosen because:\n\t" + \
+                            "\n\t".join(reasons[0])
                     print(
                         f"The following Ethernet interface has been guessed:\n\t{guessed_interface}\n{info}")
                     ok = input(
@@ -334,8 +433,17 @@ def update_ethercat_config(cfg_file: str):
                         if "y" != ok and "" != ok:
                             sys.exit(-1)
     logger.info(f"MASTER_DEVICES={to_use_master_devices}")
+    # Device modules matching the kernel drivers of the chosen interfaces
+    proposed_device_modules = None
+    if to_use_master_devices is not None:
+        proposed_device_modules = propose_device_modules(
+            interfaces_of_master_devices(to_use_master_devices))
+        logger.info(
+            f"Proposed device modules: {' '.join(proposed_device_modules)}")
     to_use_device_modules = None
-    if device_modules is not None:
+    if auto_select_device_modules and proposed_device_modules is not None:
+        to_use_device_modules = " ".join(proposed_device_modules)
+    elif device_modules is not None:
         # Then the parameter superseeds all the others
         # Check if the values are correct
         wanted_device_modules = device_modules.split()
@@ -344,16 +452,28 @@ def update_ethercat_config(cfg_file: str):
                 logger.error(f"Invalid value in device_modules: {module}")
                 raise Exception("Invalid value in device_modules")
         to_use_device_modules = device_modules
+        if proposed_device_modules is not None:
+            better = [m for m in proposed_device_modules
+                      if m not in wanted_device_modules]
+            if len(better) > 0:
+                logger.info(
+                    f"The native device modules {' '.join(better)} match the chosen interfaces, add them to device_modules or set auto_select_device_modules to use them")
     else:
         if interactive:
             # Ask the user to choose one of the known device modules
             choice_display = ""
             for i, module in enumerate(known_device_modules):
                 choice_display += f"\n{i+1}: {module}\n"
+            proposal = ""
+            if proposed_device_modules is not None:
+                proposal = f"Press enter to use the modules proposed for the chosen interfaces: {' '.join(proposed_device_modules)}\n"
             choice_recognized = False
             while not choice_recognized:
                 user_choice = input(
-                    f"Choose a set of known device modules (enter a list of number separated by ';'):\n{choice_display}? > ")
+                    f"Choose a set of known device modules (enter a list of number separated by ';'):\n{choice_display}{proposal}? > ")
+                if "" == user_choice.strip() and proposed_device_modules is not None:
+                    user_choice = ";".join(
+                        [str(known_device_modules.index(m) + 1) for m in proposed_device_modules])
                 try:
                     user_choice = [int(x) for x in user_choice.split(";")]
                     for c in user_choice:
@@ -367,6 +487,14 @@ def update_ethercat_config(cfg_file: str):
                 to_use_device_modules = " ".join(
                     [known_device_modules[c-1] for c in user_choice])
 
+    # Warn about the device modules not compiled: the master cannot load them
+    compiled = compiled_device_modules(def_build_dir())
+    if len(compiled) > 0 and to_use_device_modules is not None:
+        missing = [m for m in to_use_device_modules.split()
+                   if m not in compiled]
+        if len(missing) > 0:
+            logger.warning(
+                f"The device modules {' '.join(missing)} have not been compiled, rebuild the modules to use them")
     # Update the configuration file
     logger.info(f"Updating the configuration file {cfg_file}...")
     # Read the configuration file
@@ -413,22 +541,203 @@ def def_source_dir() -> str:
 
 
 @typechecked
-def clone_sources(source_dir: str):
-    parent = Path(source_dir).parent
-    os.makedirs(parent, exist_ok=True)
-    # Otherwise download the source code from the internet
-    # fails if no network connection is available
-    logger.info("Downloading source code...")
+def def_build_dir(kernel_release: Optional[str] = None) -> str:
+    """
+    Build directory for a kernel release. Without kernel release the
+    build is done for the running kernel, inside the source directory
+    unless out_of_tree_builds is set. Out of the source tree, the
+    directory is a link to the configuration built last.
+    """
+    source_dir = def_source_dir()
+    if kernel_release is None:
+        if not out_of_tree_builds:
+            return source_dir
+        kernel_release = get_kernel_version()
+    return os.path.join(f"{source_dir}-build", kernel_release)
+
+
+@typechecked
+def configuration_build_dir(build_dir: str, fingerprint: str) -> str:
+    # Out-of-tree build directory of one configuration
+    return f"{build_dir}-{fingerprint[:12]}"
+
+
+@typechecked
+def activate_build_dir(build_dir: str, config_build_dir: str):
+    # Point the kernel release build directory to the configuration just
+    # built, replacing the link atomically
+    target = os.path.basename(config_build_dir)
+    # The mtime of a configuration directory is its last use time
+    os.utime(config_build_dir)
+    if os.path.islink(build_dir) and target == os.readlink(build_dir):
+        return
+    if os.path.isdir(build_dir) and not os.path.islink(build_dir):
+        # Build directory of a previous version, not keyed by configuration
+        logger.info(f"Removing the build directory {build_dir}")
+        shutil.rmtree(build_dir)
+    tmp_link = f"{build_dir}.tmp-{os.getpid()}"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, build_dir)
+    logger.info(f"Build directory {build_dir} -> {target}")
+
+
+@typechecked
+def prune_configuration_build_dirs(build_dir: str, keep: int):
+    """
+    Remove the configuration directories of the kernel release build
+    directory beyond the keep most recently used ones, with their
+    fingerprint. The configuration build_dir links to is always kept.
+    """
+    parent = os.path.dirname(build_dir)
+    prefix = os.path.basename(build_dir) + "-"
+    active = os.path.realpath(build_dir)
+    configs = []
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.startswith(prefix) and re.fullmatch(r"[0-9a-f]{12}", name[len(prefix):]) \
+                and os.path.isdir(path) and not os.path.islink(path):
+            configs.append((os.path.getmtime(path), path))
+    # Most recently used first, the active configuration counts as kept
+    configs.sort(reverse=True)
+    kept = 1 if any(active == os.path.realpath(c[1]) for c in configs) else 0
+    for last_use, path in configs:
+        if os.path.realpath(path) == active:
+            continue
+        if kept < keep:
+            kept += 1
+            continue
+        logger.info(f"Removing the build directory of an old configuration {path}")
+        shutil.rmtree(path)
+        remove_config_fingerprint(path)
+
+
+@typechecked
+def list_installed_kernels() -> list[str]:
+    # Kernels for which a header tree is installed
+    kernels = []
+    if os.path.isdir(modules_root_dir):
+        for k in sorted(os.listdir(modules_root_dir)):
+            if os.path.isdir(os.path.join(modules_root_dir, k, "build")):
+                kernels.append(k)
+    return kernels
+
+
+@typechecked
+def git_mirror_exists() -> bool:
+    return git_mirror_dir is not None and os.path.exists(os.path.join(git_mirror_dir, "HEAD"))
+
+
+@typechecked
+def create_git_mirror():
+    os.makedirs(Path(git_mirror_dir).parent, exist_ok=True)
+    if git_bundle_file is not None:
+        logger.info(f"Creating the git mirror from the bundle {git_bundle_file}...")
+        source = git_bundle_file
+    else:
+        logger.info(f"Creating the git mirror of {git_project}...")
+        source = git_project
     try:
-        cmd = ["git", "clone", git_project, source_dir]
-        exec_cmd(cmd)
-        os.chdir(source_dir)
-        cmd = ["git", "checkout", git_branch]
+        cmd = ["git", "clone", "--mirror", source, git_mirror_dir]
+        exec_cmd(cmd, timeout=git_network_timeout)
+        # Refreshes without bundle go to the upstream project
+        cmd = ["git", "remote", "set-url", "origin", git_project]
+        exec_cmd(cmd, cwd=git_mirror_dir)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        imsg = f"Impossible to create the git mirror {git_mirror_dir}"
+        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+
+
+@typechecked
+def refresh_git_mirror(bundle_file: Optional[str] = None):
+    """
+    Update the local git mirror from a bundle file (no network access needed)
+    or from git_project. Branches are not pruned: clones may still reference
+    their objects.
+    """
+    if git_mirror_dir is None:
+        imsg = "No git mirror configured: set git_mirror_dir in parameters.py"
+        logger.error(imsg)
+        raise Exception(imsg)
+    if bundle_file is None:
+        bundle_file = git_bundle_file
+    if not git_mirror_exists():
+        create_git_mirror()
+    try:
+        if bundle_file is not None:
+            logger.info(f"Refreshing the git mirror from the bundle {bundle_file}...")
+            cmd = ["git", "fetch", bundle_file,
+                   "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+        else:
+            logger.info(f"Refreshing the git mirror from {git_project}...")
+            cmd = ["git", "remote", "update"]
+        exec_cmd(cmd, timeout=git_network_timeout, cwd=git_mirror_dir)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        imsg = f"Impossible to refresh the git mirror {git_mirror_dir}"
+        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+
+
+@typechecked
+def clone_from_git_mirror(source_dir: str) -> bool:
+    # The objects stay in the mirror (alternates), only the checkout is written
+    if not git_mirror_exists():
+        try:
+            create_git_mirror()
+        except Exception as e:
+            logger.warning(
+                f"Impossible to create the git mirror {git_mirror_dir}, falling back to a clone of {git_project}: {e}")
+            return False
+    logger.info(f"Cloning the source code from the git mirror {git_mirror_dir}...")
+    try:
+        cmd = ["git", "clone", "--shared", "--branch",
+               git_branch, git_mirror_dir, source_dir]
         exec_cmd(cmd)
-        os.chdir(project_dir)
+        if not os.path.exists(os.path.join(source_dir, ".git")):
+            return False
+        # Updates of the checkout are pulled from the upstream project
+        cmd = ["git", "remote", "set-url", "origin", git_project]
+        exec_cmd(cmd, cwd=source_dir)
     except subprocess.CalledProcessError as e:
-        imsg = f"Impossible to download the source code then checkout the branch {git_branch}"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+        imsg = f"Impossible to clone the branch {git_branch} from the git mirror"
+        handle_subprocess_error(e, imsg, exit=False, raise_exception=False)
+        return False
+    return True
+
+
+@typechecked
+def clone_sources(source_dir: str):
+    parent = Path(source_dir).parent
+    os.makedirs(parent, exist_ok=True)
+    cloned = False
+    if git_mirror_dir is not None:
+        cloned = clone_from_git_mirror(source_dir)
+        if not cloned and os.path.exists(source_dir):
+            shutil.rmtree(source_dir)
+    if not cloned:
+        # Otherwise download the source code from the internet
+        # fails if no network connection is available
+        logger.info("Downloading source code...")
+        try:
+            if git_shallow_clone:
+                cmd = ["git", "clone", "--depth", "1", "--single-branch",
+                       "--branch", git_branch, git_project, source_dir]
+                exec_cmd(cmd, timeout=git_network_timeout)
+            else:
+                cmd = ["git", "clone"]
+                if git_mirror_exists():
+                    cmd += ["--reference-if-able", git_mirror_dir]
+                cmd += [git_project, source_dir]
+                exec_cmd(cmd, timeout=git_network_timeout)
+                cmd = ["git", "checkout", git_branch]
+                exec_cmd(cmd, cwd=source_dir)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            imsg = f"Impossible to download the source code then checkout the branch {git_branch}"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    if git_commit is not None and not checkout_pinned_commit(source_dir):
+        imsg = f"Impossible to checkout the pinned commit {git_commit}"
+        logger.error(imsg)
+        raise Exception(imsg)
 
 
 @typechecked
@@ -460,36 +769,149 @@ def check_secure_boot_state():
 
 
 @typechecked
-def exec_cmd(cmd: list) -> str:
+def exec_cmd(cmd: list, env: Optional[dict] = None, timeout: Optional[float] = None, max_output: Optional[int] = None, check: bool = True, cwd: Optional[str] = None) -> str:
+    """
+    Run a command, logging its output (stdout and stderr) while it runs.
+
+    Parameters
+    ----------
+    cmd : list
+        Command and its arguments
+    env : dict, optional
+        Environment of the command, default is the current environment
+    timeout : float, optional
+        The command is killed and subprocess.TimeoutExpired raised after
+        timeout seconds
+    max_output : int, optional
+        Number of bytes at the end of the output kept in memory and
+        returned, default is exec_cmd_max_output, 0 keeps nothing
+    check : bool
+        Raise subprocess.CalledProcessError if the command fails
+    cwd : str, optional
+        Working directory of the command, default is the current working
+        directory. Code running concurrently must use it rather than
+        os.chdir, which changes the directory of the whole process
+
+    Returns
+    -------
+    str
+        The end of the output of the command
+    """
     str_cmd = " ".join(cmd)
     logger.info(f"Executing command: «{str_cmd}»")
-    res = ""
+    if max_output is None:
+        max_output = exec_cmd_max_output
+    deadline = None if timeout is None else time.monotonic() + timeout
+    tail = collections.deque()
+    # The output is also kept in the build output store, indexed by step
+    command_output = None
+    if build_output_store is not None:
+        step = current_step.get()
+        command_output = build_output_store.begin(
+            cmd, step if step is not None else current_phase_name())
+    returncode = None
+    timed_out = False
+    error = None
+    try:
+        returncode = _run_cmd(cmd, env, cwd, deadline, timeout,
+                              max_output, tail, command_output)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        raise
+    except BaseException as e:
+        # The command could not be run (missing executable...) or was
+        # interrupted: it has no exit code
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if command_output is not None:
+            command_output.end(returncode, timed_out, error)
+    output = b"".join(tail)[-max_output:] if 0 < max_output else b""
+    if check and 0 != returncode:
+        raise subprocess.CalledProcessError(returncode, cmd, output=output)
+    return output.decode("utf-8", errors="replace")
+
+
+def _kill_process_group(process: subprocess.Popen):
+    # The command is the leader of its own process group: the processes it
+    # started (sub-makes, compilers...) are killed with it
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _run_cmd(cmd: list, env: Optional[dict], cwd: Optional[str], deadline: Optional[float], timeout: Optional[float], max_output: int, tail: collections.deque, command_output) -> int:
+    tail_size = 0
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
     with subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT
+        stderr=subprocess.STDOUT,
+        env=env,
+        cwd=cwd,
+        start_new_session=True
     ) as process:
-        while True:
-            text = process.stdout.read1().decode("utf-8")
-            text1 = text.strip()
-            if "" != text1:
-                res += text
-                logger.info(text1)
-            if process.poll() is not None:
-                break
-    return res
+        try:
+            fd = process.stdout.fileno()
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_READ)
+                while True:
+                    wait = 1.0
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                        if wait <= 0:
+                            _kill_process_group(process)
+                            raise subprocess.TimeoutExpired(
+                                cmd, timeout, output=b"".join(tail))
+                    events = selector.select(wait)
+                    if 0 == len(events):
+                        # Stop when the command has exited, even if a process
+                        # it started in background still holds the pipe
+                        if process.poll() is not None:
+                            break
+                        continue
+                    chunk = os.read(fd, 65536)
+                    if b"" == chunk:
+                        break
+                    text1 = decoder.decode(chunk).strip()
+                    if "" != text1:
+                        logger.info(text1)
+                    if command_output is not None:
+                        command_output.write(chunk)
+                    if 0 < max_output:
+                        tail.append(chunk)
+                        tail_size += len(chunk)
+                        while tail_size - len(tail[0]) >= max_output:
+                            tail_size -= len(tail.popleft())
+            try:
+                wait = None if deadline is None else max(
+                    0, deadline - time.monotonic())
+                returncode = process.wait(timeout=wait)
+            except subprocess.TimeoutExpired:
+                _kill_process_group(process)
+                raise subprocess.TimeoutExpired(
+                    cmd, timeout, output=b"".join(tail))
+        except KeyboardInterrupt:
+            # The command does not get the signals of the terminal
+            _kill_process_group(process)
+            raise
+    return returncode
 
 
 @typechecked
 def create_logger(proj_name: str = "ethercat_igh_dkms", log_dir: str = "/var/log/ethercat_igh_dkms"):
     global logger
+    global build_output_store
     # Create the log directory if it does not exist
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    # Keep only one log file
-    keep_one_file_log_history(proj_name, log_dir)
     # Initialize the logger
     logger = init_logging(proj_name, log_dir)
+    # The output of the commands, with its diagnostics, read by build_summary
+    build_output_store = open_build_output_store(
+        os.path.join(log_dir, proj_name + build_output_dir_suffix))
 
 
 @typechecked
@@ -497,6 +919,11 @@ def get_logger() -> Optional[Logger]:
     return logger
 
 
+@typechecked
+def get_build_output_store() -> Optional[BuildOutputStore]:
+    return build_output_store
+
+
 @typechecked
 def set_configure_prefix(value: str):
     configure_options["--prefix"]["value"] = value
@@ -520,13 +947,123 @@ def set_interactive(value: bool):
     interactive = value
 
 
+@typechecked
+def get_kernel_version() -> str:
+    # Same as «uname -r», read once
+    global kernel_version
+    if kernel_version is None:
+        kernel_version = os.uname().release
+    return kernel_version
+
+
 @typechecked
 def get_kernel() -> str:
     global kernel_version
-    kernel_version = subprocess.check_output(["uname", "-r"]).strip().decode()
+    kernel_version = os.uname().release
     return kernel_version
 
 
+@typechecked
+def get_online_cpus() -> int:
+    # CPUs this process is allowed to run on (honours taskset/cgroup cpusets)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+@typechecked
+def get_available_memory_mb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for l in f:
+                if l.startswith("MemAvailable:"):
+                    return int(l.split()[1]) // 1024
+    except (OSError, ValueError, IndexError) as e:
+        logger.info(f"Could not read the available memory: {e}")
+    return None
+
+
+@typechecked
+def get_make_jobs() -> int:
+    """
+    Number of parallel make jobs: the make_jobs parameter if it is set,
+    otherwise the number of online CPUs limited by the available memory
+    (make_job_memory_mb per job).
+    """
+    if make_jobs is not None:
+        return max(1, int(make_jobs))
+    jobs = get_online_cpus()
+    available_memory = get_available_memory_mb()
+    if available_memory is not None and 0 < make_job_memory_mb:
+        jobs = min(jobs, available_memory // make_job_memory_mb)
+    return max(1, jobs)
+
+
+@typechecked
+def make_cmd(targets: list) -> list:
+    return ["make", f"-j{get_make_jobs()}"] + targets
+
+
+@typechecked
+def ccache_enabled() -> bool:
+    if not use_ccache:
+        return False
+    if shutil.which("ccache") is None:
+        logger.warning("use_ccache is set but ccache is not installed, building without compiler cache")
+        return False
+    return True
+
+
+@typechecked
+def ccache_env() -> dict:
+    env = dict(os.environ)
+    env["CCACHE_DIR"] = ccache_dir
+    env["CCACHE_MAXSIZE"] = ccache_max_size
+    return env
+
+
+@typechecked
+def ccache_compiler_args() -> list:
+    # Passed to configure (userspace tool and library) and to make, from where
+    # kbuild picks CC up for the kernel modules
+    return ["CC=ccache gcc", "CXX=ccache g++"]
+
+
+@typechecked
+def build_env() -> Optional[dict]:
+    if ccache_enabled():
+        return ccache_env()
+    return None
+
+
+@typechecked
+def ccache_dkms_settings() -> dict:
+    # Compiler cache settings for the dkms build environment, empty
+    # without compiler cache
+    if not ccache_enabled():
+        return {"CCACHE_ENV": "", "CCACHE_MAKE_ARGS": ""}
+    return {
+        "CCACHE_ENV": f"CCACHE_DIR={ccache_dir} CCACHE_MAXSIZE={ccache_max_size}",
+        "CCACHE_MAKE_ARGS": " ".join([f"'{a}'" for a in ccache_compiler_args()])
+    }
+
+
+@typechecked
+def log_ccache_stats():
+    try:
+        cmd = ["ccache", "--show-stats"]
+        result = exec_cmd(cmd, env=ccache_env())
+    except subprocess.CalledProcessError as e:
+        imsg = "Impossible to get the compiler cache statistics"
+        handle_subprocess_error(e, imsg, exit=False, raise_exception=False)
+        return
+    # Summarize the hit/miss lines of the statistics
+    summary = [l.strip() for l in result.splitlines()
+               if re.search(r"hit|miss", l, re.IGNORECASE)]
+    logger.info("Compiler cache statistics: " + " ; ".join(summary))
+
+
 @typechecked
 def modifyAndCreate(src: str, dst: str, dict: dict):
     try:
@@ -559,18 +1096,8 @@ def get_dkms_name() -> str:
 
 @typechecked
 def find_built_kernel_modules(sources_dir: str) -> list[str]:
-    # Find the kernel modules inside build dir
-    cmd = "find "+sources_dir+" -name '*.ko'"
-    try:
-        result = subprocess.run(
-            cmd, shell=True, check=True, stdout=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to find the kernel modules"
-        handle_subprocess_error(e, imsg, exit=True, raise_exception=False)
-    kernel_modules = result.stdout.decode().split("\n")
-    # remove empty strings
-    kernel_modules = [k for k in kernel_modules if "" != k]
-    return kernel_modules
+    # The kernel modules inside build dir
+    return get_module_inventory(sources_dir).paths()
 
 
 @typechecked
@@ -585,12 +1112,12 @@ def kernel_modules_standard_relative_path(sources_dir: str, built_kernel_modules
 
 
 @typechecked
-def kernel_modules_paths(sources_dir: str) -> list[str]:
-    built_modules = find_built_kernel_modules(sources_dir)
-    rel_paths = kernel_modules_standard_relative_path(
-        sources_dir, built_modules)
-    standard_kernel_modules_path = "/lib/modules/" + kernel_version + "/ethercat/"
-    return [standard_kernel_modules_path + p for p in rel_paths]
+def kernel_modules_paths(sources_dir: str, kernel_release: Optional[str] = None) -> list[str]:
+    if kernel_release is None:
+        kernel_release = get_kernel_version()
+    standard_kernel_modules_path = "/lib/modules/" + kernel_release + "/ethercat/"
+    return [standard_kernel_modules_path + m.relative_path
+            for m in get_module_inventory(sources_dir).modules]
 
 
 @typechecked
@@ -600,13 +1127,10 @@ def create_dkms_config():
     gathered from the first build
     """
     sources_dir = def_source_dir()
-    # Find the kernel modules inside build dir
-    kernel_modules = find_built_kernel_modules(sources_dir)
+    # The kernel modules inside the build dir of the running kernel
+    kernel_modules = get_module_inventory(def_build_dir()).modules
     # Display built modules
-    pretty_print = ""
-    for k in kernel_modules:
-        pretty_print = pretty_print + k + " ; "
-    pretty_print = pretty_print[:-3]
+    pretty_print = " ; ".join([k.path for k in kernel_modules])
     logger.info(f"Built modules: {pretty_print}")
     modules_info = []
     install_mod_dir = None
@@ -617,21 +1141,20 @@ def create_dkms_config():
     else:
         install_mod_dir = opt["default"]
     for k in kernel_modules:
-        p_tot = Path(k)
-        p_build = Path(sources_dir)
-        rel_path = p_tot.relative_to(p_build).parent
         # get only the directory name
+        rel_path = Path(k.relative_path).parent
         dest_path = Path(install_mod_dir).joinpath(rel_path)
-        sp = k.split("/")
         modules_info.append(
             {
-                "module_name": sp[-1].split(".")[0],
+                "module_name": k.name,
                 "module_built": rel_path,
                 "module_dest": dest_path
             }
         )
     dico = {}
     dico["POETRY_BINARY_DIR"] = poetry_binary_dir
+    dico["MAKE_JOBS"] = str(get_make_jobs())
+    dico.update(ccache_dkms_settings())
     # Build the string for BUILT_MODULE_NAME and DEST_MODULE_LOCATION for dkms
     bmn = ""
     for i, m in enumerate(modules_info):
@@ -665,33 +1188,229 @@ def create_dkms_config():
 
 @typechecked
 def get_kernel_module_names() -> list[str]:
-    sources_dir = def_source_dir()
-    # Find the kernel modules inside build dir
-    cmd = "find "+sources_dir+" -name '*.ko'"
+    """
+    Names of the built kernel modules: ec_master then the device modules
+    (ec_generic, ec_e1000e, ...) found in the devices directory and its
+    subdirectories.
+    """
+    inventory = get_module_inventory(def_build_dir())
+    names = []
+    if inventory.get("ec_master") is not None:
+        names.append("ec_master")
+    for m in inventory.modules:
+        if "devices" == Path(m.relative_path).parts[0] and m.name.startswith("ec_"):
+            names.append(m.name)
+    return names
+
+
+@typechecked
+def read_sysconfig_device_modules(cfg_file: str) -> Optional[list]:
+    # DEVICE_MODULES of an existing EtherCAT configuration file
     try:
-        result = subprocess.run(
-            cmd, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to find the kernel modules"
-        handle_subprocess_error(e, imsg, exit=True, raise_exception=False)
-    kernel_modules = result.stdout.decode().split("\n")
-    # remove empty strings
-    kernel_modules = [k for k in kernel_modules if "" != k]
-    # Check that ec_master.ko is in the list
-    master_found = False
-    # Check that in devices ec_xxxx.ko is in the list  of known device modules
-    all_devices_found = []
-    for k in kernel_modules:
-        sp = k.split("/")
-        dir = sp[-2]
-        mod = sp[-1].split(".")[0]
-        if "master" == dir:
-            if "ec_master" == mod:
-                master_found = True
-        elif "devices" == dir:
-            mod = mod[3:]  # remove the ec_ prefix
-            all_devices_found.append(mod)
-    return ["ec_" + x for x in all_devices_found].append("ec_master")
+        with open(cfg_file, "r") as f:
+            for l in f:
+                if l.startswith("DEVICE_MODULES="):
+                    value = l[len("DEVICE_MODULES="):].strip().strip('"')
+                    return value.split()
+    except OSError:
+        pass
+    return None
+
+
+@typechecked
+def selected_device_modules() -> list:
+    """
+    Device modules the EtherCAT master is configured to load: the modules
+    chosen by update_ethercat_config, otherwise the modules proposed for
+    the EtherCAT interfaces if auto_select_device_modules is set,
+    otherwise device_modules, otherwise
+    DEVICE_MODULES of the installed configuration file. The generic driver
+    is always part of the selection as a fallback.
+    """
+    selected = None
+    if len(in_use_device_modules) > 0:
+        selected = list(in_use_device_modules)
+    elif auto_select_device_modules:
+        selected = propose_device_modules(guess_ethercat_interfaces())
+    elif device_modules is not None:
+        selected = device_modules.split()
+    else:
+        selected = read_sysconfig_device_modules(cfg_path + "/ethercat")
+    if selected is None:
+        selected = []
+    for module in selected:
+        if module not in known_device_modules:
+            logger.error(f"Invalid device module: {module}")
+            raise Exception("Invalid device module")
+    return [m for m in known_device_modules if m in selected or "generic" == m]
+
+
+@typechecked
+def driver_switch_active(name: str, selected: Optional[list] = None) -> bool:
+    # The driver switches follow the selected device modules if
+    # derive_driver_switches is set, the automatically selected modules
+    # are enabled, the other switches follow their «active» value
+    if name in known_device_modules and (derive_driver_switches or auto_select_device_modules):
+        if selected is None:
+            selected = selected_device_modules()
+        if derive_driver_switches:
+            return name in selected
+        if name in selected:
+            return True
+    return configure_switches[name]["active"]
+
+
+@typechecked
+def compiled_device_modules(build_dir: str) -> set:
+    # Device modules built in build_dir (ec_<module>.ko)
+    compiled = set()
+    if not os.path.isdir(build_dir):
+        return compiled
+    for mod in get_module_inventory(build_dir).names():
+        if mod.startswith("ec_") and mod[3:] in known_device_modules:
+            compiled.add(mod[3:])
+    return compiled
+
+
+@typechecked
+def configure_command(configure_script: str = "./configure", linux_dir: Optional[str] = None) -> list:
+    """
+    Create the configure command from configure_options and configure_switches.
+    linux_dir, if given, overrides the --with-linux-dir option to build for
+    another kernel than the running one.
+    """
+    configure_cmd = [configure_script]
+    for k, v in configure_options.items():
+        if "--with-linux-dir" == k and linux_dir is not None:
+            configure_cmd.append(f"{k}={linux_dir}")
+        elif v["active"]:
+            if v["value"] is not None:
+                if v["default"] != v["value"]:
+                    configure_cmd.append(f"{k}={v['value']}")
+            else:
+                configure_cmd.append(f"{v['value']}")
+    selected = None
+    if derive_driver_switches or auto_select_device_modules:
+        selected = selected_device_modules()
+        logger.info(f"Building the drivers: {' '.join(selected)}")
+    for k, v in configure_switches.items():
+        if driver_switch_active(k, selected):
+            if v["default"] != v["active_value"]:
+                configure_cmd.append(v["active_value"])
+        else:
+            inactive_value = v.get("inactive_value", None)
+            if inactive_value is not None:
+                if v["default"] != inactive_value:
+                    configure_cmd.append(v["inactive_value"])
+    if ccache_enabled():
+        configure_cmd.extend(ccache_compiler_args())
+    return configure_cmd
+
+
+@typechecked
+def get_git_commit(source_dir: str) -> Optional[str]:
+    branch, commit = read_head(source_dir)
+    if commit is None:
+        logger.info(f"Could not get the git commit of {source_dir}")
+    return commit
+
+
+@typechecked
+def get_toolchain_version() -> str:
+    try:
+        result = subprocess.run(["gcc", "--version"],
+                                check=True,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        return result.stdout.decode().split("\n")[0].strip()
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.info(f"Could not get the toolchain version: {e}")
+        return "unknown"
+
+
+@typechecked
+def compute_config_fingerprint(source_dir: str, configure_cmd: list, kernel_release: str) -> str:
+    """
+    Fingerprint of a configured source tree: git commit, rendered configure
+    command line, kernel version and toolchain version.
+    """
+    data = {
+        "git_commit": get_git_commit(source_dir),
+        "configure": configure_cmd,
+        "kernel": kernel_release,
+        "toolchain": get_toolchain_version()
+    }
+    serialized = json.dumps(data, sort_keys=True).encode()
+    return hashlib.sha256(serialized).hexdigest()
+
+
+@typechecked
+def config_fingerprint_file(source_dir: str) -> str:
+    # Stored next to the source directory so that it survives make clean
+    return f"{source_dir}.config_fingerprint"
+
+
+@typechecked
+def save_config_fingerprint(source_dir: str, fingerprint: str):
+    with open(config_fingerprint_file(source_dir), "w") as f:
+        f.write(fingerprint + "\n")
+    record_file(config_fingerprint_file(source_dir))
+
+
+@typechecked
+def remove_config_fingerprint(source_dir: str):
+    if os.path.exists(config_fingerprint_file(source_dir)):
+        os.remove(config_fingerprint_file(source_dir))
+
+
+@typechecked
+def configuration_is_up_to_date(source_dir: str, fingerprint: str) -> bool:
+    # A configured tree has a Makefile generated by configure
+    if not os.path.exists(os.path.join(source_dir, "Makefile")):
+        return False
+    try:
+        with open(config_fingerprint_file(source_dir), "r") as f:
+            return fingerprint == f.read().strip()
+    except OSError:
+        return False
+
+
+@typechecked
+def current_module_cache_key(source_dir: str, fingerprint: str, kernel_release: str) -> str:
+    return module_cache_key(kernel_release,
+                            kernel_config_hash(kernel_release, logger),
+                            get_git_commit(source_dir),
+                            fingerprint)
+
+
+@typechecked
+def store_built_modules_in_cache(build_dir: str, cache_key: str, kernel_release: str):
+    files = get_module_inventory(build_dir).paths()
+    # kbuild needs the symbol and order files to install the modules
+    for d in set([build_dir] + [os.path.dirname(f) for f in files]):
+        for name in ["modules.order", "Module.symvers"]:
+            if os.path.exists(os.path.join(d, name)):
+                files.append(os.path.join(d, name))
+    metadata = {
+        "kernel": kernel_release,
+        "git_branch": git_branch
+    }
+    try:
+        module_cache_store(module_cache_dir, cache_key, build_dir,
+                           files, metadata, module_cache_max_size_mb, logger)
+    except OSError as e:
+        logger.warning(f"Impossible to store the modules in the cache: {e}")
+
+
+@typechecked
+def export_module_cache(archive: str):
+    module_cache_export(module_cache_dir, archive, logger)
+
+
+@typechecked
+def import_module_cache(archive: str):
+    module_cache_import(module_cache_dir, archive,
+                        module_cache_max_size_mb, logger)
 
 
 @typechecked
@@ -710,9 +1429,9 @@ def reload_parameters():
     # Dynamically import all elements
     globals().update(vars(sys.modules['parameters']))
 
-    # Get the current kernel version
+    # The kernel version is read again when needed
     global kernel_version
-    kernel_version = subprocess.check_output(["uname", "-r"]).strip().decode()
+    kernel_version = None
 
 
 ###############################
@@ -720,94 +1439,127 @@ def reload_parameters():
 ###############################
 
 
+@recorded_phase("deps")
 @typechecked
-def build_module(do_install_dependencies: bool = True, check_secure_boot: bool = True):
-    if do_install_dependencies:
-        # Install the required dependencies
-        # (if a network connection is available)
-        logger.info("Installing dependencies...")
+def install_dependencies():
+    # Install the required dependencies
+    # (if a network connection is available)
+    logger.info("Installing dependencies...")
+    to_install = list(dependencies)
+    if use_ccache:
+        to_install.append("ccache")
+    installed = get_installed_packages(logger)
+    missing = [d for d in to_install if d not in installed]
+    if 0 == len(missing):
+        logger.info("All the dependencies are already installed")
+        return
+    index_age = apt_index_age(logger)
+    if index_age is None or apt_update_ttl < index_age:
         try:
             cmd = ["apt-get", "update"]
-            result = exec_cmd(cmd)
+            exec_cmd(cmd)
         except subprocess.CalledProcessError as e:
             imsg = "Impossible to run apt-get update"
             handle_subprocess_error(e, imsg, exit=False, raise_exception=False)
-        for d in dependencies:
-            try:
-                cmd = ["apt-get", "install", "-y", d]
-                result = exec_cmd(cmd)
-            except subprocess.CalledProcessError as e:
-                imsg = f"Impossible to install {d}"
-                handle_subprocess_error(
-                    e, imsg, exit=False, raise_exception=False)
-    if check_secure_boot:
-        # Check the secure boot state
-        check_secure_boot_state()
+    else:
+        logger.info(
+            f"Package index updated {int(index_age)}s ago, skipping apt-get update")
+    # Install all the missing packages in a single transaction
+    try:
+        cmd = ["apt-get", "install", "-y"] + missing
+        exec_cmd(cmd)
+    except subprocess.CalledProcessError as e:
+        imsg = f"Impossible to install {' '.join(missing)}"
+        handle_subprocess_error(
+            e, imsg, exit=False, raise_exception=False)
 
-    # Create the source directory name
-    source_dir = def_source_dir()
-    record_directory(source_dir)
+
+@typechecked
+def checkout_pinned_commit(source_dir: str) -> bool:
+    """
+    Make sure the checkout is at git_commit. The state is read from the .git
+    directory, git is only run when the commit must be fetched or checked out.
+    """
+    if not is_full_sha(git_commit):
+        imsg = f"git_commit must be a full 40 characters sha: {git_commit}"
+        logger.error(imsg)
+        raise Exception(imsg)
+    branch, head = read_head(source_dir)
+    if git_commit == head:
+        logger.info(f"Source code is at the pinned commit {git_commit}")
+        return True
+    try:
+        if not has_object(source_dir, git_commit):
+            logger.info(f"Fetching the pinned commit {git_commit}...")
+            cmd = ["git", "fetch", "origin", git_commit]
+            if os.path.exists(os.path.join(find_common_dir(find_git_dir(source_dir)), "shallow")):
+                cmd.insert(2, "--depth=1")
+            exec_cmd(cmd, timeout=git_network_timeout, cwd=source_dir)
+        # Stash the changes
+        cmd = ["git", "stash"]
+        exec_cmd(cmd, check=False, cwd=source_dir)
+        cmd = ["git", "checkout", "--detach", git_commit]
+        exec_cmd(cmd, cwd=source_dir)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        imsg = f"Impossible to checkout the pinned commit {git_commit}"
+        handle_subprocess_error(e, imsg, exit=False, raise_exception=False)
+    branch, head = read_head(source_dir)
+    return git_commit == head
+
+
+@recorded_phase("git sync")
+@typechecked
+def sync_sources(source_dir: str):
     # Check if the source directory exists and is up-to-date
     # (if a network connection is available)
     got_sources = False
     if os.path.exists(source_dir):
         # Check if the source directory contains the correct git repository
-        os.chdir(source_dir)
-        correct_git_repo = False
-        try:
-            cmd = ["git", "remote", "-v"]
-            result = exec_cmd(cmd)
-            if git_project in result:
-                correct_git_repo = True
-        except subprocess.CalledProcessError as e:
-            imsg = "Impossible to check the git repository"
-            handle_subprocess_error(e, imsg, exit=False, raise_exception=False)
-            correct_git_repo = False
-        if correct_git_repo:
+        correct_git_repo = git_project in read_remote_urls(source_dir).values()
+        if correct_git_repo and git_commit is not None:
+            got_sources = checkout_pinned_commit(source_dir)
+        elif correct_git_repo:
             # Update the source code
             logger.info("Updating source code...")
             try:
                 try:
                     cmd = ["git", "pull"]
-                    result = exec_cmd(cmd)
-                except subprocess.CalledProcessError as e:
+                    exec_cmd(cmd, timeout=git_network_timeout, cwd=source_dir)
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
                     imsg = "Impossible to update the source code"
                     handle_subprocess_error(
                         e, imsg, exit=False, raise_exception=False)
                 # Check the current branch
-                try:
-                    cmd = ["git", "branch", "--show-current"]
-                    result = exec_cmd(cmd)
-                    if git_branch.strip() == result.strip():
-                        got_sources = True
-                        imsg = f"Source code is on the correct branch {git_branch}"
-                        logger.info(imsg)
-                    else:
-                        # Stash the changes
-                        try:
-                            cmd = ["git", "stash"]
-                            result = exec_cmd(cmd)
-                        except subprocess.CalledProcessError as e:
-                            imsg = "Impossible to stash the changes"
-                            handle_subprocess_error(
-                                e, imsg, exit=False, raise_exception=True)
-                        # Checkout the correct branch
-                        try:
-                            cmd = ["git", "checkout", git_branch]
-                            result = exec_cmd(cmd)
-                        except subprocess.CalledProcessError as e:
-                            imsg = f"Impossible to checkout the branch {git_branch}"
-                            handle_subprocess_error(
-                                e, imsg, exit=False, raise_exception=True)
-                except subprocess.CalledProcessError as e:
-                    imsg = "Impossible to check the current branch"
-                    handle_subprocess_error(
-                        e, imsg, exit=False, raise_exception=True)
+                current_branch, head = read_head(source_dir)
+                if git_branch.strip() == current_branch:
+                    got_sources = True
+                    imsg = f"Source code is on the correct branch {git_branch}"
+                    logger.info(imsg)
+                else:
+                    # Stash the changes
+                    try:
+                        cmd = ["git", "stash"]
+                        exec_cmd(cmd, cwd=source_dir)
+                    except subprocess.CalledProcessError as e:
+                        imsg = "Impossible to stash the changes"
+                        handle_subprocess_error(
+                            e, imsg, exit=False, raise_exception=True)
+                    # Checkout the correct branch
+                    try:
+                        cmd = ["git", "checkout", git_branch]
+                        exec_cmd(cmd, cwd=source_dir)
+                    except subprocess.CalledProcessError as e:
+                        imsg = f"Impossible to checkout the branch {git_branch}"
+                        handle_subprocess_error(
+                            e, imsg, exit=False, raise_exception=True)
                 got_sources = True
             except Exception as e:
                 imsg = f"Impossible to validate that a proper version of the source code is available: {e}"
                 logger.error(imsg)
                 got_sources = False
+        else:
+            logger.info(
+                f"{source_dir} is not a checkout of {git_project}")
 
     if not got_sources:
         # Clean the mess and remove the source directory if it exists
@@ -818,16 +1570,9 @@ def build_module(do_install_dependencies: bool = True, check_secure_boot: bool =
         clone_sources(source_dir)
         got_sources = True
 
-    # Clean the source directory
-    logger.info("Cleaning source directory...")
-    os.chdir(source_dir)
-    try:
-        cmd = ["make", "clean"]
-        exec_cmd(cmd)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to clean the source directory"
-        handle_subprocess_error(e, imsg, exit=True, raise_exception=True)
 
+@typechecked
+def remove_previous_generated_files():
     # Remove the files generated by a previous build
     logger.info("Cleaning previous generated files...")
     for file in installed_files:
@@ -838,6 +1583,10 @@ def build_module(do_install_dependencies: bool = True, check_secure_boot: bool =
                 logger.info(
                     f"Impossible to remove {file}: {e}. Maybe you need to run the script as root.")
 
+
+@recorded_phase("bootstrap")
+@typechecked
+def bootstrap_sources(source_dir: str):
     # Create the configure script
     logger.info("Creating configure script...")
     os.chdir(source_dir)
@@ -845,8 +1594,10 @@ def build_module(do_install_dependencies: bool = True, check_secure_boot: bool =
         cmd = ["./bootstrap"]
         result = exec_cmd(cmd)
     except subprocess.CalledProcessError as e:
-        imsg = "Impossible to run the bootstrap script"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+        result = e.output.decode("utf-8", errors="replace") if e.output else ""
+        if "You should run autoupdate" not in result:
+            imsg = "Impossible to run the bootstrap script"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
     if "You should run autoupdate" in result:
         try:
             cmd = ["autoupdate"]
@@ -862,76 +1613,358 @@ def build_module(do_install_dependencies: bool = True, check_secure_boot: bool =
             handle_subprocess_error(e, imsg, exit=True, raise_exception=True)
     os.chdir(project_dir)
 
-    # Configure the source code
-    logger.info("Configuring source code...")
-    os.chdir(source_dir)
-    # Create the configure command
-    configure_cmd = ["./configure"]
-    for k, v in configure_options.items():
-        if v["active"]:
-            if v["value"] is not None:
-                if v["default"] != v["value"]:
-                    configure_cmd.append(f"{k}={v['value']}")
-            else:
-                configure_cmd.append(f"{v['value']}")
-    for k, v in configure_switches.items():
-        if v["active"]:
-            if v["default"] != v["active_value"]:
-                configure_cmd.append(v["active_value"])
-        else:
-            inactive_value = v.get("inactive_value", None)
-            if inactive_value is not None:
-                if v["default"] != inactive_value:
-                    configure_cmd.append(v["inactive_value"])
-    # Run the configure command
+
+@typechecked
+def out_of_tree_source_copy(source_dir: str) -> str:
+    # Checkout used by the out-of-tree builds when the sources are
+    # configured in place
+    return f"{source_dir}-src"
+
+
+@typechecked
+def bootstrap_commit_file(source_dir: str) -> str:
+    # Stored next to the source directory, like the configuration fingerprint
+    return f"{source_dir}.bootstrap_commit"
+
+
+@typechecked
+def sync_source_copy(source_dir: str, copy_dir: str, commit: str):
+    # A shared clone: the objects stay in the checkout (alternates), only
+    # the working tree is written
     try:
-        cmd_joined = " ".join(configure_cmd)
-        logger.info(f"Configure command: {cmd_joined}")
-        exec_cmd(configure_cmd)
+        if find_git_dir(copy_dir) is None:
+            if os.path.exists(copy_dir):
+                shutil.rmtree(copy_dir)
+            logger.info(f"Creating the source copy {copy_dir} for the out-of-tree builds...")
+            cmd = ["git", "clone", "--shared", source_dir, copy_dir]
+            exec_cmd(cmd)
+        branch, head = read_head(copy_dir)
+        if commit != head:
+            logger.info(f"Checking out {commit} in {copy_dir}...")
+            cmd = ["git", "-C", copy_dir, "checkout",
+                   "--force", "--detach", commit]
+            exec_cmd(cmd)
     except subprocess.CalledProcessError as e:
-        imsg = "Impossible to configure the source code"
+        imsg = f"Impossible to update the source copy {copy_dir}"
         handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    record_directory(copy_dir)
+
+
+@typechecked
+def prepare_out_of_tree_sources(source_dir: str) -> str:
+    """
+    Return the sources to configure out of the tree. autoconf refuses to
+    configure elsewhere a source tree configured in place: the in-tree
+    configuration (the build of the running kernel) is kept and a copy of
+    the checkout at the same commit is used instead. Uncommitted changes of
+    the checkout are not in the copy. The configure script is generated
+    again when the commit changes.
+    """
+    commit = get_git_commit(source_dir)
+    sources = source_dir
+    if os.path.exists(os.path.join(source_dir, "config.status")):
+        if commit is None:
+            imsg = f"Impossible to build out of the tree: {source_dir} is configured in place and is not a git checkout"
+            logger.error(imsg)
+            raise Exception(imsg)
+        sources = out_of_tree_source_copy(source_dir)
+        sync_source_copy(source_dir, sources, commit)
+    stamp_file = bootstrap_commit_file(sources)
+    bootstrapped_commit = None
+    try:
+        with open(stamp_file, "r") as f:
+            bootstrapped_commit = f.read().strip()
+    except OSError:
+        pass
+    if commit is None or commit != bootstrapped_commit or not os.path.exists(os.path.join(sources, "configure")):
+        bootstrap_sources(sources)
+        if commit is not None:
+            with open(stamp_file, "w") as f:
+                f.write(commit + "\n")
+            record_file(stamp_file)
+    else:
+        logger.info(f"Configure script of {sources} up to date with commit {commit}")
+    return sources
+
+
+@typechecked
+def build_for_kernel(source_dir: str, build_dir: str, kernel_release: str, linux_dir: Optional[str] = None, run_bootstrap: bool = True) -> list[str]:
+    """
+    Configure and build the sources of source_dir in build_dir for a
+    kernel release. build_dir is either source_dir (in-tree build) or a
+    separate directory (out-of-tree build, source_dir must be the sources
+    returned by prepare_out_of_tree_sources). Out of the source tree
+    the build is done in a directory per configuration, build_dir is
+    linked to it once built. Returns the standard installation paths of
+    the built kernel modules.
+    """
+    out_of_tree = os.path.abspath(build_dir) != os.path.abspath(source_dir)
+    # Create the configure command
+    env = build_env()
+    if env is not None:
+        os.makedirs(ccache_dir, exist_ok=True)
+    if out_of_tree:
+        configure_cmd = configure_command(
+            os.path.join(source_dir, "configure"), linux_dir)
+    else:
+        configure_cmd = configure_command(linux_dir=linux_dir)
+    # Skip the clean/bootstrap/configure phases if nothing changed
+    # since the last configuration
+    fingerprint = compute_config_fingerprint(
+        source_dir, configure_cmd, kernel_release)
+    if out_of_tree:
+        link_dir = build_dir
+        build_dir = configuration_build_dir(link_dir, fingerprint)
+        logger.info(f"Build directory of the configuration: {build_dir}")
+    reuse_configuration = configuration_is_up_to_date(build_dir, fingerprint)
+
+    if reuse_configuration:
+        logger.info(
+            "Configuration fingerprint unchanged, skipping clean, bootstrap and configure")
+    else:
+        remove_config_fingerprint(build_dir)
+        # Clean the build directory
+        logger.info("Cleaning build directory...")
+        os.makedirs(build_dir, exist_ok=True)
+        os.chdir(build_dir)
+        if os.path.exists(os.path.join(build_dir, "Makefile")):
+            try:
+                cmd = ["make", "clean"]
+                exec_cmd(cmd)
+            except subprocess.CalledProcessError as e:
+                imsg = "Impossible to clean the build directory"
+                handle_subprocess_error(
+                    e, imsg, exit=True, raise_exception=True)
+        if run_bootstrap:
+            bootstrap_sources(source_dir)
+
+        # Configure the source code
+        logger.info("Configuring source code...")
+        os.chdir(build_dir)
+        # Run the configure command
+        with phase("configure"):
+            try:
+                cmd_joined = " ".join(configure_cmd)
+                logger.info(f"Configure command: {cmd_joined}")
+                exec_cmd(configure_cmd, env=env)
+            except subprocess.CalledProcessError as e:
+                imsg = "Impossible to configure the source code"
+                handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+        save_config_fingerprint(build_dir, fingerprint)
+    os.chdir(build_dir)
     #
+    # Restore the kernel modules from the module cache if possible
+    modules_from_cache = False
+    if use_module_cache:
+        cache_key = current_module_cache_key(
+            source_dir, fingerprint, kernel_release)
+        modules_from_cache = module_cache_restore(
+            module_cache_dir, cache_key, build_dir, logger)
     # Build the module
-    logger.info("Building module...")
-    try:
-        cmd = ["make", "all", "modules"]
-        exec_cmd(cmd)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to build the module"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    logger.info(
+        f"Building module for kernel {kernel_release} with {get_make_jobs()} parallel jobs...")
+    with phase("make"):
+        try:
+            if modules_from_cache:
+                # Only the userspace tool and library remain to be built
+                cmd = make_cmd(["all"])
+            else:
+                cmd = make_cmd(["all", "modules"])
+            if env is not None:
+                cmd.extend(ccache_compiler_args())
+                exec_cmd(["ccache", "--zero-stats"], env=env)
+            exec_cmd(cmd, env=env)
+        except subprocess.CalledProcessError as e:
+            imsg = "Impossible to build the module"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    if env is not None:
+        log_ccache_stats()
+    # The build changed the modules: the inventory is made again, once,
+    # before the modules are stored in the cache
+    inventory = get_module_inventory(build_dir, refresh=True)
+    if use_module_cache and not modules_from_cache:
+        store_built_modules_in_cache(build_dir, cache_key, kernel_release)
+    for m in inventory.mismatched_vermagic(kernel_release):
+        logger.warning(
+            f"Module {m.name} was built for kernel {m.vermagic.split()[0]}, not for {kernel_release}")
     # Get the built kernel modules and record their standard installation path
-    built_modules = kernel_modules_paths(source_dir)
+    built_modules = kernel_modules_paths(build_dir, kernel_release)
     for m in built_modules:
         record_file(m)
+    if out_of_tree:
+        activate_build_dir(link_dir, build_dir)
+        prune_configuration_build_dirs(link_dir, kept_build_configurations)
     os.chdir(project_dir)
+    return built_modules
 
 
 @typechecked
-def install_module():
-    # Install the modules
-    logger.info("Installing module...")
+def build_module(do_install_dependencies: bool = True, check_secure_boot: bool = True, do_sync_sources: bool = True, kernel_release: Optional[str] = None):
+    """
+    Build the modules for the running kernel, or for kernel_release whose
+    headers are installed in /lib/modules: always out of the source tree,
+    in def_build_dir(kernel_release), without removing the installed files.
+    """
+    if do_install_dependencies:
+        install_dependencies()
+    if check_secure_boot:
+        # Check the secure boot state
+        check_secure_boot_state()
+
+    # Create the source directory name
     source_dir = def_source_dir()
-    os.chdir(source_dir)
+    record_directory(source_dir)
+    if do_sync_sources:
+        sync_sources(source_dir)
+    if kernel_release is not None:
+        # Prebuild for a kernel, possibly the running one: the in-tree
+        # build and the installed userspace files are kept, post_install
+        # is not run
+        sources = prepare_out_of_tree_sources(source_dir)
+        build_for_kernel(sources, def_build_dir(kernel_release),
+                         kernel_release,
+                         linux_dir=os.path.join(
+                             modules_root_dir, kernel_release, "build"),
+                         run_bootstrap=False)
+        return
+    remove_previous_generated_files()
+    if out_of_tree_builds:
+        sources = prepare_out_of_tree_sources(source_dir)
+        build_for_kernel(sources, def_build_dir(get_kernel_version()),
+                         get_kernel_version(), run_bootstrap=False)
+    else:
+        build_for_kernel(source_dir, source_dir, get_kernel_version())
+
+
+@typechecked
+def _build_kernel_worker(source_dir: str, kernel_release: str, jobs: int) -> dict:
+    # Runs in a worker process: the parameters are private to the process
+    global make_jobs
+    make_jobs = jobs
+    build_dir = def_build_dir(kernel_release)
+    report = {
+        "kernel": kernel_release,
+        "build_dir": build_dir,
+        "success": False,
+        "modules": [],
+        "error": None
+    }
+    start = time.time()
     try:
-        cmd = ["make", "modules_install"]
-        exec_cmd(cmd)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to install the module"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+        report["modules"] = build_for_kernel(
+            source_dir, build_dir, kernel_release,
+            linux_dir=os.path.join(modules_root_dir, kernel_release, "build"),
+            run_bootstrap=False)
+        report["success"] = True
+    except (Exception, SystemExit) as e:
+        report["error"] = str(e)
+        logger.error(f"Build for kernel {kernel_release} failed: {e}")
+    report["duration"] = time.time() - start
+    return report
+
+
+@typechecked
+def build_modules_for_all_kernels(do_install_dependencies: bool = True, check_secure_boot: bool = True, kernels: Optional[list] = None, max_workers: Optional[int] = None) -> dict:
+    """
+    Build the modules for every kernel with an installed header tree (or for
+    the given kernels) in parallel worker processes. Each kernel gets its own
+    out-of-tree build directory over the shared source checkout. A summary
+    report is written to multi_kernel_build_report.json and returned.
+    """
+    start = time.time()
+    if do_install_dependencies:
+        install_dependencies()
+    if check_secure_boot:
+        check_secure_boot_state()
+    if kernels is None:
+        kernels = list_installed_kernels()
+    if 0 == len(kernels):
+        imsg = f"No kernel header tree found in {modules_root_dir}/*/build"
+        logger.error(imsg)
+        raise Exception(imsg)
+
+    source_dir = def_source_dir()
+    record_directory(source_dir)
+    sync_sources(source_dir)
+    # The installed userspace files and the in-tree build of the running
+    # kernel are kept
+    sources = prepare_out_of_tree_sources(source_dir)
+    record_directory(f"{source_dir}-build")
+
+    # Share the make jobs between the workers
+    if max_workers is None:
+        max_workers = min(len(kernels), get_online_cpus())
+    max_workers = max(1, max_workers)
+    jobs = max(1, get_make_jobs() // max_workers)
+    logger.info(
+        f"Building for kernels {', '.join(kernels)} with {max_workers} workers of {jobs} make jobs each...")
+    results = []
+    import multiprocessing
+    import concurrent.futures
+    # fork keeps the parameters set by the caller and the logger
+    mp_context = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        futures = [executor.submit(_build_kernel_worker, sources, k, jobs)
+                   for k in kernels]
+        for f in concurrent.futures.as_completed(futures):
+            results.append(f.result())
+    results.sort(key=lambda r: r["kernel"])
+    # The files recorded by the workers are lost with their process
+    for r in results:
+        record_directory(r["build_dir"])
+        for m in r["modules"]:
+            record_file(m)
+
+    report = {
+        "source_dir": source_dir,
+        "git_commit": get_git_commit(source_dir),
+        "workers": max_workers,
+        "jobs_per_worker": jobs,
+        "duration": time.time() - start,
+        "kernels": results
+    }
+    report_file = os.path.join(project_dir, multi_kernel_build_report_name)
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+    for r in results:
+        status = "OK" if r["success"] else f"FAILED ({r['error']})"
+        logger.info(
+            f"Kernel {r['kernel']}: {status} in {r['duration']:.1f}s, {len(r['modules'])} modules")
+    logger.info(f"Multi-kernel build report written to {report_file}")
+    return report
+
+
+@typechecked
+def install_module(kernel_release: Optional[str] = None):
+    # Install the modules
+    logger.info("Installing module...")
+    build_dir = def_build_dir(kernel_release)
+    os.chdir(build_dir)
+    with phase("modules_install"):
+        try:
+            cmd = make_cmd(["modules_install"])
+            exec_cmd(cmd)
+        except subprocess.CalledProcessError as e:
+            imsg = "Impossible to install the module"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
 
     # Run depmod to update module dependencies
     logger.info("Running depmod...")
-    try:
-        subprocess.run(["depmod"],
-                       check=True,
-                       stdout=subprocess.PIPE,
-                       stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to run depmod"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    cmd = ["depmod"]
+    if kernel_release is not None:
+        cmd.append(kernel_release)
+    with phase("depmod"):
+        try:
+            subprocess.run(cmd,
+                           check=True,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            imsg = "Impossible to run depmod"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
 
 
+@recorded_phase("master start check")
 @typechecked
 def check_master_starts() -> bool:
     # Check if the master starts
@@ -964,32 +1997,153 @@ def check_master_starts() -> bool:
     return True
 
 
+# Files of the userspace directories of a build not installed by «make
+# install»: the build intermediates and the Makefiles, which hold the
+# kernel directory
+userspace_build_files_reg = re.compile(
+    r"^(\.deps|Makefile|Makefile\.in|Makefile\.am|.*\.(o|lo|Po|Plo|dirstamp))$")
+
+
+@typechecked
+def userspace_artifacts_digest(build_dir: str, source_dir: str) -> str:
+    """
+    Digest of the content of the files installed by «make install»:
+    tools, library and scripts of the build, headers of the sources. The
+    files are keyed by their path relative to the build directory, so the
+    same artifacts rebuilt for another kernel, in another build directory,
+    have the same digest.
+    """
+    def ignored(name):
+        return userspace_build_files_reg.match(name) is not None
+
+    digests = tree_content_digests(
+        build_dir, ["tool", "lib", "script"], ignored)
+    for path, digest in tree_content_digests(source_dir, ["include"], ignored).items():
+        digests[os.path.join("sources", path)] = digest
+    return strings_digest(sorted(digests.items()))
+
+
+@typechecked
+def installed_userspace_unchanged(install_dir: str, installed: dict) -> bool:
+    # The files written by the last «make install» still have the content
+    # it wrote
+    if 0 == len(installed):
+        return False
+    return installed == files_content_digests(install_dir, list(installed.keys()))
+
+
+@typechecked
+def links_are_up_to_date(install_dir: str) -> bool:
+    for l in links_to_create:
+        link = l[0].format(install_path=install_dir)
+        if not os.path.islink(l[1]) or link != os.readlink(l[1]):
+            return False
+    return True
+
+
 @typechecked
 def post_install(override_config: bool = False):
+    """
+    Install the userspace tools and the configuration of the master. The
+    checksums of the inputs and outputs of each step are kept in a
+    manifest: the steps whose inputs and outputs did not change since the
+    last run are skipped, so that a kernel update only refreshes the
+    kernel specific parts.
+    """
     logger.info("Post install tasks...")
-    source_dir = def_source_dir()
-    os.chdir(source_dir)
+    build_dir = def_build_dir()
+    manifest_file = os.path.join(project_dir, post_install_manifest_name)
+    previous_manifest = load_checksum_manifest(manifest_file, logger)
+    manifest = {}
     # Run depmod to update module dependencies
     logger.info("Running depmod...")
-    try:
-        cmd = ["depmod", "-a"]
-        result = exec_cmd(cmd)
-    except subprocess.CalledProcessError as e:
-        str_cmd = " ".join(cmd)
-        imsg = f"Impossible to run {str_cmd}"
-        handle_subprocess_error(e, imsg, exit=True, raise_exception=False)
-    # Install tools
-    try:
-        subprocess.run(["make", "install"],
-                       check=True,
-                       stdout=subprocess.PIPE,
-                       stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to install the ethercat tools"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
+    with phase("depmod"):
+        try:
+            cmd = ["depmod", "-a"]
+            exec_cmd(cmd)
+        except subprocess.CalledProcessError as e:
+            str_cmd = " ".join(cmd)
+            imsg = f"Impossible to run {str_cmd}"
+            handle_subprocess_error(e, imsg, exit=True, raise_exception=False)
+    if configure_options["--prefix"]["active"]:
+        install_dir = configure_options["--prefix"]["value"]
+    else:
+        install_dir = configure_options["--prefix"]["default"]
+    # Install tools, unless the artifacts did not change since the last
+    # «make install» and the files it wrote are still there
+    previous_install = previous_manifest.get("make_install", {})
+    make_install = {
+        "inputs": userspace_artifacts_digest(build_dir, def_source_dir()),
+        "outputs": previous_install.get("outputs", {})
+    }
+    if make_install["inputs"] == previous_install.get("inputs", None) and installed_userspace_unchanged(install_dir, make_install["outputs"]):
+        logger.info("Userspace tools unchanged, skipping make install")
+    else:
+        # Margin for the coarse clock of the file system timestamps
+        install_start_ns = time.time_ns() - 1000000000
+        with phase("make install"):
+            try:
+                subprocess.run(make_cmd(["install"]),
+                               check=True,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               cwd=build_dir)
+            except subprocess.CalledProcessError as e:
+                imsg = "Impossible to install the ethercat tools"
+                handle_subprocess_error(
+                    e, imsg, exit=False, raise_exception=True)
+        make_install["outputs"] = files_content_digests(
+            install_dir, files_modified_since(install_dir, install_start_ns))
+    manifest["make_install"] = make_install
+    # Create install directory if it does not exist
+    if not os.path.exists(install_dir):
+        os.makedirs(install_dir)
+    record_directory(install_dir)
+    if links_are_up_to_date(install_dir):
+        logger.info("Symbolic links unchanged")
+        for l in links_to_create:
+            record_file(l[1])
+    else:
+        create_symbolic_links(install_dir)
+    #
+    # The configuration may prompt the user: it runs on its own, before
+    # the udev rule
+    with phase("configuration files"):
+        install_configuration_files(install_dir, override_config)
+    udev_rule_digest = hashlib.sha256(udev_rule.encode()).hexdigest()
+    if udev_rule_digest == file_digest(udev_rule_file) and udev_rule_digest == previous_manifest.get("udev_rule", None):
+        logger.info("Udev rule unchanged, skipping the udev reload")
+        record_file(udev_rule_file)
+    else:
+        with phase("udev rule"):
+            install_udev_rule()
+    manifest["udev_rule"] = udev_rule_digest
+    # Check that the master starts, unless it already started with the
+    # same kernel, modules and configuration
+    master_check = strings_digest([
+        get_kernel_version(),
+        tree_stat_digest(kernel_modules_paths(build_dir)),
+        file_digest(cfg_path + "/ethercat"),
+        file_digest(udev_rule_file)
+    ])
+    if master_check == previous_manifest.get("master_check", None):
+        logger.info("Kernel modules and configuration unchanged, skipping the master start check")
+    elif not check_master_starts():
+        logger.error("The master did not start")
+        raise Exception("The master did not start")
+    else:
+        logger.info("Success! The EtherCAT master starts correctly")
+    manifest["master_check"] = master_check
+    save_checksum_manifest(manifest_file, manifest)
+    # Post install is finished with success
+    logger.info("Success: post install finished")
+
+
+@typechecked
+def create_symbolic_links(install_dir: str):
     # Remove symbolic links if they exist
     for l in links_to_create:
-        if os.path.exists(l[1]):
+        if os.path.lexists(l[1]):
             try:
                 os.remove(l[1])
             except Exception as e:
@@ -999,14 +2153,6 @@ def post_install(override_config: bool = False):
 
     # Create symbolic links
     logger.info("Creating symbolic links...")
-    if configure_options["--prefix"]["active"]:
-        install_dir = configure_options["--prefix"]["value"]
-    else:
-        install_dir = configure_options["--prefix"]["default"]
-    # Create install directory if it does not exist
-    if not os.path.exists(install_dir):
-        os.makedirs(install_dir)
-    record_directory(install_dir)
     for l in links_to_create:
         try:
             # Check that links_to_create contains couple of strings
@@ -1022,6 +2168,10 @@ def post_install(override_config: bool = False):
             logger.error(
                 f"Impossible to create the symbolic link: {e}")
             raise Exception("Impossible to create the symbolic link")
+
+
+@typechecked
+def install_configuration_files(install_dir: str, override_config: bool = False):
     #
     # Create sysconfig directory if it does not exist
     if not os.path.exists(cfg_path):
@@ -1046,6 +2196,10 @@ def post_install(override_config: bool = False):
             # Update the configuration file
             if cfg_path+"/ethercat" == c[1]:
                 update_ethercat_config(c[1])
+
+
+@typechecked
+def install_udev_rule():
     #
     # Create the udev rule file
     logger.info("Creating the udev rule file...")
@@ -1054,20 +2208,12 @@ def post_install(override_config: bool = False):
         f.write(udev_rule)
     # Reload the udev rules
     logger.info("Reloading the udev rules...")
-    try:
-        subprocess.run(["udevadm", "control", "--reload-rules"],
-                       check=True,
-                       stdout=subprocess.PIPE,
-                       stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
-        imsg = "Impossible to reload the udev rules"
-        handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
-    # Check that the master starts
-    if not check_master_starts():
-        logger.error("The master did not start")
-        raise Exception("The master did not start")
-    else:
-        logger.info("Success! The EtherCAT master starts correctly")
-    # Post install is finished with success
-    os.chdir(project_dir)
-    logger.info("Success: post install finished")
+    with phase("udev reload"):
+        try:
+            subprocess.run(["udevadm", "control", "--reload-rules"],
+                           check=True,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            imsg = "Impossible to reload the udev rules"
+            handle_subprocess_error(e, imsg, exit=False, raise_exception=True)
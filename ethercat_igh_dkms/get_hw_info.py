@@ -1,11 +1,12 @@
-import subprocess
-
 from logging import Logger
-from typeguard import typechecked
+from .typecheck import typechecked
 from typing import Optional
 from enum import Enum, unique
 import re
 
+from .sysfs_probe import default_sysfs_root, probe_net_interface, describe_pci_device
+from .net_inventory import get_net_inventory
+
 
 @unique
 class EthernetHardwares(Enum):
@@ -20,24 +21,28 @@ class EthernetHardwares(Enum):
     LEGACY = 5
 
 
+# Optional suffixes of the predictable interface names: function, port name
+# or device port, SR-IOV virtual function (e.g. enp3s0f1np0, enp3s0f0v12)
+interface_name_suffix = r'(?:f[0-9]+)?(?:np?[0-9]+|d[0-9]+)?(?:v[0-9]+)?'
+
 ethernet_device_types = {
     EthernetHardwares.PCI: {
-        "pattern": r'enp[0-9]+s[0-9]+',
+        "pattern": r'enp[0-9]+s[0-9]+' + interface_name_suffix,
         "description": "PCI ethernet interfaces called enpXsY, based on PCI bus location",
         "short description": "PCI ethernet interface"
     },
     EthernetHardwares.PCI_EXPRESS: {
-        "pattern": r'ens[0-9]+',
+        "pattern": r'ens[0-9]+' + interface_name_suffix,
         "description": "PCI express ethernet interfaces called ensX, based on PCI express slots",
         "short description": "PCI express ethernet interface"
     },
     EthernetHardwares.USB: {
-        "pattern": r'enx[0-9a-fA-F:]+',
+        "pattern": r'enx[0-9a-fA-F]{12}',
         "description": "USB ethernet interfaces called enx<MAC>, based on the MAC address",
         "short description": "USB ethernet interface"
     },
     EthernetHardwares.ONBOARD: {
-        "pattern": r'eno[0-9]+',
+        "pattern": r'eno[0-9]+' + interface_name_suffix,
         "description": "on board ethernet interfaces called enoX, based on the order detected by the kernel",
         "short description": "On board ethernet interface"
     },
@@ -48,31 +53,67 @@ ethernet_device_types = {
     }
 }
 
+# Order in which the interfaces are proposed for EtherCAT, the most likely first
+ethernet_device_types_priority = [
+    EthernetHardwares.LEGACY,
+    EthernetHardwares.ONBOARD,
+    EthernetHardwares.PCI_EXPRESS,
+    EthernetHardwares.PCI,
+    EthernetHardwares.USB
+]
+
+# All the patterns in one anchored regex, the group matched names the type
+ethernet_interface_reg = re.compile(
+    "^(?:" + "|".join([f"(?P<{t.name}>{ethernet_device_types[t]['pattern']})"
+                       for t in ethernet_device_types_priority]) + ")$")
+
+natural_sort_reg = re.compile(r'([0-9]+)')
+
+
+def natural_sort_key(name: str) -> list:
+    # eth2 before eth10
+    return [int(p) if p.isdigit() else p for p in natural_sort_reg.split(name)]
+
 
 @typechecked
-def get_hw_info(interface: str, logger: Logger) -> Optional[str]:
-    # readlink the data associated with the interface
-    cmd = f"readlink /sys/class/net/{interface}/device"
-    try:
-        result = subprocess.run(
-            cmd, shell=True, check=True, stdout=subprocess.PIPE)
-        return result.stdout.decode().strip()
-    except Exception as e:
+def get_hw_info(interface: str, logger: Logger, sysfs_root: str = default_sysfs_root) -> Optional[str]:
+    # Link to the device associated with the interface
+    link = get_net_inventory(sysfs_root).get(interface)
+    if link is None or link.device_link is None:
         logger.info(
-            f"Could not get hardware information for interface {interface}. Exception: {e}")
+            f"Could not get hardware information for interface {interface}")
         return None
+    return link.device_link
 
 
 @typechecked
 def get_hw_type(interface: str, logger: Logger) -> EthernetHardwares:
-    for hw_type, hw_info in ethernet_device_types.items():
-        if re.match(hw_info["pattern"], interface):
-            return hw_type
-    return EthernetHardwares.UNKNOWN
+    m = ethernet_interface_reg.match(interface)
+    if m is None:
+        return EthernetHardwares.UNKNOWN
+    return EthernetHardwares[m.lastgroup]
+
+
+@typechecked
+def classify_ethernet_interfaces(interfaces: list) -> list:
+    """
+    Classify the interfaces in one pass. Returns every Ethernet interface
+    with its type, as (interface, type) couples ordered by
+    ethernet_device_types_priority then by name. The other interfaces
+    (loopback, bridges, veth, ...) are left out.
+    """
+    priority = {t: i for i, t in enumerate(ethernet_device_types_priority)}
+    candidates = []
+    for interface in interfaces:
+        m = ethernet_interface_reg.match(interface)
+        if m is not None:
+            candidates.append((interface, EthernetHardwares[m.lastgroup]))
+    candidates.sort(key=lambda c: (priority[c[1]], natural_sort_key(c[0])))
+    return candidates
 
 
 @typechecked
-def get_more_hw_info(hw_addr: str, type: EthernetHardwares, logger: Logger) -> Optional[str]:
+def get_more_hw_info(hw_addr: str, type: EthernetHardwares, logger: Logger, interface: Optional[str] = None, sysfs_root: str = default_sysfs_root) -> Optional[str]:
 
     try:
         if type == EthernetHardwares.UNKNOWN:
@@ -92,14 +133,17 @@ def get_more_hw_info(hw_addr: str, type: EthernetHardwares, logger: Logger) -> O
             colon_split = hw1.split(':')
             info = type_info["short description"]
             if 3 == len(colon_split):
-                # Get only the par of the hardware address after the first colon
-                hw2 = colon_split[1] + ':' + colon_split[2]
-                cmd = f"lspci -v -s {hw2}"
-                result = subprocess.run(
-                    cmd, shell=True, check=True, stdout=subprocess.PIPE)
-                return info + "\n" + result.stdout.decode().strip()
-            else:
-                return info
+                description = describe_pci_device(hw1, logger, sysfs_root)
+                if description is not None:
+                    info = info + "\n" + description
+            if interface is not None:
+                link = probe_net_interface(interface, sysfs_root)
+                if link["carrier"] is not None:
+                    state = "up" if 1 == link["carrier"] else "down"
+                    if 1 == link["carrier"] and link["speed"] is not None and link["speed"] > 0:
+                        state += f", {link['speed']} Mb/s"
+                    info = info + f"\n\tLink: {state}"
+            return info
     except Exception as e:
         logger.info(
             f"Could not get more information for hardware address {hw_addr}. Exception: {e}")
@@ -107,8 +151,10 @@ def get_more_hw_info(hw_addr: str, type: EthernetHardwares, logger: Logger) -> O
 
 
 @typechecked
-def get_all_hw_infos(interfaces: list[str], logger: Logger) -> dict:
-    infos = {}
-    for interface in interfaces:
-        infos[interface] = get_hw_info(interface, logger)
-    return infos
+def get_all_hw_infos(interfaces: list[str], logger: Logger, max_workers: Optional[int] = None, sysfs_root: str = default_sysfs_root) -> dict:
+    # The probes mostly wait for the file system, threads are enough
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda i: get_hw_info(i, logger, sysfs_root), interfaces)
+        return dict(zip(interfaces, results))
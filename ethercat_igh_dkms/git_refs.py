@@ -0,0 +1,201 @@
+import os
+import re
+
+from .typecheck import typechecked
+from typing import Optional, Tuple
+
+
+# Read the state of a git checkout directly from its .git directory,
+# without spawning git.
+
+sha1_reg = re.compile(r"^[0-9a-f]{40}$")
+pack_idx_v2_magic = b"\xfftOc"
+per_worktree_refs = ("refs/worktree/", "refs/bisect/", "refs/rewritten/")
+
+
+@typechecked
+def is_full_sha(sha: str) -> bool:
+    return sha1_reg.match(sha) is not None
+
+
+@typechecked
+def find_git_dir(repo_dir: str) -> Optional[str]:
+    git_dir = os.path.join(repo_dir, ".git")
+    if os.path.isdir(git_dir):
+        return git_dir
+    if os.path.isfile(git_dir):
+        # Worktrees and submodules: .git is a file "gitdir: <path>"
+        with open(git_dir, "r") as f:
+            content = f.read().strip()
+        if content.startswith("gitdir:"):
+            path = content[len("gitdir:"):].strip()
+            return os.path.normpath(os.path.join(repo_dir, path))
+    if os.path.exists(os.path.join(repo_dir, "HEAD")) and os.path.isdir(os.path.join(repo_dir, "objects")):
+        # Bare repository
+        return repo_dir
+    return None
+
+
+@typechecked
+def find_common_dir(git_dir: str) -> str:
+    # Worktrees share the refs, objects and config of the main repository,
+    # their git directory only holds HEAD and the per-worktree refs
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r") as f:
+            path = f.read().strip()
+    except OSError:
+        return git_dir
+    return os.path.normpath(os.path.join(git_dir, path))
+
+
+@typechecked
+def is_per_worktree_ref(ref: str) -> bool:
+    return not ref.startswith("refs/") or ref.startswith(per_worktree_refs)
+
+
+@typechecked
+def read_packed_refs(git_dir: str) -> dict:
+    refs = {}
+    try:
+        with open(os.path.join(git_dir, "packed-refs"), "r") as f:
+            for l in f:
+                # Skip the header and the peeled tags lines
+                if l.startswith("#") or l.startswith("^"):
+                    continue
+                sp = l.split()
+                if 2 == len(sp):
+                    refs[sp[1]] = sp[0]
+    except OSError:
+        pass
+    return refs
+
+
+@typechecked
+def resolve_ref(repo_dir: str, ref: str) -> Optional[str]:
+    git_dir = find_git_dir(repo_dir)
+    if git_dir is None:
+        return None
+    common_dir = find_common_dir(git_dir)
+    # Follow symbolic refs, loose refs take precedence over packed refs
+    for _ in range(10):
+        ref_dir = git_dir if is_per_worktree_ref(ref) else common_dir
+        try:
+            with open(os.path.join(ref_dir, ref), "r") as f:
+                content = f.read().strip()
+        except OSError:
+            return read_packed_refs(common_dir).get(ref, None)
+        if content.startswith("ref:"):
+            ref = content[len("ref:"):].strip()
+        elif is_full_sha(content):
+            return content
+        else:
+            return None
+    return None
+
+
+@typechecked
+def read_head(repo_dir: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return (branch, commit) of the checkout. branch is None for a
+    detached HEAD, commit is None if it cannot be resolved.
+    """
+    git_dir = find_git_dir(repo_dir)
+    if git_dir is None:
+        return None, None
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r") as f:
+            content = f.read().strip()
+    except OSError:
+        return None, None
+    if content.startswith("ref:"):
+        ref = content[len("ref:"):].strip()
+        branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+        return branch, resolve_ref(repo_dir, ref)
+    if is_full_sha(content):
+        return None, content
+    return None, None
+
+
+@typechecked
+def read_remote_urls(repo_dir: str) -> dict:
+    # Parse the [remote "<name>"] sections of .git/config
+    git_dir = find_git_dir(repo_dir)
+    urls = {}
+    if git_dir is None:
+        return urls
+    remote = None
+    try:
+        with open(os.path.join(find_common_dir(git_dir), "config"), "r") as f:
+            for l in f:
+                l = l.strip()
+                m = re.match(r'^\[remote\s+"(.*)"\]$', l)
+                if m:
+                    remote = m.group(1)
+                elif l.startswith("["):
+                    remote = None
+                elif remote is not None:
+                    sp = l.split("=", 1)
+                    if 2 == len(sp) and "url" == sp[0].strip():
+                        urls[remote] = sp[1].strip()
+    except OSError:
+        pass
+    return urls
+
+
+@typechecked
+def pack_index_contains(idx_file: str, sha: str) -> bool:
+    # Binary search in the sorted object names of a version 2 pack index
+    binary_sha = bytes.fromhex(sha)
+    with open(idx_file, "rb") as f:
+        header = f.read(8)
+        if pack_idx_v2_magic != header[:4] or 2 != int.from_bytes(header[4:8], "big"):
+            return False
+        fanout = f.read(256 * 4)
+        first = binary_sha[0]
+        lo = 0 if 0 == first else int.from_bytes(
+            fanout[(first - 1) * 4:first * 4], "big")
+        hi = int.from_bytes(fanout[first * 4:(first + 1) * 4], "big")
+        names_offset = 8 + 256 * 4
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(names_offset + mid * 20)
+            name = f.read(20)
+            if name == binary_sha:
+                return True
+            if name < binary_sha:
+                lo = mid + 1
+            else:
+                hi = mid
+    return False
+
+
+@typechecked
+def objects_dir_contains(objects_dir: str, sha: str, depth: int = 0) -> bool:
+    if os.path.exists(os.path.join(objects_dir, sha[:2], sha[2:])):
+        return True
+    pack_dir = os.path.join(objects_dir, "pack")
+    if os.path.isdir(pack_dir):
+        for p in os.listdir(pack_dir):
+            if p.endswith(".idx") and pack_index_contains(os.path.join(pack_dir, p), sha):
+                return True
+    # Alternate object stores (clones sharing a local mirror)
+    if depth < 5:
+        try:
+            with open(os.path.join(objects_dir, "info", "alternates"), "r") as f:
+                alternates = [l.strip() for l in f if l.strip()
+                              and not l.startswith("#")]
+        except OSError:
+            alternates = []
+        for a in alternates:
+            a = os.path.normpath(os.path.join(objects_dir, a))
+            if objects_dir_contains(a, sha, depth + 1):
+                return True
+    return False
+
+
+@typechecked
+def has_object(repo_dir: str, sha: str) -> bool:
+    git_dir = find_git_dir(repo_dir)
+    if git_dir is None or not is_full_sha(sha):
+        return False
+    return objects_dir_contains(os.path.join(find_common_dir(git_dir), "objects"), sha)
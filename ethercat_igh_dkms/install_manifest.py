@@ -0,0 +1,142 @@
+import os
+import stat
+
+from .typecheck import typechecked
+from typing import Optional
+
+from .checksums import file_digest
+
+
+# State of the installed files kept in the installed files tracker: size,
+# modification time and sha256 of the files, target of the symbolic links
+# (with the state of the file they point to). Verifying an installation
+# compares the stat data first and hashes only the files whose stat data
+# changed.
+
+file_state_keys = ["symlink", "size", "mtime_ns", "sha256"]
+
+
+@typechecked
+def file_state(path: str) -> Optional[dict]:
+    """
+    Stat data of a file, without its hash. For a symbolic link the target
+    and the stat data of the file it points to. None if path does not
+    exist.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    state = {}
+    if stat.S_ISLNK(st.st_mode):
+        state["symlink"] = os.readlink(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Dangling link
+            return state
+    if stat.S_ISREG(st.st_mode):
+        state["size"] = st.st_size
+        state["mtime_ns"] = st.st_mtime_ns
+    return state
+
+
+def _same_stat(entry: dict, state: dict) -> bool:
+    return entry.get("size", None) == state.get("size", None) and entry.get("mtime_ns", None) == state.get("mtime_ns", None)
+
+
+@typechecked
+def hash_files(paths: list, max_workers: Optional[int] = None) -> dict:
+    # sha256 of the files, read in parallel: hashlib releases the GIL
+    if 0 == len(paths):
+        return {}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(file_digest, paths)))
+
+
+@typechecked
+def update_installed_files_state(tracker: dict, max_workers: Optional[int] = None) -> dict:
+    """
+    Tracker with the state of its files. The hash recorded for a file is
+    kept when its stat data did not change. The "type" of the entries is
+    kept as it is, the uninstall relies on it.
+    """
+    updated = {}
+    to_hash = []
+    for path, entry in tracker.items():
+        entry = dict(entry)
+        updated[path] = entry
+        if "file" != entry["type"]:
+            continue
+        state = file_state(path)
+        if state is not None and "size" in state and _same_stat(entry, state) and entry.get("sha256", None) is not None:
+            state["sha256"] = entry["sha256"]
+        elif state is not None and "size" in state:
+            to_hash.append(path)
+        for k in file_state_keys:
+            entry.pop(k, None)
+        if state is not None:
+            entry.update(state)
+    for path, digest in hash_files(to_hash, max_workers).items():
+        updated[path]["sha256"] = digest
+    return updated
+
+
+@typechecked
+def verify_installed_files(tracker: dict, max_workers: Optional[int] = None, rehash: bool = False) -> list:
+    """
+    Compare the installed files with their recorded state. Returns a list
+    of dictionaries with the path, the status and details:
+    - ok: same stat data, or same content (touched is then True)
+    - missing: the file or the directory no longer exists
+    - changed: different content
+    - retargeted: the symbolic link points somewhere else
+    - unrecorded: no state recorded for the file, only its existence is
+      checked
+    With rehash, the files are hashed even if their stat data did not
+    change.
+    """
+    report = []
+    to_hash = []
+    for path, entry in sorted(tracker.items()):
+        result = {"path": path, "status": "ok", "details": ""}
+        report.append(result)
+        if "directory" == entry["type"]:
+            if not os.path.isdir(path):
+                result["status"] = "missing"
+            continue
+        state = file_state(path)
+        if state is None:
+            result["status"] = "missing"
+            continue
+        if not any(k in entry for k in file_state_keys):
+            result["status"] = "unrecorded"
+            continue
+        if entry.get("symlink", None) != state.get("symlink", None):
+            result["status"] = "retargeted"
+            result["details"] = f"{entry.get('symlink', None)} -> {state.get('symlink', None)}"
+            continue
+        if "size" not in state:
+            # Dangling link, or no longer a regular file
+            if "size" in entry:
+                result["status"] = "missing"
+            continue
+        if "size" not in entry:
+            result["status"] = "changed"
+            continue
+        if rehash or not _same_stat(entry, state):
+            to_hash.append((result, entry, state))
+    digests = hash_files([r["path"] for r, _, _ in to_hash], max_workers)
+    for result, entry, state in to_hash:
+        if digests[result["path"]] == entry.get("sha256", None):
+            result["touched"] = not _same_stat(entry, state)
+            continue
+        result["status"] = "changed"
+        if digests[result["path"]] is None:
+            result["details"] = "unreadable"
+        elif entry["size"] != state["size"]:
+            result["details"] = f"size {entry['size']} -> {state['size']}"
+        else:
+            result["details"] = "content"
+    return report
@@ -0,0 +1,135 @@
+import logging
+import contextvars
+
+from logging import Logger
+from .typecheck import typechecked
+from typing import Callable, Optional
+
+from .phase_report import phase
+
+
+# Name of the install step being executed, used to attribute the log records
+current_step = contextvars.ContextVar("current_step", default=None)
+
+
+class StepLogFilter(logging.Filter):
+    """
+    Prefix the log records emitted while an install step runs with the
+    name of the step, so that the output of concurrent steps stays readable.
+    """
+
+    def filter(self, record):
+        step = current_step.get()
+        if step is not None and not getattr(record, "step_prefixed", False):
+            record.msg = f"[{step}] {record.msg}"
+            record.step_prefixed = True
+        return True
+
+
+class InstallStep:
+    """
+    A step of the installation: func is called with args and kwargs once
+    all the steps named in depends_on have succeeded. Plain functions run in
+    a worker thread, coroutine functions in the event loop.
+    Steps running concurrently must not depend on the current working
+    directory.
+    """
+
+    def __init__(self, name: str, func: Callable, depends_on: Optional[list] = None, args: tuple = (), kwargs: Optional[dict] = None):
+        self.name = name
+        self.func = func
+        self.depends_on = [] if depends_on is None else list(depends_on)
+        self.args = args
+        self.kwargs = {} if kwargs is None else kwargs
+
+
+class StepSkipped(Exception):
+    pass
+
+
+@typechecked
+def sort_install_steps(steps: list) -> list:
+    # Topological order of the steps, checking the dependency graph
+    by_name = {}
+    for s in steps:
+        if s.name in by_name:
+            raise Exception(f"Duplicated install step {s.name}")
+        by_name[s.name] = s
+    ordered = []
+    state = {}
+
+    def visit(step, path):
+        if "done" == state.get(step.name):
+            return
+        if "visiting" == state.get(step.name):
+            raise Exception(
+                f"Cycle in the install steps: {' -> '.join(path + [step.name])}")
+        state[step.name] = "visiting"
+        for d in step.depends_on:
+            if d not in by_name:
+                raise Exception(
+                    f"Install step {step.name} depends on unknown step {d}")
+            visit(by_name[d], path + [step.name])
+        state[step.name] = "done"
+        ordered.append(step)
+
+    for s in steps:
+        visit(s, [])
+    return ordered
+
+
+async def run_install_steps_async(steps: list, logger: Logger) -> dict:
+    """
+    Run the steps, each one as soon as its dependencies have succeeded.
+    The steps depending on a failed step are skipped, the others go on.
+    Returns the status of each step, raises the first error once all the
+    steps are finished.
+    """
+    # asyncio is only needed by the install, not by the other commands
+    import asyncio
+    ordered = sort_install_steps(steps)
+    tasks = {}
+    status = {}
+
+    async def run(step):
+        for d in step.depends_on:
+            try:
+                await tasks[d]
+            except BaseException:
+                status[step.name] = "skipped"
+                logger.error(
+                    f"Install step {step.name} skipped: step {d} failed")
+                raise StepSkipped(step.name)
+        token = current_step.set(step.name)
+        try:
+            logger.info(f"Starting install step {step.name}")
+            with phase(step.name):
+                if asyncio.iscoroutinefunction(step.func):
+                    result = await step.func(*step.args, **step.kwargs)
+                else:
+                    result = await asyncio.to_thread(step.func, *step.args, **step.kwargs)
+            status[step.name] = "ok"
+            logger.info(f"Install step {step.name} finished")
+            return result
+        except BaseException as e:
+            status[step.name] = "error"
+            logger.error(f"Install step {step.name} failed: {e}")
+            raise
+        finally:
+            current_step.reset(token)
+
+    # The tasks are created in topological order: the dependencies exist
+    # when a step awaits them
+    for step in ordered:
+        tasks[step.name] = asyncio.ensure_future(run(step))
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for step, result in zip(tasks.keys(), results):
+        if isinstance(result, BaseException) and not isinstance(result, StepSkipped):
+            raise result
+    return status
+
+
+@typechecked
+def run_install_steps(steps: list, logger: Logger) -> dict:
+    import asyncio
+    return asyncio.run(run_install_steps_async(steps, logger))
@@ -0,0 +1,154 @@
+import os
+
+from logging import Logger
+from .typecheck import typechecked
+
+from .sysfs_probe import default_sysfs_root, probe_net_interface, read_sysfs_attr
+from .net_inventory import get_net_inventory
+
+
+# Ranking of the candidate interfaces for EtherCAT: the port with the lowest
+# jitter is driven by a native IgH driver, sits on the PCI bus next to the
+# real-time CPUs and does not carry the regular network traffic.
+
+default_proc_root = "/proc"
+
+ranking_scores = {
+    "native driver": 50,
+    "pci bus": 20,
+    "usb bus": -30,
+    "virtual": -50,
+    "carrier": 10,
+    "default route": -40,
+    "local numa node": 5,
+    "remote numa node": -5
+}
+
+
+@typechecked
+def default_route_interfaces(proc_root: str = default_proc_root) -> set:
+    # Interfaces of the IPv4 default routes (destination 00000000)
+    interfaces = set()
+    try:
+        with open(os.path.join(proc_root, "net", "route"), "r") as f:
+            next(f, None)
+            for l in f:
+                sp = l.split()
+                if len(sp) > 1 and "00000000" == sp[1]:
+                    interfaces.add(sp[0])
+    except OSError:
+        pass
+    return interfaces
+
+
+@typechecked
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    # Kernel cpu list format: «0-3,8,10-11»
+    cpus = []
+    for part in cpu_list.split(","):
+        part = part.strip()
+        if "" == part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+@typechecked
+def realtime_numa_nodes(sysfs_root: str = default_sysfs_root) -> set:
+    """
+    NUMA nodes of the isolated CPUs (isolcpus), where the real-time tasks
+    run. Node 0 if no CPU is isolated.
+    """
+    cpu_dir = os.path.join(sysfs_root, "devices", "system", "cpu")
+    isolated = read_sysfs_attr(os.path.join(cpu_dir, "isolated"))
+    nodes = set()
+    try:
+        cpus = parse_cpu_list(isolated) if isolated is not None else []
+    except ValueError:
+        cpus = []
+    for cpu in cpus:
+        try:
+            for entry in os.listdir(os.path.join(cpu_dir, f"cpu{cpu}")):
+                if entry.startswith("node") and entry[4:].isdigit():
+                    nodes.add(int(entry[4:]))
+        except OSError:
+            pass
+    if 0 == len(nodes):
+        nodes.add(0)
+    return nodes
+
+
+@typechecked
+def score_interface(info: dict, native_drivers: dict, default_routes: set, rt_nodes: set) -> tuple[int, list[str]]:
+    """
+    Score of an interface probed by probe_net_interface, with the reasons
+    of each part of the score. native_drivers maps the kernel drivers to
+    the IgH device modules.
+    """
+    score = 0
+    reasons = []
+
+    def add(key, reason):
+        nonlocal score
+        score += ranking_scores[key]
+        reasons.append(f"{ranking_scores[key]:+d} {reason}")
+
+    if info["driver"] is not None and info["driver"] in native_drivers:
+        add("native driver",
+            f"native IgH driver ec_{native_drivers[info['driver']]} for {info['driver']}")
+    if "pci" == info["bus"]:
+        add("pci bus", "PCI device")
+    elif "usb" == info["bus"]:
+        add("usb bus", "USB adapter")
+    elif info["bus"] is None:
+        add("virtual", "virtual interface")
+    if 1 == info["carrier"]:
+        add("carrier", "link up")
+    if info["interface"] in default_routes:
+        add("default route", "carries the default route")
+    if info["numa_node"] is not None:
+        if info["numa_node"] in rt_nodes:
+            add("local numa node",
+                f"NUMA node {info['numa_node']} of the real-time CPUs")
+        else:
+            add("remote numa node",
+                f"NUMA node {info['numa_node']} away from the real-time CPUs")
+    return score, reasons
+
+
+@typechecked
+def rank_ethernet_interfaces(interfaces: list, native_drivers: dict, logger: Logger, sysfs_root: str = default_sysfs_root, proc_root: str = default_proc_root) -> list:
+    """
+    Rank the candidate interfaces for EtherCAT, the best first. Returns a
+    list of dictionaries with the interface, its score, the reasons of the
+    score and the probed information. Equal scores keep the order of
+    interfaces. The interfaces are probed from the network link inventory.
+    """
+    default_routes = default_route_interfaces(proc_root)
+    rt_nodes = realtime_numa_nodes(sysfs_root)
+    inventory = get_net_inventory(sysfs_root)
+    ranking = []
+    for interface in interfaces:
+        info = inventory.probe(interface)
+        if info is None:
+            # Not in the inventory: all the values are None
+            info = probe_net_interface(interface, sysfs_root)
+        score, reasons = score_interface(
+            info, native_drivers, default_routes, rt_nodes)
+        ranking.append({
+            "interface": interface,
+            "score": score,
+            "reasons": reasons,
+            "info": info
+        })
+    ranking.sort(key=lambda r: -r["score"])
+    for r in ranking:
+        reasons = "; ".join(r["reasons"]) if len(
+            r["reasons"]) > 0 else "no criterion"
+        logger.info(
+            f"Interface {r['interface']} score {r['score']}: {reasons}")
+    return ranking
@@ -0,0 +1,210 @@
+import os
+import gzip
+import shutil
+import queue
+import threading
+import time
+import atexit
+import logging
+import logging.handlers
+
+from .typecheck import typechecked
+
+
+# Logging through a queue: the records are formatted and written to the log
+# file by a background thread, in batches flushed every flush_interval
+# seconds, when flush_size bytes are pending, or right away for errors.
+# The log file is rotated into compressed backups once it exceeds max_bytes.
+
+_flush_marker = object()
+_stop_marker = object()
+
+
+@typechecked
+def rotate_log_file(log_file: str, backup_count: int):
+    """
+    Compress log_file into log_file.1.gz, shifting the previous backups
+    (log_file.2.gz, ...) and removing the ones above backup_count.
+    """
+    if not os.path.exists(log_file) or 0 == os.path.getsize(log_file):
+        return
+    if backup_count <= 0:
+        os.remove(log_file)
+        return
+    for i in range(backup_count - 1, 0, -1):
+        src = f"{log_file}.{i}.gz"
+        if os.path.exists(src):
+            os.replace(src, f"{log_file}.{i + 1}.gz")
+    tmp_file = f"{log_file}.1.gz.tmp"
+    with open(log_file, "rb") as f_in, gzip.open(tmp_file, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.replace(tmp_file, f"{log_file}.1.gz")
+    os.remove(log_file)
+
+
+class PipelineQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler waiting for the errors to be written, so that they are in
+    the log file whatever happens to the process next.
+    """
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno >= logging.ERROR:
+            self.pipeline.flush()
+
+
+class LogPipeline:
+    """
+    Background writer of a log file. handler is the logging handler to
+    add to the loggers.
+    """
+
+    def __init__(self, log_file: str, formatter: logging.Formatter, flush_interval: float = 1.0, flush_size: int = 64 * 1024, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.log_file = log_file
+        self.formatter = formatter
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # Only the process that created the pipeline rotates the log file,
+        # forked processes append to it
+        self.owner_pid = os.getpid()
+        self.queue = queue.SimpleQueue()
+        self.handler = PipelineQueueHandler(self)
+        self.thread = None
+        self.stream = None
+
+    def start(self):
+        self.stream = open(self.log_file, "a", encoding="utf-8")
+        self.thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def _write(self, pending: list):
+        if 0 == len(pending):
+            return
+        self.stream.write("".join(pending))
+        self.stream.flush()
+        pending.clear()
+        if os.getpid() == self.owner_pid and 0 < self.max_bytes and self.stream.tell() >= self.max_bytes:
+            self.stream.close()
+            rotate_log_file(self.log_file, self.backup_count)
+            self.stream = open(self.log_file, "a", encoding="utf-8")
+
+    def _run(self):
+        pending = []
+        pending_size = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(
+                0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _stop_marker:
+                self._write(pending)
+                self.stream.close()
+                return
+            if isinstance(item, tuple) and item[0] is _flush_marker:
+                self._write(pending)
+                pending_size = 0
+                deadline = None
+                item[1].set()
+                continue
+            if item is not None:
+                try:
+                    text = self.formatter.format(item) + "\n"
+                except Exception:
+                    text = f"Unformattable log record: {item.msg!r}\n"
+                pending.append(text)
+                pending_size += len(text)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if pending_size >= self.flush_size or (deadline is not None and time.monotonic() >= deadline):
+                self._write(pending)
+                pending_size = 0
+                deadline = None
+
+    def flush(self, timeout: float = 5.0):
+        # Wait until the records queued so far are written
+        if self.thread is None or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put((_flush_marker, done))
+        done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.queue.put(_stop_marker)
+        self.thread.join(timeout)
+
+    def restart_after_fork(self):
+        # The writer thread does not survive fork: the child starts its own
+        # on a new queue, appending to the same file
+        self.queue = queue.SimpleQueue()
+        self.handler.queue = self.queue
+        self.stream = None
+        self.start()
+
+
+log_pipelines = []
+
+
+def _stop_log_pipelines():
+    for p in log_pipelines:
+        p.stop()
+
+
+def _flush_log_pipelines():
+    # The records of the parent are written before those of its children
+    for p in log_pipelines:
+        p.flush()
+
+
+def _finalize_log_pipeline(pipeline):
+    import multiprocessing.util
+    multiprocessing.util.Finalize(pipeline, pipeline.stop, exitpriority=-100)
+
+
+def _restart_log_pipelines_after_fork():
+    for p in log_pipelines:
+        p.restart_after_fork()
+    if 0 < len(log_pipelines):
+        # multiprocessing workers leave without running atexit, they run
+        # the finalizers registered once they have started
+        import multiprocessing.util
+        for p in log_pipelines:
+            multiprocessing.util.register_after_fork(p, _finalize_log_pipeline)
+
+
+atexit.register(_stop_log_pipelines)
+os.register_at_fork(before=_flush_log_pipelines,
+                    after_in_child=_restart_log_pipelines_after_fork)
+
+
+@typechecked
+def start_log_pipeline(log_file: str, formatter: logging.Formatter, flush_interval: float, flush_size: int, max_bytes: int, backup_count: int) -> LogPipeline:
+    """
+    Start the background writer of log_file. The previous log file is
+    first rotated so that each run starts a new file.
+    """
+    rotate_log_file(log_file, backup_count)
+    pipeline = LogPipeline(log_file, formatter, flush_interval,
+                           flush_size, max_bytes, backup_count)
+    pipeline.start()
+    log_pipelines.append(pipeline)
+    return pipeline
+
+
+@typechecked
+def stop_log_pipeline(pipeline: LogPipeline):
+    pipeline.stop()
+    if pipeline in log_pipelines:
+        log_pipelines.remove(pipeline)
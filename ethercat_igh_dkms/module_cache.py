@@ -0,0 +1,211 @@
+import os
+import shutil
+import hashlib
+import json
+import time
+
+from logging import Logger
+from .typecheck import typechecked
+from typing import Optional
+
+
+module_cache_manifest_name = "manifest.json"
+module_cache_files_dir = "files"
+
+
+@typechecked
+def kernel_config_hash(kernel_release: str, logger: Logger) -> Optional[str]:
+    """
+    Hash of the configuration of a kernel, read from its header tree
+    or from /boot.
+    """
+    candidates = [f"/lib/modules/{kernel_release}/build/.config",
+                  f"/boot/config-{kernel_release}"]
+    for c in candidates:
+        if os.path.exists(c):
+            h = hashlib.sha256()
+            with open(c, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    h.update(chunk)
+            return h.hexdigest()
+    logger.info(
+        f"Could not find the configuration of kernel {kernel_release}")
+    return None
+
+
+@typechecked
+def module_cache_key(kernel_release: str, config_hash: Optional[str], git_commit: Optional[str], config_fingerprint: str) -> str:
+    data = {
+        "kernel": kernel_release,
+        "kernel_config": config_hash,
+        "git_commit": git_commit,
+        "config_fingerprint": config_fingerprint
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+@typechecked
+def _read_manifest(entry_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(entry_dir, module_cache_manifest_name), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@typechecked
+def module_cache_lookup(cache_dir: str, key: str, logger: Logger) -> Optional[dict]:
+    """
+    Return the manifest of the cache entry for key, or None if the entry
+    does not exist. A hit refreshes the entry for the LRU eviction.
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    manifest = _read_manifest(entry_dir)
+    if manifest is None:
+        return None
+    # The mtime of the manifest is the last use time of the entry
+    os.utime(os.path.join(entry_dir, module_cache_manifest_name))
+    logger.info(f"Module cache hit: {key}")
+    return manifest
+
+
+@typechecked
+def module_cache_restore(cache_dir: str, key: str, build_dir: str, logger: Logger) -> bool:
+    manifest = module_cache_lookup(cache_dir, key, logger)
+    if manifest is None:
+        logger.info(f"Module cache miss: {key}")
+        return False
+    files_dir = os.path.join(cache_dir, key, module_cache_files_dir)
+    for rel_path in manifest["files"]:
+        dst = os.path.join(build_dir, rel_path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(os.path.join(files_dir, rel_path), dst)
+        logger.info(f"Restored {rel_path} from the module cache")
+    return True
+
+
+@typechecked
+def module_cache_store(cache_dir: str, key: str, build_dir: str, files: list[str], metadata: dict, max_size_mb: int, logger: Logger):
+    """
+    Store the files (absolute paths inside build_dir) under key, then
+    evict the least recently used entries above max_size_mb.
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    # Fill a temporary entry then rename it so that a concurrent reader
+    # never sees a partial entry
+    tmp_dir = os.path.join(cache_dir, f".tmp-{key}-{os.getpid()}")
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    rel_paths = []
+    size = 0
+    for f in files:
+        rel_path = os.path.relpath(f, build_dir)
+        dst = os.path.join(tmp_dir, module_cache_files_dir, rel_path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(f, dst)
+        rel_paths.append(rel_path)
+        size += os.path.getsize(f)
+    manifest = dict(metadata)
+    manifest["files"] = rel_paths
+    manifest["size"] = size
+    manifest["created"] = time.time()
+    with open(os.path.join(tmp_dir, module_cache_manifest_name), "w") as f:
+        json.dump(manifest, f, indent=2)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Stored meanwhile by another build
+        shutil.rmtree(tmp_dir)
+        return
+    logger.info(f"Stored {len(rel_paths)} files in the module cache: {key}")
+    module_cache_evict(cache_dir, max_size_mb, logger)
+
+
+@typechecked
+def module_cache_evict(cache_dir: str, max_size_mb: int, logger: Logger):
+    entries = []
+    total = 0
+    for key in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, key)
+        manifest = _read_manifest(entry_dir)
+        if manifest is None:
+            continue
+        last_use = os.path.getmtime(os.path.join(
+            entry_dir, module_cache_manifest_name))
+        entries.append((last_use, key, manifest["size"]))
+        total += manifest["size"]
+    # Remove the least recently used entries first
+    entries.sort()
+    max_size = max_size_mb * 1024 * 1024
+    for last_use, key, size in entries:
+        if total <= max_size:
+            break
+        shutil.rmtree(os.path.join(cache_dir, key))
+        total -= size
+        logger.info(f"Evicted {key} from the module cache")
+
+
+@typechecked
+def module_cache_export(cache_dir: str, archive: str, logger: Logger):
+    import tarfile
+    with tarfile.open(archive, "w:gz") as tar:
+        for key in sorted(os.listdir(cache_dir)):
+            if _read_manifest(os.path.join(cache_dir, key)) is not None:
+                tar.add(os.path.join(cache_dir, key), arcname=key)
+    logger.info(f"Module cache {cache_dir} exported to {archive}")
+
+
+@typechecked
+def module_cache_import(cache_dir: str, archive: str, max_size_mb: int, logger: Logger):
+    """
+    Import the entries of an archive made by module_cache_export. Like
+    module_cache_store, each entry is extracted into a temporary directory
+    then renamed: a concurrent build never sees a partial entry. The
+    existing entries are kept.
+    """
+    import tarfile
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = os.path.join(cache_dir, f".tmp-import-{os.getpid()}")
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    try:
+        with tarfile.open(archive, "r:*") as tar:
+            members = []
+            existing = {}
+            for m in tar.getmembers():
+                # Only accept plain files and directories inside the cache
+                parts = m.name.split("/")
+                if m.name.startswith("/") or ".." in parts or parts[0].startswith(".") or not (m.isfile() or m.isdir()):
+                    logger.warning(
+                        f"Skipping unexpected member {m.name} of {archive}")
+                    continue
+                # Do not overwrite an existing entry, checked once per entry
+                key = parts[0]
+                if key not in existing:
+                    existing[key] = os.path.exists(os.path.join(cache_dir, key))
+                if existing[key]:
+                    continue
+                members.append(m)
+            tar.extractall(tmp_dir, members=members)
+        imported = 0
+        for key in sorted(os.listdir(tmp_dir)):
+            # Entries without manifest are incomplete
+            if _read_manifest(os.path.join(tmp_dir, key)) is None:
+                logger.warning(f"Skipping incomplete entry {key} of {archive}")
+                continue
+            try:
+                os.rename(os.path.join(tmp_dir, key),
+                          os.path.join(cache_dir, key))
+                imported += 1
+            except OSError:
+                # Stored meanwhile by a build
+                continue
+    finally:
+        shutil.rmtree(tmp_dir)
+    logger.info(
+        f"Imported {imported} entries of {archive} into the module cache {cache_dir}")
+    module_cache_evict(cache_dir, max_size_mb, logger)
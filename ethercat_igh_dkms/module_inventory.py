@@ -0,0 +1,190 @@
+import os
+import struct
+import threading
+import collections
+
+from .typecheck import typechecked
+from typing import Optional
+
+
+# Inventory of the kernel modules built in a directory, made in one scandir
+# walk. The version magic and the dependencies of each module are read from
+# the .modinfo section of its ELF file, without running modinfo.
+
+KernelModule = collections.namedtuple(
+    "KernelModule", ["name", "path", "relative_path", "size", "mtime_ns", "vermagic", "depends"])
+
+kernel_module_suffix = ".ko"
+
+# ELF identification and section header indexes
+elf_magic = b"\x7fELF"
+elf_class_64 = 2
+elf_data_big_endian = 2
+shn_xindex = 0xffff
+
+
+@typechecked
+def read_elf_section(path: str, section_name: str) -> Optional[bytes]:
+    """
+    Contents of a section of an ELF file, None if the file is not an ELF
+    file or has no such section. Only the headers and the section are read.
+    """
+    try:
+        with open(path, "rb") as f:
+            ident = f.read(16)
+            if len(ident) < 16 or elf_magic != ident[:4]:
+                return None
+            is_64 = elf_class_64 == ident[4]
+            order = ">" if elf_data_big_endian == ident[5] else "<"
+            if is_64:
+                header = f.read(48)
+                shoff, = struct.unpack_from(order + "Q", header, 24)
+                shentsize, shnum, shstrndx = struct.unpack_from(
+                    order + "HHH", header, 42)
+                section_format = order + "IIQQQQIIQQ"
+            else:
+                header = f.read(36)
+                shoff, = struct.unpack_from(order + "I", header, 16)
+                shentsize, shnum, shstrndx = struct.unpack_from(
+                    order + "HHH", header, 30)
+                section_format = order + "IIIIIIIIII"
+            if 0 == shoff:
+                return None
+
+            def section(data, i):
+                # name, offset, size, link
+                s = struct.unpack_from(section_format, data, i * shentsize)
+                return s[0], s[4], s[5], s[6]
+
+            if 0 == shnum or shn_xindex == shstrndx:
+                # Too many sections for the header: the real values are in
+                # the first section header
+                f.seek(shoff)
+                _, _, size0, link0 = section(f.read(shentsize), 0)
+                if 0 == shnum:
+                    shnum = size0
+                if shn_xindex == shstrndx:
+                    shstrndx = link0
+            f.seek(shoff)
+            table = f.read(shnum * shentsize)
+            if len(table) < shnum * shentsize or shstrndx >= shnum:
+                return None
+            _, names_offset, names_size, _ = section(table, shstrndx)
+            f.seek(names_offset)
+            names = f.read(names_size)
+            wanted = section_name.encode()
+            for i in range(shnum):
+                name, offset, size, _ = section(table, i)
+                end = names.find(b"\0", name)
+                if names[name:end if -1 != end else len(names)] == wanted:
+                    f.seek(offset)
+                    return f.read(size)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+@typechecked
+def read_modinfo(path: str) -> dict:
+    """
+    Fields of the .modinfo section of a kernel module, as modinfo prints
+    them: each key with the list of its values.
+    """
+    modinfo = {}
+    data = read_elf_section(path, ".modinfo")
+    if data is None:
+        return modinfo
+    for field in data.split(b"\0"):
+        if b"=" not in field:
+            continue
+        key, value = field.decode("utf-8", errors="replace").split("=", 1)
+        modinfo.setdefault(key, []).append(value)
+    return modinfo
+
+
+@typechecked
+def scan_kernel_module_files(top: str) -> list[str]:
+    # Same files as «find top -name '*.ko'»: symbolic links to directories
+    # are not followed
+    found = []
+    pending = [top]
+    while len(pending) > 0:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(kernel_module_suffix):
+                        found.append(entry.path)
+        except OSError:
+            continue
+    return sorted(found)
+
+
+class ModuleInventory:
+    """
+    Kernel modules built in a directory, sorted by relative path.
+    """
+
+    def __init__(self, top: str, modules: list):
+        self.top = top
+        self.modules = tuple(modules)
+
+    def paths(self) -> list:
+        return [m.path for m in self.modules]
+
+    def names(self) -> list:
+        return [m.name for m in self.modules]
+
+    def get(self, name: str) -> Optional[KernelModule]:
+        for m in self.modules:
+            if name == m.name:
+                return m
+        return None
+
+    def mismatched_vermagic(self, kernel_release: str) -> list:
+        # Modules whose version magic is for another kernel
+        return [m for m in self.modules
+                if m.vermagic is not None and m.vermagic.split()[0] != kernel_release]
+
+
+@typechecked
+def build_module_inventory(top: str) -> ModuleInventory:
+    modules = []
+    for path in scan_kernel_module_files(top):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        modinfo = read_modinfo(path)
+        vermagic = modinfo.get("vermagic", [None])[0]
+        depends = []
+        for d in modinfo.get("depends", []):
+            depends.extend([x for x in d.split(",") if "" != x])
+        modules.append(KernelModule(
+            name=os.path.basename(path)[:-len(kernel_module_suffix)],
+            path=path,
+            relative_path=os.path.relpath(path, top),
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            vermagic=vermagic,
+            depends=depends))
+    return ModuleInventory(top, modules)
+
+
+module_inventories = {}
+module_inventories_lock = threading.Lock()
+
+
+@typechecked
+def get_module_inventory(top: str, refresh: bool = False) -> ModuleInventory:
+    """
+    Inventory of the modules built in top, made once: refresh it after a
+    build changed the modules. A link to a build directory shares the
+    inventory of the directory.
+    """
+    top = os.path.realpath(top)
+    with module_inventories_lock:
+        if refresh or top not in module_inventories:
+            module_inventories[top] = build_module_inventory(top)
+        return module_inventories[top]
@@ -0,0 +1,153 @@
+import os
+import socket
+import threading
+import collections
+import types
+
+from .typecheck import typechecked
+from typing import Optional
+
+from .sysfs_probe import default_sysfs_root, probe_net_interface, read_sysfs_int
+
+
+# Inventory of the network links read in one sysfs sweep. The snapshot is
+# kept until the kernel reports a link event (interface added, removed,
+# renamed, up or down) on an rtnetlink socket, so that repeated queries
+# cost nothing. info is the dictionary of probe_net_interface.
+
+NetLink = collections.namedtuple(
+    "NetLink", ["name", "ifindex", "mac", "operstate", "mtu", "carrier", "driver", "device_link", "info"])
+
+# Multicast group of the link events of rtnetlink
+rtmgrp_link = 1
+
+
+class NetInventory:
+    """
+    Immutable snapshot of the network links, by interface name.
+    """
+
+    def __init__(self, links: dict):
+        self.links = types.MappingProxyType(dict(links))
+
+    def names(self) -> list:
+        return sorted(self.links.keys())
+
+    def get(self, name: str) -> Optional[NetLink]:
+        return self.links.get(name, None)
+
+    def mac(self, name: str) -> Optional[str]:
+        link = self.links.get(name, None)
+        return None if link is None else link.mac
+
+    def probe(self, name: str) -> Optional[dict]:
+        # Same as probe_net_interface, from the snapshot
+        link = self.links.get(name, None)
+        return None if link is None else dict(link.info)
+
+
+@typechecked
+def read_net_link(name: str, sysfs_root: str = default_sysfs_root) -> NetLink:
+    net_dir = os.path.join(sysfs_root, "class", "net", name)
+    info = probe_net_interface(name, sysfs_root)
+    # Interfaces without link layer address (tun, ...)
+    if not info["mac"]:
+        info["mac"] = None
+    return NetLink(name=name,
+                   ifindex=read_sysfs_int(os.path.join(net_dir, "ifindex")),
+                   mac=info["mac"],
+                   operstate=info["operstate"],
+                   mtu=read_sysfs_int(os.path.join(net_dir, "mtu")),
+                   carrier=info["carrier"],
+                   driver=info["driver"],
+                   device_link=info["device_link"],
+                   info=types.MappingProxyType(info))
+
+
+@typechecked
+def sweep_net_links(sysfs_root: str = default_sysfs_root) -> NetInventory:
+    links = {}
+    try:
+        names = os.listdir(os.path.join(sysfs_root, "class", "net"))
+    except OSError:
+        names = []
+    for name in names:
+        links[name] = read_net_link(name, sysfs_root)
+    return NetInventory(links)
+
+
+class NetInventoryCache:
+    """
+    Snapshot of the links of a sysfs tree, rebuilt after a link event.
+    Without rtnetlink (not Linux, not permitted, or a sysfs tree other
+    than the one of the running system) it is rebuilt by refresh() only.
+    """
+
+    def __init__(self, sysfs_root: str):
+        self.sysfs_root = sysfs_root
+        self.lock = threading.Lock()
+        self.inventory = None
+        self.events = None
+        if default_sysfs_root == sysfs_root:
+            self.events = self._open_link_events()
+
+    def _open_link_events(self):
+        try:
+            s = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                              socket.NETLINK_ROUTE)
+            s.bind((0, rtmgrp_link))
+            s.setblocking(False)
+            return s
+        except (AttributeError, OSError):
+            return None
+
+    def _pending_link_events(self) -> bool:
+        # Drain the queued events, any event invalidates the snapshot
+        pending = False
+        while True:
+            try:
+                if 0 == len(self.events.recv(65536)):
+                    break
+                pending = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Events lost (buffer overrun): the snapshot may be stale
+                pending = True
+                break
+        return pending
+
+    def get(self) -> NetInventory:
+        with self.lock:
+            if self.inventory is not None and self.events is not None and self._pending_link_events():
+                self.inventory = None
+            if self.inventory is None:
+                # The events socket is open before the sweep: no change
+                # can be missed
+                self.inventory = sweep_net_links(self.sysfs_root)
+            return self.inventory
+
+    def refresh(self):
+        with self.lock:
+            self.inventory = None
+
+
+net_inventory_caches = {}
+net_inventory_caches_lock = threading.Lock()
+
+
+@typechecked
+def get_net_inventory(sysfs_root: str = default_sysfs_root) -> NetInventory:
+    with net_inventory_caches_lock:
+        if sysfs_root not in net_inventory_caches:
+            net_inventory_caches[sysfs_root] = NetInventoryCache(sysfs_root)
+        cache = net_inventory_caches[sysfs_root]
+    return cache.get()
+
+
+@typechecked
+def refresh_net_inventory(sysfs_root: str = default_sysfs_root):
+    with net_inventory_caches_lock:
+        cache = net_inventory_caches.get(sysfs_root, None)
+    if cache is not None:
+        cache.refresh()
@@ -0,0 +1,68 @@
+import os
+import time
+
+from logging import Logger
+from .typecheck import typechecked
+from typing import Optional
+
+
+dpkg_status_file = "/var/lib/dpkg/status"
+apt_lists_dir = "/var/lib/apt/lists"
+
+
+@typechecked
+def get_installed_packages(logger: Logger, status_file: str = dpkg_status_file) -> set:
+    """
+    Names of the installed packages, read from the dpkg status database.
+    Multi-arch packages are also listed as name:arch.
+    """
+    installed = set()
+    try:
+        with open(status_file, "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+    except OSError as e:
+        logger.warning(f"Could not read the dpkg status file {status_file}: {e}")
+        return installed
+    # One paragraph per package, separated by blank lines
+    for paragraph in content.split("\n\n"):
+        fields = {}
+        for l in paragraph.split("\n"):
+            # Continuation lines start with a space
+            if "" == l or l[0] in " \t":
+                continue
+            sp = l.split(":", 1)
+            if 2 == len(sp):
+                fields[sp[0]] = sp[1].strip()
+        name = fields.get("Package", None)
+        if name is None:
+            continue
+        if "install ok installed" != fields.get("Status", ""):
+            continue
+        installed.add(name)
+        arch = fields.get("Architecture", None)
+        if arch is not None:
+            installed.add(f"{name}:{arch}")
+    return installed
+
+
+@typechecked
+def apt_index_age(logger: Logger, lists_dir: str = apt_lists_dir) -> Optional[float]:
+    """
+    Age in seconds of the most recently updated apt package index,
+    None if there is no index.
+    """
+    newest = None
+    try:
+        with os.scandir(lists_dir) as it:
+            for entry in it:
+                if not entry.is_file() or "lock" == entry.name:
+                    continue
+                mtime = entry.stat().st_mtime
+                if newest is None or mtime > newest:
+                    newest = mtime
+    except OSError as e:
+        logger.info(f"Could not read the apt lists directory {lists_dir}: {e}")
+        return None
+    if newest is None:
+        return None
+    return max(0.0, time.time() - newest)
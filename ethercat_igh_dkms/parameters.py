@@ -8,6 +8,22 @@ src_kernel_modules = "/usr/src"
 src_build = f"{src_kernel_modules}/ethercat"
 git_project = "https://gitlab.com/etherlab.org/ethercat.git"
 git_branch = "stable-1.6"
+# Pin git_branch to an exact commit (full 40 characters sha). When the
+# checkout is already at that commit no git command nor network access is
+# needed to build. None follows the tip of git_branch with «git pull».
+git_commit = None
+# Clone only the last commit of git_branch instead of the whole history.
+git_shallow_clone = False
+# Local bare mirror of git_project, used by the clones as an alternate object
+# store (nothing is copied and no network access is needed). It is created
+# from git_bundle_file (a file made with «git bundle create») if it is set,
+# from git_project otherwise, and updated with the refresh_mirror command.
+# None disables the mirror.
+git_mirror_dir = None
+"""
+git_mirror_dir = "/var/cache/ethercat_igh_dkms/ethercat.git"
+"""
+git_bundle_file = None
 # Guessing the Ethernet interface used for EtherCAT can work only in the
 # case of a single Ethernet interface. If you have multiple Ethernet interfaces
 # or the automatic guessing does not work, set the value to False.
@@ -34,12 +50,87 @@ device_modules = "generic"
 known_device_modules = [
     "generic", "8139too", "e100", "e1000", "e1000e", "r8169", "igb", "ccat"
 ]
+# Kernel drivers for which IgH provides a native device module: kernel
+# driver of the Ethernet board -> module of known_device_modules. To support
+# another board, add its kernel driver here.
+native_device_module_drivers = {
+    "8139too": "8139too",
+    "e100": "e100",
+    "e1000": "e1000",
+    "e1000e": "e1000e",
+    "r8169": "r8169",
+    "igb": "igb",
+    "ccat": "ccat"
+}
+# Select the device modules from the kernel drivers of the EtherCAT
+# interfaces: the native module of each board if any, and generic as
+# a fallback. This takes precedence over device_modules and enables
+# the configure switches of the selected modules.
+auto_select_device_modules = False
+# Derive the driver switches of configure_switches («generic», «e1000e», ...)
+# from the selected device modules: only the drivers listed in device_modules
+# (or in DEVICE_MODULES of an existing /etc/sysconfig/ethercat) and the
+# generic driver are built, the «active» value of these switches is ignored.
+derive_driver_switches = False
 
 project_dependencies = ["python3.10-full"]
 igh_ethercat_dependencies = ["git", "autoconf", "libtool",
                              "pkg-config", "make", "build-essential", "net-tools"]
 test_dependencies = ["mokutil"]
 dependencies = igh_ethercat_dependencies + test_dependencies
+# «apt-get update» is skipped when the package index is more recent than
+# apt_update_ttl seconds.
+apt_update_ttl = 24 * 3600
+
+# Number of parallel jobs given to make (-j). None sizes it automatically
+# from the online CPUs and the available memory, keeping at least
+# make_job_memory_mb of available memory per job.
+make_jobs = None
+make_job_memory_mb = 512
+
+# Build out of the source tree, in f"{src_build}-{git_branch}-build": one
+# directory per kernel release and configure fingerprint, so that switching
+# between configurations reuses the already built trees. The directory named
+# after the kernel release is a link to the configuration built last.
+# The builds for other kernels than the running one are always done out of
+# the tree. While the sources are configured in place, these builds use a
+# copy of the checkout in f"{src_build}-{git_branch}-src".
+out_of_tree_builds = False
+# Number of configuration directories kept per kernel release: the one in
+# use and the most recently used ones. The others are removed after a build.
+kept_build_configurations = 3
+
+# Compiler cache (ccache) for the configure and make invocations.
+# The cache is kept in ccache_dir and limited to ccache_max_size
+# (ccache size syntax, e.g. "2G" or "500M").
+use_ccache = False
+ccache_dir = "/var/cache/ethercat_igh_dkms/ccache"
+ccache_max_size = "2G"
+
+# Cache of built kernel modules shared between identical machines, keyed by
+# kernel release, kernel configuration, EtherCAT commit and configuration
+# fingerprint. Least recently used entries are evicted above
+# module_cache_max_size_mb.
+use_module_cache = False
+module_cache_dir = "/var/cache/ethercat_igh_dkms/modules"
+module_cache_max_size_mb = 1024
+
+# The log file is written by a background thread every log_flush_interval
+# seconds or when log_flush_size bytes are pending (errors are written at
+# once). Each run starts a new log file, the previous ones are kept
+# compressed (at most log_backup_count of them). A log file is also rotated
+# when it exceeds log_max_bytes.
+log_flush_interval = 1.0
+log_flush_size = 64 * 1024
+log_max_bytes = 20 * 1024 * 1024
+log_backup_count = 5
+
+# Number of bytes of the output of a command kept in memory (the end of the
+# output). The whole output is logged.
+exec_cmd_max_output = 1024 * 1024
+# Timeout in seconds of the git commands accessing the network
+# (clone, fetch, pull), None waits forever.
+git_network_timeout = 600
 
 installed_files = ["/usr/bin/ethercat", "/etc/init.d/ethercat"]
 links_to_create = [
@@ -0,0 +1,147 @@
+import time
+import json
+import resource
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from .typecheck import typechecked
+from typing import Optional
+
+
+# Phase being executed in the current thread/task, used to nest the phases
+current_phase = contextvars.ContextVar("current_phase", default=None)
+
+
+@typechecked
+def read_proc_io() -> dict:
+    """
+    I/O counters of this process from /proc/self/io. They include the
+    counters of the children that have been waited for.
+    """
+    counters = {}
+    try:
+        with open("/proc/self/io", "r") as f:
+            for l in f:
+                sp = l.split(":")
+                if 2 == len(sp):
+                    counters[sp[0].strip()] = int(sp[1])
+    except (OSError, ValueError):
+        pass
+    return counters
+
+
+@typechecked
+def resource_snapshot() -> dict:
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io = read_proc_io()
+    return {
+        "wall": time.perf_counter(),
+        "self_cpu": self_usage.ru_utime + self_usage.ru_stime,
+        "children_cpu": children_usage.ru_utime + children_usage.ru_stime,
+        "self_max_rss_kb": self_usage.ru_maxrss,
+        "children_max_rss_kb": children_usage.ru_maxrss,
+        "read_bytes": io.get("read_bytes", 0),
+        "write_bytes": io.get("write_bytes", 0),
+        "rchar": io.get("rchar", 0),
+        "wchar": io.get("wchar", 0)
+    }
+
+
+class PhaseRecorder:
+    """
+    Record the wall time, CPU time, I/O bytes and process-wide peak RSS
+    (with its growth during the phase) of named phases.
+    Phases can be nested, the parent of a phase is the phase running in the
+    same thread or asyncio task when it starts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = []
+        self.start_time = time.time()
+
+    @contextmanager
+    def phase(self, name: str):
+        parent = current_phase.get()
+        entry = {
+            "name": name,
+            "path": name if parent is None else parent["path"] + "/" + name,
+            "parent": None if parent is None else parent["path"],
+            "start": time.time() - self.start_time,
+            "status": "running"
+        }
+        token = current_phase.set(entry)
+        before = resource_snapshot()
+        try:
+            yield entry
+            entry["status"] = "ok"
+        except BaseException:
+            entry["status"] = "error"
+            raise
+        finally:
+            after = resource_snapshot()
+            current_phase.reset(token)
+            entry["wall_time"] = after["wall"] - before["wall"]
+            entry["cpu_time"] = after["self_cpu"] - before["self_cpu"]
+            entry["children_cpu_time"] = after["children_cpu"] - \
+                before["children_cpu"]
+            # ru_maxrss is a high-water mark over the life of the process
+            # (of the largest child waited for): the peaks are process-wide,
+            # the growth is how much the phase raised them
+            entry["process_peak_rss_kb"] = after["self_max_rss_kb"]
+            entry["peak_rss_growth_kb"] = after["self_max_rss_kb"] - \
+                before["self_max_rss_kb"]
+            entry["children_peak_rss_kb"] = after["children_max_rss_kb"]
+            entry["children_peak_rss_growth_kb"] = after["children_max_rss_kb"] - \
+                before["children_max_rss_kb"]
+            for k in ["read_bytes", "write_bytes", "rchar", "wchar"]:
+                entry[k] = after[k] - before[k]
+            with self.lock:
+                self.phases.append(entry)
+
+    def report(self) -> dict:
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p["start"])
+        return {
+            "started": self.start_time,
+            "total_time": time.time() - self.start_time,
+            "phases": phases
+        }
+
+    def save(self, file_path: str):
+        with open(file_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def clear(self):
+        with self.lock:
+            self.phases = []
+            self.start_time = time.time()
+
+
+phase_recorder = PhaseRecorder()
+
+
+def phase(name: str):
+    return phase_recorder.phase(name)
+
+
+def recorded_phase(name: str):
+    """
+    Decorator recording each call of the decorated function as a phase
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase_recorder.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@typechecked
+def current_phase_name() -> Optional[str]:
+    entry = current_phase.get()
+    return None if entry is None else entry["path"]
@@ -0,0 +1,258 @@
+import os
+import mmap
+
+from logging import Logger
+from .typecheck import typechecked
+from typing import Optional
+
+
+# Hardware information of the network interfaces read directly from sysfs,
+# with the names of the PCI devices taken from the pci.ids database.
+
+default_sysfs_root = "/sys"
+pci_ids_files = ["/usr/share/misc/pci.ids",
+                 "/usr/share/hwdata/pci.ids",
+                 "/usr/share/pci.ids"]
+
+
+@typechecked
+def read_sysfs_attr(path: str) -> Optional[str]:
+    # Some attributes cannot be read (e.g. speed of a link that is down)
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+@typechecked
+def read_sysfs_int(path: str) -> Optional[int]:
+    value = read_sysfs_attr(path)
+    if value is None:
+        return None
+    try:
+        return int(value, 0)
+    except ValueError:
+        return None
+
+
+@typechecked
+def list_net_interfaces(sysfs_root: str = default_sysfs_root) -> list[str]:
+    try:
+        return sorted(os.listdir(os.path.join(sysfs_root, "class", "net")))
+    except OSError:
+        return []
+
+
+@typechecked
+def device_bus(device_path: str) -> Optional[str]:
+    # The subsystem link of a device names its bus
+    subsystem = os.path.join(device_path, "subsystem")
+    if os.path.islink(subsystem):
+        return os.path.basename(os.readlink(subsystem))
+    return None
+
+
+@typechecked
+def probe_net_interface(interface: str, sysfs_root: str = default_sysfs_root) -> dict:
+    """
+    Information about a network interface: device link, bus and address
+    of the device, driver, PCI ids, NUMA node, MAC address, link speed
+    (Mb/s), carrier and operational state. The missing values are None.
+    """
+    net_dir = os.path.join(sysfs_root, "class", "net", interface)
+    device_dir = os.path.join(net_dir, "device")
+    info = {
+        "interface": interface,
+        "device_link": None,
+        "bus": None,
+        "address": None,
+        "driver": None,
+        "vendor_id": None,
+        "device_id": None,
+        "subsystem_vendor_id": None,
+        "subsystem_device_id": None,
+        "numa_node": None,
+        "mac": read_sysfs_attr(os.path.join(net_dir, "address")),
+        "speed": read_sysfs_int(os.path.join(net_dir, "speed")),
+        "carrier": read_sysfs_int(os.path.join(net_dir, "carrier")),
+        "operstate": read_sysfs_attr(os.path.join(net_dir, "operstate"))
+    }
+    if not os.path.islink(device_dir):
+        # Virtual interface
+        return info
+    info["device_link"] = os.readlink(device_dir)
+    info["address"] = os.path.basename(info["device_link"])
+    info["bus"] = device_bus(device_dir)
+    driver = os.path.join(device_dir, "driver")
+    if os.path.islink(driver):
+        info["driver"] = os.path.basename(os.readlink(driver))
+    if "pci" == info["bus"]:
+        for k, attr in [("vendor_id", "vendor"), ("device_id", "device"),
+                        ("subsystem_vendor_id", "subsystem_vendor"),
+                        ("subsystem_device_id", "subsystem_device")]:
+            value = read_sysfs_int(os.path.join(device_dir, attr))
+            if value is not None:
+                info[k] = f"{value:04x}"
+        numa_node = read_sysfs_int(os.path.join(device_dir, "numa_node"))
+        # -1: no NUMA affinity
+        if numa_node is not None and numa_node >= 0:
+            info["numa_node"] = numa_node
+    return info
+
+
+@typechecked
+def probe_pci_device(address: str, sysfs_root: str = default_sysfs_root) -> Optional[dict]:
+    # Same information as probe_net_interface from a PCI address
+    # (e.g. 0000:03:00.0)
+    device_dir = os.path.join(sysfs_root, "bus", "pci", "devices", address)
+    if not os.path.exists(device_dir):
+        return None
+    info = {"address": address, "driver": None, "numa_node": None}
+    for k, attr in [("class", "class"), ("vendor_id", "vendor"), ("device_id", "device"),
+                    ("subsystem_vendor_id", "subsystem_vendor"),
+                    ("subsystem_device_id", "subsystem_device")]:
+        value = read_sysfs_int(os.path.join(device_dir, attr))
+        info[k] = None if value is None else f"{value:04x}"
+    driver = os.path.join(device_dir, "driver")
+    if os.path.islink(driver):
+        info["driver"] = os.path.basename(os.readlink(driver))
+    numa_node = read_sysfs_int(os.path.join(device_dir, "numa_node"))
+    if numa_node is not None and numa_node >= 0:
+        info["numa_node"] = numa_node
+    return info
+
+
+class PciIds:
+    """
+    Names of the PCI vendors and devices. The pci.ids file is memory mapped
+    and indexed on the first lookup: only the offsets of the vendor lines
+    are kept, the devices of a vendor are read when asked for.
+    """
+
+    def __init__(self, files: Optional[list] = None):
+        self.files = pci_ids_files if files is None else files
+        self.data = None
+        self.vendors = None
+
+    def _load(self):
+        if self.vendors is not None:
+            return
+        self.vendors = {}
+        for path in self.files:
+            try:
+                with open(path, "rb") as f:
+                    self.data = mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ)
+                break
+            except (OSError, ValueError):
+                continue
+        if self.data is None:
+            return
+        data = self.data
+        offset = 0
+        size = len(data)
+        while offset < size:
+            end = data.find(b"\n", offset)
+            if -1 == end:
+                end = size
+            # Vendor lines: «vvvv  name», device classes start with «C »
+            # and end the vendor list
+            first = data[offset:offset + 1]
+            if first not in (b"\t", b"#", b"\n", b""):
+                if b"C " == data[offset:offset + 2]:
+                    break
+                self.vendors[data[offset:offset + 4].decode().lower()] = offset
+            offset = end + 1
+
+    def _vendor_lines(self, vendor_id: str):
+        # The lines of a vendor entry: the vendor line then its devices
+        offset = self.vendors[vendor_id]
+        data = self.data
+        first = True
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if -1 == end:
+                end = len(data)
+            line = data[offset:end].decode("utf-8", errors="replace")
+            if not first and line and not line.startswith("\t") and not line.startswith("#"):
+                return
+            first = False
+            yield line
+            offset = end + 1
+
+    @typechecked
+    def vendor_name(self, vendor_id: str) -> Optional[str]:
+        self._load()
+        vendor_id = vendor_id.lower()
+        if vendor_id not in self.vendors:
+            return None
+        for line in self._vendor_lines(vendor_id):
+            return line[4:].strip()
+        return None
+
+    @typechecked
+    def device_name(self, vendor_id: str, device_id: str, subsystem_vendor_id: Optional[str] = None, subsystem_device_id: Optional[str] = None) -> Optional[str]:
+        """
+        Name of a device, the name of its subsystem (board) if known.
+        """
+        self._load()
+        vendor_id = vendor_id.lower()
+        device_id = device_id.lower()
+        if vendor_id not in self.vendors:
+            return None
+        name = None
+        in_device = False
+        subsystem = None
+        if subsystem_vendor_id is not None and subsystem_device_id is not None:
+            subsystem = f"{subsystem_vendor_id} {subsystem_device_id}".lower()
+        for line in self._vendor_lines(vendor_id):
+            if line.startswith("\t\t"):
+                if in_device and subsystem is not None and line[2:11].lower() == subsystem:
+                    return line[11:].strip()
+            elif line.startswith("\t"):
+                if in_device:
+                    break
+                if line[1:5].lower() == device_id:
+                    name = line[5:].strip()
+                    in_device = True
+        return name
+
+
+pci_ids = PciIds()
+
+
+@typechecked
+def describe_pci_device(address: str, logger: Logger, sysfs_root: str = default_sysfs_root) -> Optional[str]:
+    """
+    Description of a PCI device close to the one given by «lspci -v -s».
+    """
+    info = probe_pci_device(address, sysfs_root)
+    if info is None:
+        logger.info(f"Could not find the PCI device {address} in sysfs")
+        return None
+    vendor = None
+    device = None
+    if info["vendor_id"] is not None and info["device_id"] is not None:
+        vendor = pci_ids.vendor_name(info["vendor_id"])
+        device = pci_ids.device_name(info["vendor_id"], info["device_id"])
+    if vendor is None:
+        vendor = f"Vendor {info['vendor_id']}"
+    if device is None:
+        device = f"Device {info['device_id']}"
+    short_address = address[5:] if 3 == len(address.split(":")) else address
+    lines = [f"{short_address} Ethernet controller: {vendor} {device} [{info['vendor_id']}:{info['device_id']}]"]
+    if info["subsystem_vendor_id"] is not None and info["subsystem_device_id"] is not None:
+        subsystem = pci_ids.device_name(info["vendor_id"], info["device_id"],
+                                        info["subsystem_vendor_id"], info["subsystem_device_id"])
+        if subsystem is None or subsystem == device:
+            subsystem = f"Device {info['subsystem_device_id']}"
+        subsystem_vendor = pci_ids.vendor_name(info["subsystem_vendor_id"])
+        if subsystem_vendor is None:
+            subsystem_vendor = f"Vendor {info['subsystem_vendor_id']}"
+        lines.append(f"\tSubsystem: {subsystem_vendor} {subsystem}")
+    if info["numa_node"] is not None:
+        lines.append(f"\tNUMA node: {info['numa_node']}")
+    if info["driver"] is not None:
+        lines.append(f"\tKernel driver in use: {info['driver']}")
+    return "\n".join(lines)
@@ -0,0 +1,40 @@
+import os
+import functools
+
+
+# Runtime type checking of the annotated functions with typeguard. A function
+# is instrumented on its first call and not when its module is imported:
+# instrumenting parses the source of the module, which made importing the
+# package take seconds. ETHERCAT_IGH_DKMS_TYPECHECK=0 turns the checks off,
+# typeguard is then not even imported.
+
+typecheck_env_var = "ETHERCAT_IGH_DKMS_TYPECHECK"
+# Flag of the code of the coroutine functions (inspect.CO_COROUTINE)
+co_coroutine = 0x80
+typecheck_enabled = os.environ.get(typecheck_env_var, "1").strip().lower() not in (
+    "0", "false", "no", "off")
+
+
+def typechecked(func):
+    if not typecheck_enabled:
+        return func
+    instrumented = None
+
+    def instrument():
+        nonlocal instrumented
+        if instrumented is None:
+            from typeguard import typechecked as typeguard_typechecked
+            instrumented = typeguard_typechecked(func)
+        return instrumented
+
+    if func.__code__.co_flags & co_coroutine:
+        # Still a coroutine function for asyncio.iscoroutinefunction
+        @functools.wraps(func)
+        async def checked_coroutine(*args, **kwargs):
+            return await instrument()(*args, **kwargs)
+        return checked_coroutine
+
+    @functools.wraps(func)
+    def checked(*args, **kwargs):
+        return instrument()(*args, **kwargs)
+    return checked
@@ -0,0 +1,49 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import click
+
+
+@click.command()
+@click.option('--skip_dependencies', is_flag=True, show_default=True,  default=False, help='Do not install dependencies', required=False)
+@click.option('--check_secure_boot', is_flag=True, show_default=True, default=False, help='Check secure boot', required=False)
+@click.option('-k', '--kernel', multiple=True, help='Kernel release to build for (repeatable), default: every kernel with headers in /lib/modules', required=False)
+@click.option('-j', '--workers', type=int, default=None, help='Number of parallel worker processes', required=False)
+@click.option('--install', is_flag=True, show_default=True, default=False, help='Install the modules of the successful builds', required=False)
+def main(skip_dependencies=False, check_secure_boot=False, kernel=(), workers=None, install=False):
+    proj_name = "ethercat_igh_dkms"
+    log_dir = "/var/log/" + proj_name
+    log_file = proj_name + ".build_all_kernels"
+
+    # Log management
+    ################
+    edkms.create_logger(log_file, log_dir)
+
+    # Build the modules for all the kernels
+    #######################################
+    try:
+        report = edkms.build_modules_for_all_kernels(
+            do_install_dependencies=not skip_dependencies,
+            check_secure_boot=check_secure_boot,
+            kernels=list(kernel) if 0 < len(kernel) else None,
+            max_workers=workers)
+        failed = False
+        for r in report["kernels"]:
+            if r["success"]:
+                print(f"{r['kernel']}: OK ({r['duration']:.1f}s)")
+                if install:
+                    edkms.install_module(kernel_release=r["kernel"])
+            else:
+                failed = True
+                print(f"{r['kernel']}: FAILED ({r['error']})")
+        edkms.save_installed_files()
+        if failed:
+            sys.exit(-1)
+    except Exception as e:
+        edkms.get_logger().error(f"Multi-kernel build failed: {e}")
+        print(f"Error: {e}")
+        sys.exit(-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import os
+import click
+
+
+@click.command()
+@click.option('--log_dir', default="/var/log/ethercat_igh_dkms", help='Directory of the logs')
+@click.option('--name', default=None, help='Log name of the run (e.g. ethercat_igh_dkms.build), default is the most recent run')
+@click.option('--tail', default=4096, help='Number of bytes shown at the end of the output of the failed command')
+def main(log_dir, name, tail):
+    """
+    Show the first error of the last build from its stored command output,
+    without going through the log.
+    """
+    if name is not None:
+        directory = os.path.join(log_dir, name + edkms.build_output_dir_suffix)
+    else:
+        stores = [os.path.join(log_dir, d) for d in os.listdir(log_dir)
+                  if d.endswith(edkms.build_output_dir_suffix)] if os.path.isdir(log_dir) else []
+        stores = [d for d in stores if os.path.exists(
+            os.path.join(d, edkms.build_output_index_name))]
+        if 0 == len(stores):
+            print(f"Error: no build output found in {log_dir}")
+            sys.exit(-1)
+        directory = max(stores, key=lambda d: os.path.getmtime(
+            os.path.join(d, edkms.build_output_index_name)))
+    if not os.path.isdir(directory):
+        print(f"Error: no build output found in {directory}")
+        sys.exit(-1)
+    print(edkms.build_summary(directory, tail))
+    if edkms.first_build_error(directory) is not None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import ethercat_igh_dkms as edkms
 import sys
 import subprocess
+import shutil
 import traceback
 import os
 from pathlib import Path
@@ -83,18 +84,42 @@ def main(interactive, skip_dependencies=False, skip_secure_boot_check=False, ove
         if interactive:
             print(imsg, flush=True)
 
-        # Build the kernel modules
-        edkms.build_module(do_install_dependencies=not skip_dependencies,
-                           check_secure_boot=not skip_secure_boot_check)
-
-        # Install kernel modules and tools
-        imsg = "Installing the kernel modules and tools. This may take some time ..."
-        edkms.get_logger().info(imsg)
-        if interactive:
-            print(imsg, flush=True)
-        edkms.install_module()
-        edkms.post_install(override_config=override_config)
+        # The secure boot check needs the dependencies (mokutil, ...). The
+        # sources synchronization only needs git: when it is already
+        # installed, the sources are fetched while the other dependencies
+        # are installed
+        prerequisites = []
+        steps = []
+        if not skip_dependencies:
+            steps.append(edkms.InstallStep(
+                "dependencies", edkms.install_dependencies))
+            prerequisites.append("dependencies")
+        sources_depends_on = [] if shutil.which("git") is not None else prerequisites
+        # The build needs all the dependencies (autoconf, libtool, ...)
+        build_depends_on = prerequisites + ["sources"]
+        if not skip_secure_boot_check:
+            steps.append(edkms.InstallStep(
+                "secure boot", edkms.check_secure_boot_state,
+                depends_on=prerequisites))
+            build_depends_on.append("secure boot")
+        steps += [
+            edkms.InstallStep("sources", edkms.sync_sources,
+                              depends_on=sources_depends_on,
+                              args=(edkms.def_source_dir(),)),
+            edkms.InstallStep("build", edkms.build_module,
+                              depends_on=build_depends_on,
+                              kwargs={"do_install_dependencies": False,
+                                      "check_secure_boot": False,
+                                      "do_sync_sources": False}),
+            edkms.InstallStep("install", edkms.install_module,
+                              depends_on=["build"]),
+            edkms.InstallStep("post_install", edkms.post_install,
+                              depends_on=["install"],
+                              kwargs={"override_config": override_config})
+        ]
+        edkms.run_install_steps(steps, edkms.get_logger())
         edkms.save_installed_files()
+        edkms.save_phase_report()
 
         imsg = "\n\n========\nSUCCESS:\n========\nEtherCAT IGH Master kernel modules and tools for Linux have been installed.\n"
         edkms.get_logger().info(imsg)
@@ -107,6 +132,8 @@ def main(interactive, skip_dependencies=False, skip_secure_boot_check=False, ove
             traceback.TracebackException.from_exception(e).format())
         edkms.get_logger().error(imsg)
         print(imsg, flush=True)
+        # Keep the timings of the phases run before the failure
+        edkms.save_phase_report()
         sys.exit(-1)
 
 
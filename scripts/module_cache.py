@@ -0,0 +1,41 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import click
+
+
+@click.group()
+def main():
+    proj_name = "ethercat_igh_dkms"
+    log_dir = "/var/log/" + proj_name
+    log_file = proj_name + ".module_cache"
+
+    # Log management
+    ################
+    edkms.create_logger(log_file, log_dir)
+
+
+@main.command("export", help='Export the kernel module cache to a single archive')
+@click.argument('archive', type=click.Path(dir_okay=False))
+def export_cache(archive):
+    try:
+        edkms.export_module_cache(archive)
+    except Exception as e:
+        edkms.get_logger().error(f"Impossible to export the module cache: {e}")
+        print(f"Error: {e}")
+        sys.exit(-1)
+
+
+@main.command("import", help='Seed the kernel module cache from an archive')
+@click.argument('archive', type=click.Path(exists=True, dir_okay=False))
+def import_cache(archive):
+    try:
+        edkms.import_module_cache(archive)
+    except Exception as e:
+        edkms.get_logger().error(f"Impossible to import the module cache: {e}")
+        print(f"Error: {e}")
+        sys.exit(-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import os
+import click
+
+
+@click.command()
+@click.argument('kernel')
+def main(kernel):
+    """
+    Build and install the kernel modules for KERNEL, a kernel whose headers
+    have just been installed, so that they are ready at its first boot.
+    """
+    proj_name = "ethercat_igh_dkms"
+    log_dir = "/var/log/" + proj_name
+    log_file = proj_name + ".prebuild"
+
+    # Log management
+    ################
+    edkms.create_logger(log_file, log_dir)
+    edkms.get_logger().info(f"Prebuilding the modules for kernel {kernel}...")
+
+    if not os.path.isdir(os.path.join(edkms.modules_root_dir, kernel, "build")):
+        edkms.get_logger().error(f"No kernel headers found for {kernel}")
+        sys.exit(-1)
+
+    # Build and install the module
+    ##############################
+    try:
+        # Keep the files recorded by the previous installs
+        edkms.load_installed_files()
+        with edkms.phase("prebuild"):
+            edkms.build_module(do_install_dependencies=False,
+                               check_secure_boot=False,
+                               do_sync_sources=False,
+                               kernel_release=kernel)
+            edkms.install_module(kernel_release=kernel)
+        edkms.save_installed_files()
+        edkms.get_logger().info(
+            f"Success: modules prebuilt for kernel {kernel}")
+    except (Exception, SystemExit) as e:
+        edkms.get_logger().error(
+            f"Prebuild for kernel {kernel} failed: {e}")
+        sys.exit(-1)
+
+
+if __name__ == "__main__":
+    main()
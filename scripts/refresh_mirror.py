@@ -0,0 +1,28 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import click
+
+
+@click.command()
+@click.option('-b', '--bundle', type=click.Path(exists=True, dir_okay=False), default=None, help='Git bundle file to refresh the mirror from, without network access', required=False)
+def main(bundle=None):
+    proj_name = "ethercat_igh_dkms"
+    log_dir = "/var/log/" + proj_name
+    log_file = proj_name + ".refresh_mirror"
+
+    # Log management
+    ################
+    edkms.create_logger(log_file, log_dir)
+
+    # Refresh the local git mirror
+    ##############################
+    try:
+        edkms.refresh_git_mirror(bundle_file=bundle)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#! /usr/bin/env python3
+import ethercat_igh_dkms as edkms
+import sys
+import json
+import click
+
+
+@click.command()
+@click.option('--rehash', is_flag=True, default=False, help='Hash every file, even when its size and modification time did not change')
+@click.option('--json', 'as_json', is_flag=True, default=False, help='Print the whole report as JSON')
+def main(rehash, as_json):
+    """
+    Check that the installed files (kernel modules, ethercat tool, symbolic
+    links, configuration files) still match what was installed. Exits with
+    1 if some file is missing or changed.
+    """
+    # No log: verify only reads, and must stay fast
+    try:
+        report = edkms.verify_installation(rehash=rehash)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(-1)
+    drift = [r for r in report if r["status"] not in ("ok", "unrecorded")]
+    if as_json:
+        print(json.dumps(report, indent=2))
+    else:
+        for r in report:
+            if "ok" != r["status"]:
+                details = f" ({r['details']})" if "" != r["details"] else ""
+                print(f"{r['status']}: {r['path']}{details}")
+        print(f"{len(report)} files checked, {len(drift)} drifted")
+    sys.exit(1 if len(drift) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
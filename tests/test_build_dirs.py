@@ -0,0 +1,236 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_build_dirs.py
+"""
+import unittest
+import os
+import subprocess
+import tempfile
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Stands for the bootstrap script of the sources: counts its runs
+fake_bootstrap = """#!/bin/sh
+echo run >> bootstrap.runs
+echo '#!/bin/sh' > configure
+"""
+
+
+def git(repo_dir: str, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "-C", repo_dir] + list(args),
+                   check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+# Bootstrap generating a configure script that generates a Makefile whose
+# targets do nothing
+fake_bootstrap_configure = """#!/bin/sh
+cat > configure <<'END'
+#!/bin/sh
+printf 'all:\\nmodules:\\nclean:\\n' > Makefile
+touch config.status
+END
+chmod +x configure
+"""
+
+
+def bootstrap_runs(source_dir: str) -> int:
+    try:
+        with open(os.path.join(source_dir, "bootstrap.runs"), "r") as f:
+            return len(f.readlines())
+    except OSError:
+        return 0
+
+
+class TestBuildDirs(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = (edkms_module.out_of_tree_builds, edkms_module.src_build,
+                      edkms_module.installed_files)
+
+    def tearDown(self):
+        (edkms_module.out_of_tree_builds, edkms_module.src_build,
+         edkms_module.installed_files) = self.saved
+
+    def test_def_build_dir(self):
+        source_dir = edkms.def_source_dir()
+        edkms_module.out_of_tree_builds = False
+        self.assertEqual(edkms.def_build_dir(), source_dir)
+        edkms_module.out_of_tree_builds = True
+        self.assertEqual(edkms.def_build_dir(),
+                         os.path.join(f"{source_dir}-build", edkms.get_kernel_version()))
+
+    def test_activate_build_dir(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_dir = os.path.join(tmp, "6.8.0-generic")
+            # Build directory of a previous version
+            os.makedirs(build_dir)
+            configs = []
+            for fingerprint in ["a" * 64, "b" * 64]:
+                config_dir = edkms.configuration_build_dir(
+                    build_dir, fingerprint)
+                os.makedirs(config_dir)
+                configs.append(config_dir)
+            for config_dir in configs + configs[:1]:
+                edkms.activate_build_dir(build_dir, config_dir)
+                self.assertTrue(os.path.islink(build_dir))
+                self.assertEqual(os.path.realpath(build_dir),
+                                 os.path.realpath(config_dir))
+            # Both configurations are kept
+            self.assertEqual(sorted(os.listdir(tmp)),
+                             sorted([os.path.basename(build_dir)] + [os.path.basename(c) for c in configs]))
+
+    def test_prune_configuration_build_dirs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_dir = os.path.join(tmp, "6.8.0-generic")
+            configs = []
+            for i, fingerprint in enumerate(["a" * 64, "b" * 64, "c" * 64, "d" * 64]):
+                config_dir = edkms.configuration_build_dir(
+                    build_dir, fingerprint)
+                os.makedirs(config_dir)
+                edkms.save_config_fingerprint(config_dir, fingerprint)
+                os.utime(config_dir, (1000 + i, 1000 + i))
+                configs.append(config_dir)
+            # Another kernel release
+            other = edkms.configuration_build_dir(
+                os.path.join(tmp, "6.9.0-generic"), "e" * 64)
+            os.makedirs(other)
+            # The oldest configuration is the active one
+            os.symlink(os.path.basename(configs[0]), build_dir)
+            edkms.prune_configuration_build_dirs(build_dir, 2)
+            self.assertEqual([os.path.exists(c) for c in configs],
+                             [True, False, False, True])
+            self.assertFalse(os.path.exists(
+                edkms.config_fingerprint_file(configs[1])))
+            self.assertTrue(os.path.exists(
+                edkms.config_fingerprint_file(configs[3])))
+            self.assertTrue(os.path.exists(other))
+            # Activating marks the configuration as used
+            edkms.activate_build_dir(build_dir, configs[3])
+            edkms.prune_configuration_build_dirs(build_dir, 1)
+            self.assertEqual([os.path.exists(c) for c in configs],
+                             [False, False, False, True])
+
+    def test_prepare_out_of_tree_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source_dir = os.path.join(tmp, "ethercat")
+            os.makedirs(source_dir)
+            bootstrap = os.path.join(source_dir, "bootstrap")
+            with open(bootstrap, "w") as f:
+                f.write(fake_bootstrap)
+            os.chmod(bootstrap, 0o755)
+            git(source_dir, "init", "-q")
+            git(source_dir, "add", "bootstrap")
+            git(source_dir, "commit", "-q", "-m", "sources")
+            # Not configured in place: the sources are used directly
+            self.assertEqual(edkms.prepare_out_of_tree_sources(
+                source_dir), source_dir)
+            self.assertEqual(1, bootstrap_runs(source_dir))
+            self.assertEqual(edkms.prepare_out_of_tree_sources(
+                source_dir), source_dir)
+            self.assertEqual(1, bootstrap_runs(source_dir))
+            # Configured in place: the configuration is kept, a copy is used
+            config_status = os.path.join(source_dir, "config.status")
+            with open(config_status, "w") as f:
+                f.write("#!/bin/sh\n")
+            sources = edkms.prepare_out_of_tree_sources(source_dir)
+            self.assertEqual(sources, edkms.out_of_tree_source_copy(source_dir))
+            self.assertTrue(os.path.exists(config_status))
+            self.assertEqual(edkms.get_git_commit(sources),
+                             edkms.get_git_commit(source_dir))
+            self.assertEqual(1, bootstrap_runs(sources))
+            self.assertEqual(edkms.prepare_out_of_tree_sources(
+                source_dir), sources)
+            self.assertEqual(1, bootstrap_runs(sources))
+            # New commit: the copy follows and the configure script is
+            # generated again
+            git(source_dir, "commit", "-q", "--allow-empty", "-m", "next")
+            self.assertEqual(edkms.prepare_out_of_tree_sources(
+                source_dir), sources)
+            self.assertEqual(edkms.get_git_commit(sources),
+                             edkms.get_git_commit(source_dir))
+            self.assertEqual(2, bootstrap_runs(sources))
+            self.assertTrue(os.path.exists(config_status))
+
+    def test_prebuild_keeps_the_installation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            edkms_module.out_of_tree_builds = False
+            edkms_module.src_build = os.path.join(tmp, "ethercat")
+            installed_file = os.path.join(tmp, "ethercat-tool")
+            edkms_module.installed_files = [installed_file]
+            source_dir = edkms.def_source_dir()
+            os.makedirs(source_dir)
+            bootstrap = os.path.join(source_dir, "bootstrap")
+            with open(bootstrap, "w") as f:
+                f.write(fake_bootstrap_configure)
+            os.chmod(bootstrap, 0o755)
+            git(source_dir, "init", "-q")
+            git(source_dir, "add", "bootstrap")
+            git(source_dir, "commit", "-q", "-m", "sources")
+            # In-tree build of the running kernel, then installation
+            edkms.build_module(do_install_dependencies=False, check_secure_boot=False,
+                               do_sync_sources=False)
+            with open(installed_file, "w") as f:
+                f.write("installed\n")
+            fingerprint_file = edkms.config_fingerprint_file(source_dir)
+            with open(fingerprint_file, "r") as f:
+                fingerprint = f.read()
+            # Prebuild for the running kernel and another one
+            for kernel_release in [edkms.get_kernel_version(), "0.0.0-test"]:
+                edkms.build_module(do_install_dependencies=False, check_secure_boot=False,
+                                   do_sync_sources=False, kernel_release=kernel_release)
+                build_dir = edkms.def_build_dir(kernel_release)
+                self.assertNotEqual(build_dir, source_dir)
+                self.assertTrue(os.path.exists(
+                    os.path.join(build_dir, "Makefile")))
+                self.assertTrue(os.path.exists(installed_file))
+                self.assertTrue(os.path.exists(
+                    os.path.join(source_dir, "config.status")))
+                with open(fingerprint_file, "r") as f:
+                    self.assertEqual(fingerprint, f.read())
+
+    def test_userspace_artifacts_digest(self):
+        # The same tools built for two kernels in two configuration
+        # directories: make install is skipped for the second one
+        with tempfile.TemporaryDirectory() as tmp:
+            source_dir = os.path.join(tmp, "ethercat")
+            os.makedirs(os.path.join(source_dir, "include"))
+            with open(os.path.join(source_dir, "include", "ecrt.h"), "w") as f:
+                f.write("ecrt")
+            digests = []
+            for kernel_release in ["6.8.0-generic", "6.9.0-generic"]:
+                build_dir = os.path.join(tmp, kernel_release, "a" * 12)
+                for d in ["tool/.deps", "lib/.libs", "script"]:
+                    os.makedirs(os.path.join(build_dir, d))
+                for name, content in [("tool/ethercat", "tool"), ("lib/.libs/libethercat.so", "lib"),
+                                      ("script/ethercatctl", "ctl"), ("tool/main.o", kernel_release),
+                                      ("tool/Makefile", f"LINUX_SOURCE_DIR = /lib/modules/{kernel_release}/build"),
+                                      ("tool/.deps/main.Po", kernel_release)]:
+                    with open(os.path.join(build_dir, name), "w") as f:
+                        f.write(content)
+                digests.append(edkms.userspace_artifacts_digest(build_dir, source_dir))
+            self.assertEqual(digests[0], digests[1])
+            with open(os.path.join(build_dir, "tool", "ethercat"), "w") as f:
+                f.write("other tool")
+            self.assertNotEqual(digests[0], edkms.userspace_artifacts_digest(build_dir, source_dir))
+            # The files written by make install
+            install_dir = os.path.join(tmp, "etherlab")
+            os.makedirs(os.path.join(install_dir, "bin"))
+            with open(os.path.join(install_dir, "bin", "ethercat"), "w") as f:
+                f.write("tool")
+            installed = edkms.files_content_digests(install_dir, ["bin/ethercat"])
+            self.assertTrue(edkms.installed_userspace_unchanged(install_dir, installed))
+            self.assertFalse(edkms.installed_userspace_unchanged(install_dir, {}))
+            os.remove(os.path.join(install_dir, "bin", "ethercat"))
+            self.assertFalse(edkms.installed_userspace_unchanged(install_dir, installed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_build_output.py
+"""
+import unittest
+import tempfile
+
+from ethercat_igh_dkms import build_output
+
+compiler_output = (
+    "  CC [M]  /src/devices/generic.o\n"
+    "/src/devices/generic.c:42:5: warning: unused variable 'x' [-Wunused-variable]\n"
+    "/src/master/master.c:120:12: error: 'foo' undeclared (first use in this function)\n"
+    "make[2]: *** [scripts/Makefile.build:243: /src/master/master.o] Error 1\n"
+    "make: *** [Makefile:1906: /src] Error 2\n"
+)
+
+
+class TestBuildOutput(unittest.TestCase):
+    def test_parse_diagnostic_line(self):
+        d = build_output.parse_diagnostic_line(
+            "/src/master/master.c:120:12: error: 'foo' undeclared")
+        self.assertEqual(d["file"], "/src/master/master.c")
+        self.assertEqual(d["line"], 120)
+        self.assertEqual(d["column"], 12)
+        self.assertEqual(d["severity"], "error")
+        d = build_output.parse_diagnostic_line(
+            'ERROR: modpost: "ecdev_offer" [ec_igb.ko] undefined!')
+        self.assertEqual(d["severity"], "modpost error")
+        self.assertIsNone(build_output.parse_diagnostic_line(
+            "  CC [M]  /src/devices/generic.o"))
+
+    def test_split_chunks(self):
+        # Lines and UTF-8 characters cut between chunks
+        data = ("/src/a.c:1:1: warning: «é»\n" + compiler_output).encode()
+        parser = build_output.DiagnosticsParser()
+        for i in range(0, len(data), 7):
+            parser.feed(data[i:i + 7])
+        parser.close()
+        self.assertEqual(parser.counts, {
+                         "warning": 2, "error": 1, "make error": 2})
+        self.assertEqual(parser.diagnostics[0]["message"], "«é»")
+
+    def test_store_and_summary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = build_output.open_build_output_store(tmp)
+            ok = store.begin(["make", "modules_install"], "install")
+            ok.write(b"nothing to do\n")
+            # Interleaved commands
+            failed = store.begin(["make", "all", "modules"], "build")
+            failed.write(compiler_output[:100].encode())
+            ok.write(b"done\n")
+            failed.write(compiler_output[100:].encode())
+            ok.end(0)
+            failed.end(2)
+            entries = build_output.read_build_output_index(tmp)
+            self.assertEqual([e["step"] for e in entries], ["install", "build"])
+            self.assertEqual(build_output.read_command_output(tmp, entries[0]),
+                             "nothing to do\ndone\n")
+            self.assertEqual(build_output.read_command_output(tmp, entries[1]),
+                             compiler_output)
+            self.assertEqual(build_output.read_command_output(tmp, entries[1], 10),
+                             compiler_output[-10:])
+            error = build_output.first_build_error(tmp)
+            self.assertEqual(error["entry"]["step"], "build")
+            self.assertEqual(error["diagnostic"]["line"], 120)
+            summary = build_output.build_summary(tmp)
+            self.assertIn("'foo' undeclared", summary)
+            self.assertIn("exit code 2", summary)
+            # A new run starts an empty store
+            build_output.open_build_output_store(tmp)
+            self.assertEqual(build_output.read_build_output_index(tmp), [])
+            self.assertIsNone(build_output.first_build_error(tmp))
+
+    def test_command_not_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = build_output.open_build_output_store(tmp)
+            # Spawn failure of a command run outside of any step: no
+            # exit code and no output
+            store.begin(["mokutil", "--sb-state"], None).end(
+                None, error="FileNotFoundError: mokutil")
+            store.begin(["make"], "build").end(None, timed_out=True)
+            entries = build_output.read_build_output_index(tmp)
+            self.assertEqual(entries[0]["step"], build_output.outside_step_name)
+            summary = build_output.build_summary(tmp)
+            self.assertIn("could not be run: FileNotFoundError", summary)
+            self.assertNotIn("timed out", summary)
+            self.assertEqual(build_output.read_command_output(tmp, entries[1]), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_ccache.py
+"""
+import unittest
+import os
+import subprocess
+import tempfile
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Stands for ccache: records its arguments and its cache directory
+fake_ccache = """#!/bin/sh
+echo "$CCACHE_DIR $@" >> "$CCACHE_DIR/ccache.runs"
+echo "cache hit (direct) 0"
+"""
+
+# Stands for the configure script of the sources: records its arguments and
+# generates a Makefile whose modules target records the compiler and the
+# cache directory
+fake_configure = """#!/bin/sh
+for a in "$@"; do echo "$a"; done > configure.args
+printf 'all:\\nmodules:\\n\\techo "$(CC) $$CCACHE_DIR" > make.cc\\n\\tmkdir -p master\\n\\ttouch master/ec_master.ko\\nclean:\\n' > Makefile
+"""
+
+
+def git(repo_dir: str, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "-C", repo_dir] + list(args),
+                   check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def write_script(path: str, content: str):
+    with open(path, "w") as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+
+
+def read_lines(path: str) -> list:
+    with open(path, "r") as f:
+        return f.read().splitlines()
+
+
+class TestCcache(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = (edkms_module.use_ccache, edkms_module.ccache_dir,
+                      edkms_module.use_module_cache, os.environ["PATH"])
+        self.tmp = tempfile.TemporaryDirectory()
+        edkms_module.ccache_dir = os.path.join(self.tmp.name, "ccache")
+        edkms_module.use_module_cache = False
+        # ccache is found first in the PATH
+        self.bin_dir = os.path.join(self.tmp.name, "bin")
+        os.makedirs(self.bin_dir)
+        write_script(os.path.join(self.bin_dir, "ccache"), fake_ccache)
+        os.environ["PATH"] = self.bin_dir + os.pathsep + self.saved[3]
+
+    def tearDown(self):
+        (edkms_module.use_ccache, edkms_module.ccache_dir,
+         edkms_module.use_module_cache, os.environ["PATH"]) = self.saved
+        self.tmp.cleanup()
+
+    def test_disabled(self):
+        edkms_module.use_ccache = False
+        self.assertFalse(edkms.ccache_enabled())
+        self.assertIsNone(edkms.build_env())
+        configure_cmd = edkms.configure_command()
+        self.assertNotIn("CC=ccache gcc", configure_cmd)
+        self.assertEqual(edkms.ccache_dkms_settings(),
+                         {"CCACHE_ENV": "", "CCACHE_MAKE_ARGS": ""})
+
+    def test_enabled(self):
+        edkms_module.use_ccache = True
+        self.assertTrue(edkms.ccache_enabled())
+        env = edkms.build_env()
+        self.assertEqual(env["CCACHE_DIR"], edkms_module.ccache_dir)
+        self.assertEqual(env["CCACHE_MAXSIZE"], edkms_module.ccache_max_size)
+        # The rest of the environment is kept
+        self.assertEqual(env["PATH"], os.environ["PATH"])
+        configure_cmd = edkms.configure_command()
+        self.assertEqual(configure_cmd[-2:], ["CC=ccache gcc", "CXX=ccache g++"])
+        settings = edkms.ccache_dkms_settings()
+        self.assertEqual(settings["CCACHE_ENV"],
+                         f"CCACHE_DIR={edkms_module.ccache_dir} CCACHE_MAXSIZE={edkms_module.ccache_max_size}")
+        self.assertEqual(settings["CCACHE_MAKE_ARGS"],
+                         "'CC=ccache gcc' 'CXX=ccache g++'")
+
+    def test_not_installed(self):
+        # use_ccache is set but ccache is not in the PATH: build without it
+        edkms_module.use_ccache = True
+        empty_dir = os.path.join(self.tmp.name, "empty")
+        os.makedirs(empty_dir)
+        os.environ["PATH"] = empty_dir
+        self.assertFalse(edkms.ccache_enabled())
+        self.assertIsNone(edkms.build_env())
+        self.assertNotIn("CC=ccache gcc", edkms.configure_command())
+        self.assertEqual(edkms.ccache_dkms_settings(),
+                         {"CCACHE_ENV": "", "CCACHE_MAKE_ARGS": ""})
+
+    def test_build(self):
+        edkms_module.use_ccache = True
+        source_dir = os.path.join(self.tmp.name, "ethercat")
+        os.makedirs(source_dir)
+        write_script(os.path.join(source_dir, "configure"), fake_configure)
+        git(source_dir, "init", "-q")
+        git(source_dir, "add", "configure")
+        git(source_dir, "commit", "-q", "-m", "sources")
+        edkms.build_for_kernel(source_dir, source_dir,
+                               "6.8.0-generic", run_bootstrap=False)
+        # configure and make get the compiler through ccache, with the
+        # cache directory in their environment
+        self.assertIn("CC=ccache gcc", read_lines(
+            os.path.join(source_dir, "configure.args")))
+        self.assertEqual(read_lines(os.path.join(source_dir, "make.cc")),
+                         [f"ccache gcc {edkms_module.ccache_dir}"])
+        # The statistics are reset before the build and read after it
+        runs = read_lines(os.path.join(edkms_module.ccache_dir, "ccache.runs"))
+        self.assertEqual(runs, [f"{edkms_module.ccache_dir} --zero-stats",
+                                f"{edkms_module.ccache_dir} --show-stats"])
+
+
+if __name__ == "__main__":
+    unittest.main()
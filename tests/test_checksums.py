@@ -0,0 +1,92 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_checksums.py
+"""
+import unittest
+import os
+import logging
+import tempfile
+
+from ethercat_igh_dkms import checksums
+
+logger = logging.getLogger("test_checksums")
+
+
+class TestChecksums(unittest.TestCase):
+    def test_tree_stat_digest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "tool"))
+            tool = os.path.join(tmp, "tool", "ethercat")
+            with open(tool, "w") as f:
+                f.write("v1")
+            missing = os.path.join(tmp, "missing")
+            digest = checksums.tree_stat_digest([tmp, missing])
+            self.assertEqual(digest, checksums.tree_stat_digest([tmp, missing]))
+            # A rebuilt file changes the digest
+            st = os.stat(tool)
+            os.utime(tool, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+            self.assertNotEqual(digest, checksums.tree_stat_digest([tmp, missing]))
+
+    def test_content_digests(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trees = [os.path.join(tmp, "a"), os.path.join(tmp, "b")]
+            for i, top in enumerate(trees):
+                os.makedirs(os.path.join(top, "tool", ".deps"))
+                with open(os.path.join(top, "tool", "ethercat"), "w") as f:
+                    f.write("tool")
+                # Ignored files, different in each tree
+                with open(os.path.join(top, "tool", "Makefile"), "w") as f:
+                    f.write(f"{i}")
+                with open(os.path.join(top, "tool", ".deps", "main.Po"), "w") as f:
+                    f.write(f"{i}")
+                os.utime(os.path.join(top, "tool", "ethercat"), ns=(i, i))
+
+            def ignored(name):
+                return name in ["Makefile", ".deps"]
+
+            digests = [checksums.tree_content_digests(top, ["tool", "missing"], ignored)
+                       for top in trees]
+            # Same content at another place and time
+            self.assertEqual(digests[0], digests[1])
+            self.assertEqual(list(digests[0].keys()), ["tool/ethercat"])
+            with open(os.path.join(trees[1], "tool", "ethercat"), "w") as f:
+                f.write("rebuilt")
+            self.assertNotEqual(digests[0], checksums.tree_content_digests(
+                trees[1], ["tool"], ignored))
+
+    def test_files_modified_since(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "bin"))
+            for name in ["old", "bin/ethercat"]:
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(name)
+            os.utime(os.path.join(tmp, "old"), ns=(0, 0))
+            since = os.stat(os.path.join(tmp, "bin", "ethercat")).st_mtime_ns
+            self.assertEqual(checksums.files_modified_since(tmp, since),
+                             ["bin/ethercat"])
+            digests = checksums.files_content_digests(tmp, ["bin/ethercat", "missing"])
+            self.assertEqual(digests["bin/ethercat"],
+                             checksums.file_digest(os.path.join(tmp, "bin", "ethercat")))
+            self.assertIsNone(digests["missing"])
+
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_file = os.path.join(tmp, "manifest.json")
+            self.assertEqual(
+                checksums.load_checksum_manifest(manifest_file, logger), {})
+            manifest = {"udev_rule": checksums.strings_digest(["rule"])}
+            checksums.save_checksum_manifest(manifest_file, manifest)
+            self.assertEqual(
+                checksums.load_checksum_manifest(manifest_file, logger), manifest)
+            self.assertEqual(checksums.file_digest(os.path.join(tmp, "none")), None)
+            # A corrupted manifest is ignored
+            with open(manifest_file, "w") as f:
+                f.write("{")
+            self.assertEqual(
+                checksums.load_checksum_manifest(manifest_file, logger), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_clone_sources.py
+"""
+import unittest
+import os
+import subprocess
+import tempfile
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+saved_parameters = ["git_project", "git_branch", "git_commit", "git_shallow_clone",
+                    "git_mirror_dir", "git_bundle_file"]
+
+
+def git(repo_dir: str, *args) -> str:
+    result = subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                             "-C", repo_dir] + list(args),
+                            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.stdout.decode().strip()
+
+
+def alternates(repo_dir: str) -> list:
+    try:
+        with open(os.path.join(repo_dir, ".git", "objects", "info", "alternates"), "r") as f:
+            return [os.path.realpath(l.strip()) for l in f if l.strip()]
+    except OSError:
+        return []
+
+
+class TestCloneSources(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = {p: getattr(edkms_module, p) for p in saved_parameters}
+        self.tmp = tempfile.TemporaryDirectory()
+        # Upstream project with a few commits on the branch
+        self.upstream = os.path.join(self.tmp.name, "upstream")
+        os.makedirs(self.upstream)
+        git(self.upstream, "init", "-q", "-b", "stable-test")
+        for i in range(3):
+            with open(os.path.join(self.upstream, "file"), "w") as f:
+                f.write(f"{i}\n")
+            git(self.upstream, "add", "file")
+            git(self.upstream, "commit", "-q", "-m", f"commit {i}")
+        self.head = git(self.upstream, "rev-parse", "HEAD")
+        edkms_module.git_project = "file://" + self.upstream
+        edkms_module.git_branch = "stable-test"
+        edkms_module.git_commit = None
+        edkms_module.git_shallow_clone = False
+        edkms_module.git_mirror_dir = None
+        edkms_module.git_bundle_file = None
+        self.source_dir = os.path.join(self.tmp.name, "src", "ethercat")
+
+    def tearDown(self):
+        for p, v in self.saved.items():
+            setattr(edkms_module, p, v)
+        self.tmp.cleanup()
+
+    def test_full_clone(self):
+        edkms.clone_sources(self.source_dir)
+        self.assertEqual(("stable-test", self.head),
+                         edkms.read_head(self.source_dir))
+        self.assertEqual("3", git(self.source_dir, "rev-list", "--count", "HEAD"))
+
+    def test_sync_sources(self):
+        cwd = os.getcwd()
+        edkms.sync_sources(self.source_dir)
+        self.assertEqual(self.head, edkms.read_head(self.source_dir)[1])
+        # Pull the new commits of the upstream project
+        git(self.upstream, "commit", "-q", "--allow-empty", "-m", "next")
+        edkms.sync_sources(self.source_dir)
+        self.assertEqual(git(self.upstream, "rev-parse", "HEAD"),
+                         edkms.read_head(self.source_dir)[1])
+        # Pinned commit
+        edkms_module.git_commit = self.head
+        edkms.sync_sources(self.source_dir)
+        self.assertEqual((None, self.head), edkms.read_head(self.source_dir))
+        # Install steps run concurrently: the working directory of the
+        # process is not changed
+        self.assertEqual(cwd, os.getcwd())
+
+    def test_shallow_clone(self):
+        edkms_module.git_shallow_clone = True
+        edkms.clone_sources(self.source_dir)
+        self.assertEqual(("stable-test", self.head),
+                         edkms.read_head(self.source_dir))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.source_dir, ".git", "shallow")))
+        self.assertEqual("1", git(self.source_dir, "rev-list", "--count", "HEAD"))
+
+    def test_mirror_clone(self):
+        mirror_dir = os.path.join(self.tmp.name, "cache", "ethercat.git")
+        edkms_module.git_mirror_dir = mirror_dir
+        edkms.clone_sources(self.source_dir)
+        self.assertTrue(edkms.git_mirror_exists())
+        self.assertEqual(("stable-test", self.head),
+                         edkms.read_head(self.source_dir))
+        # The objects are read from the mirror
+        self.assertEqual([os.path.realpath(os.path.join(mirror_dir, "objects"))],
+                         alternates(self.source_dir))
+        # The checkout is updated from the upstream project
+        self.assertEqual(edkms_module.git_project,
+                         edkms.read_remote_urls(self.source_dir)["origin"])
+
+    def test_mirror_from_bundle(self):
+        bundle_file = os.path.join(self.tmp.name, "ethercat.bundle")
+        git(self.upstream, "bundle", "create", bundle_file, "--all")
+        edkms_module.git_mirror_dir = os.path.join(
+            self.tmp.name, "cache", "ethercat.git")
+        edkms_module.git_bundle_file = bundle_file
+        edkms.clone_sources(self.source_dir)
+        self.assertEqual(("stable-test", self.head),
+                         edkms.read_head(self.source_dir))
+        self.assertEqual(edkms_module.git_project,
+                         edkms.read_remote_urls(edkms_module.git_mirror_dir)["origin"])
+
+    def test_mirror_failure_fallback(self):
+        # The mirror cannot be created from a missing bundle: the sources
+        # are cloned from the upstream project
+        edkms_module.git_mirror_dir = os.path.join(
+            self.tmp.name, "cache", "ethercat.git")
+        edkms_module.git_bundle_file = os.path.join(
+            self.tmp.name, "missing.bundle")
+        edkms.clone_sources(self.source_dir)
+        self.assertFalse(edkms.git_mirror_exists())
+        self.assertEqual(("stable-test", self.head),
+                         edkms.read_head(self.source_dir))
+        self.assertEqual([], alternates(self.source_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
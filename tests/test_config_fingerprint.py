@@ -0,0 +1,145 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_config_fingerprint.py
+"""
+import unittest
+import os
+import json
+import subprocess
+import tempfile
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Stands for the configure script of the sources: counts its runs and
+# generates a Makefile whose modules target creates an empty module
+fake_configure = """#!/bin/sh
+echo "$@" >> configure.runs
+printf 'all:\\nmodules:\\n\\tmkdir -p master\\n\\ttouch master/ec_master.ko\\nclean:\\n\\trm -rf master\\n' > Makefile
+"""
+
+
+def git(repo_dir: str, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "-C", repo_dir] + list(args),
+                   check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def create_sources(source_dir: str):
+    os.makedirs(source_dir)
+    configure = os.path.join(source_dir, "configure")
+    with open(configure, "w") as f:
+        f.write(fake_configure)
+    os.chmod(configure, 0o755)
+    git(source_dir, "init", "-q")
+    git(source_dir, "add", "configure")
+    git(source_dir, "commit", "-q", "-m", "sources")
+
+
+def configure_runs(build_dir: str) -> int:
+    try:
+        with open(os.path.join(build_dir, "configure.runs"), "r") as f:
+            return len(f.readlines())
+    except OSError:
+        return 0
+
+
+class TestConfigFingerprint(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = edkms_module.get_toolchain_version
+        self.saved_cache = (edkms_module.use_module_cache,
+                            edkms_module.module_cache_dir)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "ethercat")
+        create_sources(self.source_dir)
+
+    def tearDown(self):
+        edkms_module.get_toolchain_version = self.saved
+        (edkms_module.use_module_cache,
+         edkms_module.module_cache_dir) = self.saved_cache
+        self.tmp.cleanup()
+
+    def test_fingerprint_inputs(self):
+        cmd = ["./configure", "--enable-generic"]
+        reference = edkms.compute_config_fingerprint(
+            self.source_dir, cmd, "6.8.0-generic")
+        self.assertEqual(reference, edkms.compute_config_fingerprint(
+            self.source_dir, list(cmd), "6.8.0-generic"))
+        # Configure command
+        self.assertNotEqual(reference, edkms.compute_config_fingerprint(
+            self.source_dir, cmd + ["--enable-r8169"], "6.8.0-generic"))
+        # Kernel
+        self.assertNotEqual(reference, edkms.compute_config_fingerprint(
+            self.source_dir, cmd, "6.9.0-generic"))
+        # Toolchain
+        edkms_module.get_toolchain_version = lambda: "gcc (test) 99.0"
+        self.assertNotEqual(reference, edkms.compute_config_fingerprint(
+            self.source_dir, cmd, "6.8.0-generic"))
+        edkms_module.get_toolchain_version = self.saved
+        # Git commit
+        git(self.source_dir, "commit", "-q", "--allow-empty", "-m", "next")
+        self.assertNotEqual(reference, edkms.compute_config_fingerprint(
+            self.source_dir, cmd, "6.8.0-generic"))
+
+    def test_configuration_is_up_to_date(self):
+        fingerprint = "a" * 64
+        # Not configured
+        self.assertFalse(edkms.configuration_is_up_to_date(
+            self.source_dir, fingerprint))
+        with open(os.path.join(self.source_dir, "Makefile"), "w") as f:
+            f.write("all:\n")
+        # No fingerprint saved
+        self.assertFalse(edkms.configuration_is_up_to_date(
+            self.source_dir, fingerprint))
+        edkms.save_config_fingerprint(self.source_dir, fingerprint)
+        self.assertTrue(edkms.configuration_is_up_to_date(
+            self.source_dir, fingerprint))
+        self.assertFalse(edkms.configuration_is_up_to_date(
+            self.source_dir, "b" * 64))
+        edkms.remove_config_fingerprint(self.source_dir)
+        self.assertFalse(edkms.configuration_is_up_to_date(
+            self.source_dir, fingerprint))
+
+    def test_configure_skipped(self):
+        def build(kernel_release):
+            edkms.build_for_kernel(self.source_dir, self.source_dir,
+                                   kernel_release, run_bootstrap=False)
+            return configure_runs(self.source_dir)
+
+        self.assertEqual(1, build("6.8.0-generic"))
+        # Unchanged configuration
+        self.assertEqual(1, build("6.8.0-generic"))
+        # Other kernel
+        self.assertEqual(2, build("6.9.0-generic"))
+        # Other commit
+        git(self.source_dir, "commit", "-q", "--allow-empty", "-m", "next")
+        self.assertEqual(3, build("6.9.0-generic"))
+        self.assertEqual(3, build("6.9.0-generic"))
+        # Other toolchain
+        edkms_module.get_toolchain_version = lambda: "gcc (test) 99.0"
+        self.assertEqual(4, build("6.9.0-generic"))
+
+    def test_built_modules_cached(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        edkms_module.use_module_cache = True
+        edkms_module.module_cache_dir = cache_dir
+        # The inventory of the tree before the first build is empty
+        self.assertEqual([], edkms.get_module_inventory(self.source_dir).names())
+        edkms.build_for_kernel(self.source_dir, self.source_dir,
+                               "6.8.0-generic", run_bootstrap=False)
+        entries = [e for e in os.listdir(cache_dir) if not e.startswith(".")]
+        self.assertEqual(1, len(entries))
+        with open(os.path.join(cache_dir, entries[0], "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["files"], ["master/ec_master.ko"])
+
+
+if __name__ == "__main__":
+    unittest.main()
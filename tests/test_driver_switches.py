@@ -0,0 +1,70 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_driver_switches.py
+"""
+import unittest
+import os
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestDriverSwitches(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = (edkms_module.derive_driver_switches,
+                      edkms_module.auto_select_device_modules,
+                      edkms_module.device_modules,
+                      edkms_module.in_use_device_modules)
+
+    def tearDown(self):
+        (edkms_module.derive_driver_switches,
+         edkms_module.auto_select_device_modules,
+         edkms_module.device_modules,
+         edkms_module.in_use_device_modules) = self.saved
+
+    def test_derived_switches(self):
+        edkms_module.derive_driver_switches = True
+        edkms_module.in_use_device_modules = set()
+        edkms_module.device_modules = "e1000e"
+        self.assertEqual(edkms.selected_device_modules(),
+                         ["generic", "e1000e"])
+        cmd = edkms.configure_command()
+        self.assertIn("--enable-e1000e", cmd)
+        self.assertNotIn("--enable-8139too", cmd)
+        self.assertIn("--disable-8139too", cmd)
+        # The generic driver is enabled by default
+        self.assertNotIn("--disable-generic", cmd)
+        # The modules chosen while configuring take precedence
+        edkms_module.in_use_device_modules = set(["igb"])
+        cmd = edkms.configure_command()
+        self.assertIn("--enable-igb", cmd)
+        self.assertNotIn("--enable-e1000e", cmd)
+
+    def test_auto_selected_switches(self):
+        # The automatically selected native module is enabled, the other
+        # switches keep their configured value
+        edkms_module.derive_driver_switches = False
+        edkms_module.auto_select_device_modules = True
+        edkms_module.in_use_device_modules = set(["generic", "igb"])
+        cmd = edkms.configure_command()
+        self.assertIn("--enable-igb", cmd)
+        self.assertNotIn("--enable-e1000e", cmd)
+        self.assertFalse(edkms.driver_switch_active("r8169", ["generic", "igb"]))
+        self.assertEqual(edkms.native_igh_drivers()["e1000e"], "e1000e")
+
+    def test_invalid_module(self):
+        edkms_module.in_use_device_modules = set()
+        edkms_module.device_modules = "unknown"
+        with self.assertRaises(Exception):
+            edkms.selected_device_modules()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_exec_cmd.py
+"""
+import unittest
+import os
+import subprocess
+import tempfile
+import time
+
+import ethercat_igh_dkms as edkms
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def process_is_alive(pid: int) -> bool:
+    # A killed process not yet reaped by its new parent is a zombie
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return "Z" != f.read().rsplit(")", 1)[1].split()[0]
+    except OSError:
+        return False
+
+
+class TestExecCmd(unittest.TestCase):
+    def setUp(self):
+        os.chdir(current_dir)
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+
+    def test_output(self):
+        output = edkms.exec_cmd(["sh", "-c", "echo out; echo err >&2"])
+        self.assertEqual(output, "out\nerr\n")
+
+    def test_failure_raises(self):
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            edkms.exec_cmd(["sh", "-c", "echo failed; exit 3"])
+        self.assertEqual(cm.exception.returncode, 3)
+        self.assertEqual(cm.exception.output, b"failed\n")
+        # Without check the output is returned
+        output = edkms.exec_cmd(["sh", "-c", "echo failed; exit 3"], check=False)
+        self.assertEqual(output, "failed\n")
+
+    def test_bounded_output(self):
+        output = edkms.exec_cmd(
+            ["sh", "-c", "yes 0123456789 | head -n 100000"], max_output=1000)
+        self.assertEqual(len(output), 1000)
+        self.assertTrue(output.endswith("0123456789\n"))
+        self.assertEqual(edkms.exec_cmd(["echo", "x"], max_output=0), "")
+
+    def test_cwd(self):
+        parent = os.path.dirname(current_dir)
+        self.assertEqual(edkms.exec_cmd(["pwd"], cwd=parent), parent + "\n")
+        # The working directory of the process is not changed
+        self.assertEqual(os.getcwd(), current_dir)
+
+    def test_timeout(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            edkms.exec_cmd(["sleep", "10"], timeout=0.5)
+
+    def test_timeout_kills_grandchildren(self):
+        # Like make -j, the command waits for the processes it started
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = os.path.join(tmp, "pid")
+            with self.assertRaises(subprocess.TimeoutExpired):
+                edkms.exec_cmd(
+                    ["sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"], timeout=0.5)
+            with open(pid_file, "r") as f:
+                pid = int(f.read())
+        deadline = time.monotonic() + 5
+        while process_is_alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(process_is_alive(pid))
+
+    def test_background_child_holding_the_pipe(self):
+        # The command exits while a background process keeps stdout open
+        output = edkms.exec_cmd(["sh", "-c", "sleep 5 & echo started"], timeout=4)
+        self.assertEqual(output, "started\n")
+
+    def test_build_output_store(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            edkms.exec_cmd(
+                ["sh", "-c", "echo 'a.c:3:1: error: stored'; exit 4"])
+        store_dir = edkms.get_build_output_store().directory
+        entry = edkms.read_build_output_index(store_dir)[-1]
+        self.assertEqual(entry["returncode"], 4)
+        self.assertEqual(entry["diagnostics"][0]["message"], "stored")
+        self.assertEqual(edkms.read_command_output(store_dir, entry),
+                         "a.c:3:1: error: stored\n")
+        # Run outside of any step or phase
+        self.assertEqual(entry["step"], edkms.outside_step_name)
+        self.assertFalse(entry["timed_out"])
+        self.assertIsNone(entry["error"])
+
+    def test_spawn_failure_stored(self):
+        with self.assertRaises(FileNotFoundError):
+            edkms.exec_cmd(["/nonexistent/mokutil", "--sb-state"])
+        store_dir = edkms.get_build_output_store().directory
+        entry = edkms.read_build_output_index(store_dir)[-1]
+        self.assertIsNone(entry["returncode"])
+        self.assertFalse(entry["timed_out"])
+        self.assertIn("FileNotFoundError", entry["error"])
+        with self.assertRaises(subprocess.TimeoutExpired):
+            edkms.exec_cmd(["sleep", "10"], timeout=0.2)
+        entry = edkms.read_build_output_index(store_dir)[-1]
+        self.assertTrue(entry["timed_out"])
+        self.assertIsNone(entry["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_git_refs.py
+"""
+import unittest
+import os
+import glob
+import subprocess
+import tempfile
+
+from ethercat_igh_dkms import git_refs
+
+
+def git(repo_dir: str, *args) -> str:
+    result = subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                             "-C", repo_dir] + list(args),
+                            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.stdout.decode().strip()
+
+
+def git_has_object(repo_dir: str, sha: str) -> bool:
+    return 0 == subprocess.run(["git", "-C", repo_dir, "cat-file", "-e", sha],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE).returncode
+
+
+def all_objects(repo_dir: str) -> list:
+    return [l.split()[0] for l in git(repo_dir, "rev-list", "--all", "--objects").splitlines()]
+
+
+class TestGitRefs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmp.name, "repo")
+        os.makedirs(self.repo)
+        git(self.repo, "init", "-q", "-b", "main")
+        for i in range(20):
+            with open(os.path.join(self.repo, f"file{i % 4}"), "w") as f:
+                f.write(f"{i}\n")
+            git(self.repo, "add", "-A")
+            git(self.repo, "commit", "-q", "-m", f"commit {i}")
+            if 5 == i:
+                git(self.repo, "branch", "stable")
+                git(self.repo, "tag", "-a", "v1", "-m", "annotated")
+                git(self.repo, "tag", "light")
+        git(self.repo, "remote", "add", "origin",
+            "https://example.com/ethercat.git")
+        # Symbolic ref chain: alias -> other -> main
+        git(self.repo, "symbolic-ref", "refs/heads/other", "refs/heads/main")
+        git(self.repo, "symbolic-ref", "refs/heads/alias", "refs/heads/other")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_refs(self, repo_dir: str):
+        for ref in ["HEAD", "refs/heads/main", "refs/heads/stable", "refs/heads/alias",
+                    "refs/tags/v1", "refs/tags/light"]:
+            self.assertEqual(git_refs.resolve_ref(repo_dir, ref),
+                             git(repo_dir, "rev-parse", ref), ref)
+        self.assertIsNone(git_refs.resolve_ref(repo_dir, "refs/heads/missing"))
+
+    def check_objects(self, repo_dir: str, objects: list):
+        for sha in objects:
+            self.assertEqual(git_refs.has_object(repo_dir, sha),
+                             git_has_object(repo_dir, sha), sha)
+        for sha in ["0" * 40, "f" * 40, objects[0][:-1] + ("0" if "0" != objects[0][-1] else "1")]:
+            self.assertEqual(git_refs.has_object(repo_dir, sha),
+                             git_has_object(repo_dir, sha), sha)
+
+    def test_loose(self):
+        self.assertFalse(os.path.exists(
+            os.path.join(self.repo, ".git", "packed-refs")))
+        self.check_refs(self.repo)
+        self.check_objects(self.repo, all_objects(self.repo))
+        self.assertEqual(("main", git(self.repo, "rev-parse", "HEAD")),
+                         git_refs.read_head(self.repo))
+        self.assertEqual({"origin": "https://example.com/ethercat.git"},
+                         git_refs.read_remote_urls(self.repo))
+
+    def test_packed(self):
+        objects = all_objects(self.repo)
+        git(self.repo, "gc", "-q")
+        git(self.repo, "pack-refs", "--all")
+        # Peeled line of the annotated tag
+        with open(os.path.join(self.repo, ".git", "packed-refs"), "r") as f:
+            self.assertTrue(any(l.startswith("^") for l in f))
+        self.assertEqual([], glob.glob(os.path.join(
+            self.repo, ".git", "refs", "tags", "*")))
+        self.check_refs(self.repo)
+        self.check_objects(self.repo, objects)
+        # Every object of the pack index and only them
+        idx_files = glob.glob(os.path.join(
+            self.repo, ".git", "objects", "pack", "*.idx"))
+        self.assertEqual(1, len(idx_files))
+        for sha in objects:
+            self.assertTrue(git_refs.pack_index_contains(idx_files[0], sha))
+        for sha in ["0" * 40, "f" * 40]:
+            self.assertFalse(git_refs.pack_index_contains(idx_files[0], sha))
+        # A loose ref takes precedence over the packed one
+        git(self.repo, "update-ref", "refs/heads/stable", "refs/heads/main")
+        self.check_refs(self.repo)
+
+    def test_detached_head(self):
+        commit = git(self.repo, "rev-parse", "stable")
+        git(self.repo, "checkout", "-q", "--detach", "stable")
+        self.assertEqual((None, commit), git_refs.read_head(self.repo))
+
+    def test_reference_clone(self):
+        # The objects of the clone are in the alternate object store
+        git(self.repo, "gc", "-q")
+        mirror = os.path.join(self.tmp.name, "mirror.git")
+        git(self.tmp.name, "clone", "-q", "--mirror", self.repo, mirror)
+        clone = os.path.join(self.tmp.name, "clone")
+        git(self.tmp.name, "clone", "-q", "--reference", mirror,
+            "file://" + self.repo, clone)
+        self.assertTrue(os.path.exists(os.path.join(
+            clone, ".git", "objects", "info", "alternates")))
+        self.assertEqual([], glob.glob(os.path.join(
+            clone, ".git", "objects", "pack", "*.idx")))
+        self.check_objects(clone, all_objects(self.repo))
+        # Alternates of the alternate
+        chained = os.path.join(self.tmp.name, "chained")
+        git(self.tmp.name, "clone", "-q", "--shared", clone, chained)
+        self.check_objects(chained, all_objects(self.repo))
+        self.assertEqual(git_refs.read_head(chained), git_refs.read_head(clone))
+        # Bare repository
+        self.assertEqual(git_refs.find_git_dir(mirror), mirror)
+        self.assertEqual(git_refs.resolve_ref(mirror, "refs/heads/stable"),
+                         git(mirror, "rev-parse", "refs/heads/stable"))
+
+    def test_worktree(self):
+        git(self.repo, "pack-refs", "--all")
+        worktree = os.path.join(self.tmp.name, "worktree")
+        git(self.repo, "worktree", "add", "-q", worktree, "stable")
+        # .git is a "gitdir:" file pointing into the main repository
+        self.assertTrue(os.path.isfile(os.path.join(worktree, ".git")))
+        git_dir = git_refs.find_git_dir(worktree)
+        self.assertEqual(os.path.realpath(git_refs.find_common_dir(git_dir)),
+                         os.path.realpath(os.path.join(self.repo, ".git")))
+        self.assertEqual(("stable", git(worktree, "rev-parse", "HEAD")),
+                         git_refs.read_head(worktree))
+        self.check_refs(worktree)
+        self.check_objects(worktree, all_objects(self.repo))
+        self.assertEqual({"origin": "https://example.com/ethercat.git"},
+                         git_refs.read_remote_urls(worktree))
+        # New commit of the worktree: loose ref in the common directory
+        git(worktree, "commit", "-q", "--allow-empty", "-m", "worktree")
+        self.assertEqual(git_refs.read_head(worktree)[1],
+                         git(worktree, "rev-parse", "HEAD"))
+        self.assertEqual(git_refs.resolve_ref(self.repo, "refs/heads/stable"),
+                         git(worktree, "rev-parse", "HEAD"))
+
+    def test_is_full_sha(self):
+        self.assertTrue(git_refs.is_full_sha("0123456789abcdef" * 2 + "01234567"))
+        self.assertFalse(git_refs.is_full_sha("0123456"))
+        self.assertFalse(git_refs.is_full_sha("0123456789ABCDEF" * 2 + "01234567"))
+
+
+if __name__ == "__main__":
+    unittest.main()
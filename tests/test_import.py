@@ -0,0 +1,66 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_import.py
+"""
+import unittest
+import os
+import sys
+import subprocess
+
+from typeguard import TypeCheckError
+
+from ethercat_igh_dkms import checksums
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import in a new interpreter, printing the import time and the loaded modules
+import_script = """
+import sys, time, json
+start = time.perf_counter()
+import ethercat_igh_dkms
+duration = time.perf_counter() - start
+print(json.dumps({
+    "duration": duration,
+    "modules": sorted(sys.modules.keys()),
+    "kernel_version": ethercat_igh_dkms.ethercat_igh_dkms.kernel_version
+}))
+"""
+
+# Upper bound of the import time: it took more than 3 s when the functions
+# were instrumented by typeguard at import
+max_import_time = 1.0
+
+
+def fresh_import(typecheck: str) -> dict:
+    import json
+    env = dict(os.environ, ETHERCAT_IGH_DKMS_TYPECHECK=typecheck)
+    output = subprocess.check_output(
+        [sys.executable, "-c", import_script], cwd=project_dir, env=env)
+    return json.loads(output)
+
+
+class TestImport(unittest.TestCase):
+    def test_import_time(self):
+        for typecheck in ["1", "0"]:
+            # Best of a few runs, the first one may read from a cold cache
+            result = min((fresh_import(typecheck) for _ in range(3)),
+                         key=lambda r: r["duration"])
+            self.assertLess(result["duration"], max_import_time)
+
+    def test_no_side_effect(self):
+        result = fresh_import("0")
+        # The kernel version is read when needed
+        self.assertIsNone(result["kernel_version"])
+        for module in ["typeguard", "asyncio", "tarfile", "concurrent.futures"]:
+            self.assertNotIn(module, result["modules"])
+
+    def test_lazy_type_checking(self):
+        # Checked on the first call
+        with self.assertRaises(TypeCheckError):
+            checksums.strings_digest("not a list")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_install_manifest.py
+"""
+import unittest
+import os
+import tempfile
+import time
+
+from ethercat_igh_dkms import install_manifest
+
+
+def statuses(report: list) -> dict:
+    return {os.path.basename(r["path"]): r["status"] for r in report}
+
+
+class TestInstallManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = self.tmp.name
+        self.module = os.path.join(tmp, "ec_master.ko")
+        self.tool = os.path.join(tmp, "ethercat_tool")
+        self.link = os.path.join(tmp, "ethercat")
+        self.config = os.path.join(tmp, "sysconfig")
+        self.directory = os.path.join(tmp, "build")
+        for path, content in [(self.module, "module"), (self.tool, "tool"), (self.config, "MASTER0_DEVICE=")]:
+            with open(path, "w") as f:
+                f.write(content)
+        os.symlink(self.tool, self.link)
+        os.makedirs(self.directory)
+        tracker = {p: {"type": "file"} for p in [self.module, self.link, self.config]}
+        tracker[self.directory] = {"type": "directory"}
+        self.tracker = install_manifest.update_installed_files_state(tracker)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_state(self):
+        module = self.tracker[self.module]
+        self.assertEqual(module["type"], "file")
+        self.assertEqual(module["size"], 6)
+        self.assertEqual(len(module["sha256"]), 64)
+        # The link and the state of the file it points to
+        self.assertEqual(self.tracker[self.link]["symlink"], self.tool)
+        self.assertEqual(self.tracker[self.link]["size"], 4)
+        self.assertEqual(self.tracker[self.directory], {"type": "directory"})
+
+    def test_verify(self):
+        report = install_manifest.verify_installed_files(self.tracker)
+        self.assertTrue(all("ok" == r["status"] for r in report))
+        # Same content, new modification time
+        st = os.stat(self.module)
+        os.utime(self.module, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        # Edited configuration, same size and modification time
+        st = os.stat(self.config)
+        with open(self.config, "w") as f:
+            f.write("MASTER0_DEVICE*")
+        os.utime(self.config, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.remove(self.link)
+        os.symlink(self.config, self.link)
+        os.rmdir(self.directory)
+        report = install_manifest.verify_installed_files(self.tracker)
+        self.assertEqual(statuses(report), {
+            "ec_master.ko": "ok",
+            "sysconfig": "ok",
+            "ethercat": "retargeted",
+            "build": "missing"
+        })
+        self.assertTrue([r for r in report if r["path"] == self.module][0]["touched"])
+        # Only a rehash sees a change hidden from the stat data
+        report = install_manifest.verify_installed_files(self.tracker, rehash=True)
+        self.assertEqual(statuses(report)["sysconfig"], "changed")
+
+    def test_hash_reused(self):
+        # Unchanged stat data: the recorded hash is kept without reading
+        self.tracker[self.module]["sha256"] = "recorded"
+        updated = install_manifest.update_installed_files_state(self.tracker)
+        self.assertEqual(updated[self.module]["sha256"], "recorded")
+
+    def test_verify_speed(self):
+        # A stat only verification of a few thousand files
+        tracker = {}
+        for i in range(2000):
+            path = os.path.join(self.tmp.name, f"f{i}")
+            with open(path, "w") as f:
+                f.write(str(i))
+            tracker[path] = {"type": "file"}
+        tracker = install_manifest.update_installed_files_state(tracker)
+        start = time.perf_counter()
+        report = install_manifest.verify_installed_files(tracker)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(report), 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_install_steps.py
+"""
+import unittest
+import logging
+import threading
+
+from ethercat_igh_dkms import install_steps
+from ethercat_igh_dkms.install_steps import InstallStep
+
+logger = logging.getLogger("test_install_steps")
+
+
+class TestInstallSteps(unittest.TestCase):
+    def test_order(self):
+        steps = [InstallStep("c", print, depends_on=["a", "b"]),
+                 InstallStep("b", print, depends_on=["a"]),
+                 InstallStep("a", print)]
+        ordered = [s.name for s in install_steps.sort_install_steps(steps)]
+        self.assertEqual(ordered, ["a", "b", "c"])
+
+    def test_cycle(self):
+        steps = [InstallStep("a", print, depends_on=["b"]),
+                 InstallStep("b", print, depends_on=["a"])]
+        with self.assertRaises(Exception):
+            install_steps.sort_install_steps(steps)
+        with self.assertRaises(Exception):
+            install_steps.sort_install_steps(
+                [InstallStep("a", print, depends_on=["unknown"])])
+
+    def test_concurrent_steps(self):
+        # Both independent steps must be running at the same time to pass
+        # the barrier
+        barrier = threading.Barrier(2, timeout=10)
+        done = []
+
+        def step(name):
+            barrier.wait()
+            done.append(name)
+
+        steps = [InstallStep("a", step, args=("a",)),
+                 InstallStep("b", step, args=("b",)),
+                 InstallStep("c", done.append, depends_on=["a", "b"], args=("c",))]
+        status = install_steps.run_install_steps(steps, logger)
+        self.assertEqual(status, {"a": "ok", "b": "ok", "c": "ok"})
+        self.assertEqual(done[-1], "c")
+
+    def test_failure(self):
+        done = []
+
+        def fail():
+            raise RuntimeError("failed step")
+
+        steps = [InstallStep("fail", fail),
+                 InstallStep("after", done.append, depends_on=["fail"], args=("after",)),
+                 InstallStep("other", done.append, args=("other",))]
+        with self.assertRaises(RuntimeError):
+            install_steps.run_install_steps(steps, logger)
+        # The independent step still ran, the dependent one was skipped
+        self.assertEqual(done, ["other"])
+
+
+if __name__ == "__main__":
+    unittest.main()
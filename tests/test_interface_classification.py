@@ -0,0 +1,79 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_interface_classification.py
+"""
+import unittest
+import os
+import time
+import logging
+import tempfile
+
+from ethercat_igh_dkms.get_hw_info import EthernetHardwares, classify_ethernet_interfaces, get_hw_type, get_all_hw_infos
+
+logger = logging.getLogger("test_interface_classification")
+
+
+def make_sysfs(root, interfaces):
+    # Every interface is a PCI function of its own
+    os.makedirs(os.path.join(root, "class", "net"))
+    for n, interface in enumerate(interfaces):
+        address = f"0000:{n // 256:02x}:{(n % 256) // 8:02x}.{n % 8}"
+        device_dir = os.path.join(root, "devices", "pci0000:00", address)
+        net_dir = os.path.join(device_dir, "net", interface)
+        os.makedirs(net_dir)
+        os.symlink(device_dir, os.path.join(net_dir, "device"))
+        os.symlink(net_dir, os.path.join(root, "class", "net", interface))
+
+
+class TestInterfaceClassification(unittest.TestCase):
+    def test_classify(self):
+        interfaces = ["lo", "veth1a2b", "enp3s0f0v12", "eth10", "docker0",
+                      "eth2", "enx001b21aabbcc", "ens1f0np0", "eno1",
+                      "enp0s31f6", "br0", "ethernet", "enx00"]
+        candidates = classify_ethernet_interfaces(interfaces)
+        self.assertEqual(candidates, [
+            ("eth2", EthernetHardwares.LEGACY),
+            ("eth10", EthernetHardwares.LEGACY),
+            ("eno1", EthernetHardwares.ONBOARD),
+            ("ens1f0np0", EthernetHardwares.PCI_EXPRESS),
+            ("enp0s31f6", EthernetHardwares.PCI),
+            ("enp3s0f0v12", EthernetHardwares.PCI),
+            ("enx001b21aabbcc", EthernetHardwares.USB)
+        ])
+        self.assertEqual(get_hw_type("ethernet", logger),
+                         EthernetHardwares.UNKNOWN)
+        self.assertEqual(get_hw_type("enp3s0", logger), EthernetHardwares.PCI)
+
+    def test_benchmark(self):
+        # SR-IOV host: 8 physical functions with 128 virtual functions each
+        # and as many veth pairs
+        interfaces = []
+        for pf in range(8):
+            interfaces.append(f"enp{pf + 1}s0f0")
+            interfaces.extend([f"enp{pf + 1}s0f0v{vf}" for vf in range(128)])
+        interfaces.extend([f"veth{n:04x}" for n in range(1024)])
+        self.assertGreater(len(interfaces), 1000)
+        start = time.perf_counter()
+        candidates = classify_ethernet_interfaces(interfaces)
+        classify_duration = time.perf_counter() - start
+        self.assertEqual(len(candidates), 8 * 129)
+        self.assertEqual(candidates[0][0], "enp1s0f0")
+        with tempfile.TemporaryDirectory() as root:
+            make_sysfs(root, interfaces)
+            start = time.perf_counter()
+            infos = get_all_hw_infos(interfaces, logger, sysfs_root=root)
+            probe_duration = time.perf_counter() - start
+        self.assertEqual(len(infos), len(interfaces))
+        self.assertTrue(all(v is not None for v in infos.values()))
+        logger.info(
+            f"Classified {len(interfaces)} interfaces in {classify_duration * 1000:.1f} ms, probed them in {probe_duration * 1000:.1f} ms")
+        # Generous bounds, the point is to catch an accidental quadratic
+        # behaviour or process spawn per interface
+        self.assertLess(classify_duration, 1.0)
+        self.assertLess(probe_duration, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_interface_ranking.py
+"""
+import unittest
+import os
+import logging
+import tempfile
+
+from ethercat_igh_dkms import interface_ranking, net_inventory
+
+logger = logging.getLogger("test_interface_ranking")
+
+native_drivers = {"e1000e": "e1000e", "igb": "igb", "r8169": "r8169"}
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content + "\n")
+
+
+def add_interface(root, interface, bus, driver, carrier, numa_node=None):
+    device_dir = os.path.join(root, "devices", bus, interface)
+    net_dir = os.path.join(device_dir, "net", interface)
+    write(os.path.join(net_dir, "carrier"), str(carrier))
+    os.makedirs(os.path.join(root, "bus", bus, "drivers",
+                driver), exist_ok=True)
+    os.symlink(os.path.join(root, "bus", bus, "drivers", driver),
+               os.path.join(device_dir, "driver"))
+    os.symlink(os.path.join(root, "bus", bus),
+               os.path.join(device_dir, "subsystem"))
+    if numa_node is not None:
+        write(os.path.join(device_dir, "numa_node"), str(numa_node))
+    os.symlink(device_dir, os.path.join(net_dir, "device"))
+    os.makedirs(os.path.join(root, "class", "net"), exist_ok=True)
+    os.symlink(net_dir, os.path.join(root, "class", "net", interface))
+
+
+class TestInterfaceRanking(unittest.TestCase):
+    def test_rank(self):
+        with tempfile.TemporaryDirectory() as root:
+            # Management port on the default route, EtherCAT port driven by
+            # igb next to the isolated CPUs, an USB adapter and a PCI board
+            # on the other NUMA node
+            add_interface(root, "eno1", "pci", "e1000e", 1, 0)
+            add_interface(root, "enp3s0", "pci", "igb", 0, 1)
+            add_interface(root, "enp4s0", "pci", "igb", 0, 0)
+            add_interface(root, "enx001b21aabbcc", "usb", "r8152", 1)
+            cpu_dir = os.path.join(root, "devices", "system", "cpu")
+            write(os.path.join(cpu_dir, "isolated"), "2-3")
+            for cpu, node in [(0, 0), (1, 0), (2, 1), (3, 1)]:
+                os.makedirs(os.path.join(cpu_dir, f"cpu{cpu}", f"node{node}"))
+            write(os.path.join(root, "proc", "net", "route"),
+                  "Iface\tDestination\tGateway\tFlags\n"
+                  "eno1\t00000000\t0101A8C0\t0003\n"
+                  "eno1\t0001A8C0\t00000000\t0001")
+            ranking = interface_ranking.rank_ethernet_interfaces(
+                ["eno1", "enp3s0", "enp4s0", "enx001b21aabbcc"], native_drivers, logger,
+                sysfs_root=root, proc_root=os.path.join(root, "proc"))
+            self.assertEqual([r["interface"] for r in ranking],
+                             ["enp3s0", "enp4s0", "eno1", "enx001b21aabbcc"])
+            self.assertIn("+50 native IgH driver ec_igb for igb",
+                          ranking[0]["reasons"])
+            self.assertIn("-40 carries the default route",
+                          ranking[2]["reasons"])
+            self.assertEqual(ranking[0]["score"], 75)
+            # The interfaces are probed from the inventory snapshot
+            write(os.path.join(root, "class", "net", "enp3s0", "carrier"), "1")
+            ranking = interface_ranking.rank_ethernet_interfaces(
+                ["enp3s0"], native_drivers, logger,
+                sysfs_root=root, proc_root=os.path.join(root, "proc"))
+            self.assertEqual(ranking[0]["score"], 75)
+            net_inventory.refresh_net_inventory(root)
+            ranking = interface_ranking.rank_ethernet_interfaces(
+                ["enp3s0"], native_drivers, logger,
+                sysfs_root=root, proc_root=os.path.join(root, "proc"))
+            self.assertEqual(ranking[0]["score"], 85)
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(interface_ranking.parse_cpu_list("0-2,5,7-8\n"),
+                         [0, 1, 2, 5, 7, 8])
+        self.assertEqual(interface_ranking.parse_cpu_list(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
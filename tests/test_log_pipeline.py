@@ -0,0 +1,80 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_log_pipeline.py
+"""
+import unittest
+import os
+import gzip
+import logging
+import tempfile
+
+from ethercat_igh_dkms import log_pipeline
+
+formatter = logging.Formatter("%(levelname)s %(message)s")
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp.name, "test.log")
+        self.logger = logging.getLogger(f"test_log_pipeline_{id(self)}")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.log_file, "r") as f:
+            return f.read()
+
+    def test_batched_writes(self):
+        pipeline = log_pipeline.start_log_pipeline(
+            self.log_file, formatter, 3600.0, 1024 * 1024, 0, 2)
+        self.logger.addHandler(pipeline.handler)
+        self.logger.info("first")
+        # Batched: nothing written before the interval or an error
+        self.assertEqual(self.read(), "")
+        self.logger.error("failure")
+        # The error waits for the write of everything queued before it
+        self.assertEqual(self.read(), "INFO first\nERROR failure\n")
+        self.logger.info("last")
+        log_pipeline.stop_log_pipeline(pipeline)
+        self.assertEqual(self.read(), "INFO first\nERROR failure\nINFO last\n")
+
+    def test_rotation(self):
+        with open(self.log_file, "w") as f:
+            f.write("previous run\n")
+        pipeline = log_pipeline.start_log_pipeline(
+            self.log_file, formatter, 0.0, 1, 100, 2)
+        self.logger.addHandler(pipeline.handler)
+        for i in range(20):
+            self.logger.info(f"record {i:02d}")
+        log_pipeline.stop_log_pipeline(pipeline)
+        files = sorted(os.listdir(self.tmp.name))
+        self.assertEqual(files, ["test.log", "test.log.1.gz", "test.log.2.gz"])
+        # The file is rotated as soon as it exceeds 100 bytes
+        self.assertLess(os.path.getsize(self.log_file), 100 + 20)
+        with gzip.open(self.log_file + ".1.gz", "rt") as f:
+            self.assertIn("INFO record", f.read())
+
+    def test_fork(self):
+        pipeline = log_pipeline.start_log_pipeline(
+            self.log_file, formatter, 3600.0, 1024 * 1024, 0, 2)
+        self.logger.addHandler(pipeline.handler)
+        self.logger.info("parent")
+        pipeline.flush()
+        pid = os.fork()
+        if 0 == pid:
+            self.logger.info("child")
+            log_pipeline.stop_log_pipeline(pipeline)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        log_pipeline.stop_log_pipeline(pipeline)
+        self.assertEqual(self.read(), "INFO parent\nINFO child\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_make_jobs.py
+"""
+import unittest
+import os
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import ethercat_igh_dkms as edkms_module
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestMakeJobs(unittest.TestCase):
+    def setUp(self):
+        if None == edkms.get_logger():
+            edkms.create_logger("ethercat_igh_dkms",
+                                os.path.join(current_dir, "log"))
+        self.saved = (edkms_module.make_jobs, edkms_module.make_job_memory_mb,
+                      edkms_module.get_online_cpus, edkms_module.get_available_memory_mb)
+        edkms_module.make_jobs = None
+        edkms_module.make_job_memory_mb = 512
+        edkms_module.get_online_cpus = lambda: 16
+
+    def tearDown(self):
+        (edkms_module.make_jobs, edkms_module.make_job_memory_mb,
+         edkms_module.get_online_cpus, edkms_module.get_available_memory_mb) = self.saved
+
+    def test_system_values(self):
+        cpus = self.saved[2]()
+        self.assertGreaterEqual(cpus, 1)
+        self.assertLessEqual(cpus, os.cpu_count())
+        memory = self.saved[3]()
+        self.assertTrue(memory is None or 0 <= memory)
+
+    def test_limited_by_memory(self):
+        edkms_module.get_available_memory_mb = lambda: 64 * 1024
+        self.assertEqual(16, edkms.get_make_jobs())
+        edkms_module.get_available_memory_mb = lambda: 2048
+        self.assertEqual(4, edkms.get_make_jobs())
+        # At least one job
+        edkms_module.get_available_memory_mb = lambda: 100
+        self.assertEqual(1, edkms.get_make_jobs())
+        # Unknown available memory
+        edkms_module.get_available_memory_mb = lambda: None
+        self.assertEqual(16, edkms.get_make_jobs())
+
+    def test_make_jobs_parameter(self):
+        edkms_module.get_available_memory_mb = lambda: 100
+        edkms_module.make_jobs = 3
+        self.assertEqual(3, edkms.get_make_jobs())
+        self.assertEqual(["make", "-j3", "all", "modules"],
+                         edkms.make_cmd(["all", "modules"]))
+        edkms_module.make_jobs = 0
+        self.assertEqual(1, edkms.get_make_jobs())
+
+
+if __name__ == "__main__":
+    unittest.main()
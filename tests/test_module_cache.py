@@ -0,0 +1,89 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_module_cache.py
+"""
+import unittest
+import os
+import logging
+import tempfile
+import tarfile
+
+from ethercat_igh_dkms import module_cache as mc
+
+logger = logging.getLogger("test_module_cache")
+
+
+class TestModuleCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.build_dir = os.path.join(self.tmp.name, "build")
+        self.module = os.path.join(self.build_dir, "master", "ec_master.ko")
+        os.makedirs(os.path.dirname(self.module))
+        with open(self.module, "wb") as f:
+            f.write(b"\x7fELF" + b"\x00" * 1024)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_and_restore(self):
+        key = mc.module_cache_key("6.8.0-1-generic", "abc", "deadbeef", "fp")
+        self.assertFalse(mc.module_cache_restore(
+            self.cache_dir, key, self.build_dir, logger))
+        mc.module_cache_store(self.cache_dir, key, self.build_dir,
+                              [self.module], {}, 10, logger)
+        os.remove(self.module)
+        self.assertTrue(mc.module_cache_restore(
+            self.cache_dir, key, self.build_dir, logger))
+        self.assertTrue(os.path.exists(self.module))
+
+    def test_lru_eviction(self):
+        # Entries of 600 KiB: a 1 MiB limit keeps a single entry
+        with open(self.module, "wb") as f:
+            f.write(b"\x00" * 600 * 1024)
+        keys = [mc.module_cache_key(str(i), None, None, "fp")
+                for i in range(2)]
+        for i, key in enumerate(keys):
+            mc.module_cache_store(self.cache_dir, key, self.build_dir,
+                                  [self.module], {}, 10, logger)
+            manifest = os.path.join(
+                self.cache_dir, key, mc.module_cache_manifest_name)
+            os.utime(manifest, (i + 1, i + 1))
+        # Using the oldest entry makes the other one the least recently used
+        mc.module_cache_lookup(self.cache_dir, keys[0], logger)
+        mc.module_cache_evict(self.cache_dir, 1, logger)
+        self.assertEqual(os.listdir(self.cache_dir), [keys[0]])
+
+    def test_export_import(self):
+        key = mc.module_cache_key("6.8.0-1-generic", "abc", "deadbeef", "fp")
+        mc.module_cache_store(self.cache_dir, key, self.build_dir,
+                              [self.module], {"kernel": "6.8.0-1-generic"}, 10, logger)
+        archive = os.path.join(self.tmp.name, "cache.tar.gz")
+        mc.module_cache_export(self.cache_dir, archive, logger)
+        other_cache = os.path.join(self.tmp.name, "other")
+        mc.module_cache_import(other_cache, archive, 10, logger)
+        os.remove(self.module)
+        self.assertTrue(mc.module_cache_restore(
+            other_cache, key, self.build_dir, logger))
+        self.assertTrue(os.path.exists(self.module))
+        # Only complete entries are renamed into the cache, the existing
+        # ones are kept
+        self.assertEqual(os.listdir(other_cache), [key])
+        with open(os.path.join(other_cache, key, mc.module_cache_manifest_name), "r") as f:
+            manifest = f.read()
+        incomplete = os.path.join(self.tmp.name, "incomplete.tar.gz")
+        with tarfile.open(incomplete, "w:gz") as tar:
+            tar.add(os.path.join(self.cache_dir, key, mc.module_cache_files_dir),
+                    arcname=os.path.join("partial", mc.module_cache_files_dir))
+            tar.add(os.path.join(self.cache_dir, key, mc.module_cache_manifest_name),
+                    arcname=os.path.join(key, mc.module_cache_manifest_name))
+        mc.module_cache_import(other_cache, incomplete, 10, logger)
+        self.assertEqual(os.listdir(other_cache), [key])
+        with open(os.path.join(other_cache, key, mc.module_cache_manifest_name), "r") as f:
+            self.assertEqual(manifest, f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
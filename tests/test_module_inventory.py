@@ -0,0 +1,104 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_module_inventory.py
+"""
+import unittest
+import os
+import struct
+import tempfile
+
+from ethercat_igh_dkms import module_inventory
+
+
+def write_elf(path: str, sections: dict, big_endian: bool = False, is_64: bool = True):
+    # Minimal relocatable ELF file with the given sections
+    order = ">" if big_endian else "<"
+    names = b"\0"
+    name_offsets = {}
+    for name in list(sections.keys()) + [".shstrtab"]:
+        name_offsets[name] = len(names)
+        names += name.encode() + b"\0"
+    all_sections = dict(sections)
+    all_sections[".shstrtab"] = names
+    header_size = 64 if is_64 else 52
+    data = b""
+    offsets = {}
+    for name, content in all_sections.items():
+        offsets[name] = header_size + len(data)
+        data += content
+    shoff = header_size + len(data)
+    shentsize = 64 if is_64 else 40
+    shnum = len(all_sections) + 1
+    ident = b"\x7fELF" + bytes([2 if is_64 else 1, 2 if big_endian else 1, 1]) + b"\0" * 9
+    if is_64:
+        header = ident + struct.pack(order + "HHIQQQIHHHHHH", 1, 62, 1, 0, 0, shoff,
+                                     0, header_size, 0, 0, shentsize, shnum, shnum - 1)
+        section_format = order + "IIQQQQIIQQ"
+    else:
+        header = ident + struct.pack(order + "HHIIIIIHHHHHH", 1, 3, 1, 0, 0, shoff,
+                                     0, header_size, 0, 0, shentsize, shnum, shnum - 1)
+        section_format = order + "IIIIIIIIII"
+    table = struct.pack(section_format, *([0] * 10))
+    for name, content in all_sections.items():
+        table += struct.pack(section_format, name_offsets[name], 1, 0, 0,
+                             offsets[name], len(content), 0, 0, 1, 0)
+    with open(path, "wb") as f:
+        f.write(header + data + table)
+
+
+def modinfo_section(vermagic: str, depends: str) -> bytes:
+    return f"license=GPL\0depends={depends}\0name=x\0vermagic={vermagic}\0".encode()
+
+
+class TestModuleInventory(unittest.TestCase):
+    def test_read_modinfo(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ko = os.path.join(tmp, "ec_igb.ko")
+            for big_endian, is_64 in [(False, True), (True, True), (False, False)]:
+                write_elf(ko, {".text": b"\x90" * 16,
+                               ".modinfo": modinfo_section("6.8.0-rt SMP preempt mod_unload", "ec_master")},
+                          big_endian, is_64)
+                modinfo = module_inventory.read_modinfo(ko)
+                self.assertEqual(modinfo["vermagic"], ["6.8.0-rt SMP preempt mod_unload"])
+                self.assertEqual(modinfo["depends"], ["ec_master"])
+            # Not an ELF file
+            with open(ko, "wb") as f:
+                f.write(b"not a module")
+            self.assertEqual(module_inventory.read_modinfo(ko), {})
+
+    def test_inventory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_dir = os.path.join(tmp, "build")
+            os.makedirs(os.path.join(build_dir, "master"))
+            os.makedirs(os.path.join(build_dir, "devices", "igb"))
+            write_elf(os.path.join(build_dir, "master", "ec_master.ko"),
+                      {".modinfo": modinfo_section("6.8.0 SMP", "")})
+            write_elf(os.path.join(build_dir, "devices", "igb", "ec_igb.ko"),
+                      {".modinfo": modinfo_section("6.5.0 SMP", "ec_master,ptp")})
+            with open(os.path.join(build_dir, "devices", "igb", "igb.o"), "w") as f:
+                f.write("")
+            # Links to directories are not followed, as with find
+            os.symlink(build_dir, os.path.join(build_dir, "loop"))
+            link = os.path.join(tmp, "current")
+            os.symlink(build_dir, link)
+            inventory = module_inventory.get_module_inventory(link)
+            self.assertEqual(inventory.names(), ["ec_igb", "ec_master"])
+            igb = inventory.get("ec_igb")
+            self.assertEqual(igb.relative_path, os.path.join("devices", "igb", "ec_igb.ko"))
+            self.assertEqual(igb.depends, ["ec_master", "ptp"])
+            self.assertEqual(igb.size, os.path.getsize(igb.path))
+            self.assertEqual([m.name for m in inventory.mismatched_vermagic("6.8.0")],
+                             ["ec_igb"])
+            # Made once, shared by the link and its target
+            write_elf(os.path.join(build_dir, "devices", "ec_generic.ko"), {})
+            self.assertIs(module_inventory.get_module_inventory(build_dir), inventory)
+            inventory = module_inventory.get_module_inventory(build_dir, refresh=True)
+            generic = inventory.get("ec_generic")
+            self.assertIsNone(generic.vermagic)
+            self.assertEqual(generic.depends, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_net_inventory.py
+"""
+import unittest
+import os
+import tempfile
+
+import ethercat_igh_dkms as edkms
+from ethercat_igh_dkms import net_inventory
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content + "\n")
+
+
+def add_link(root, name, mac, ifindex, driver=None):
+    net_dir = os.path.join(root, "devices", "virtual", "net", name)
+    write(os.path.join(net_dir, "address"), mac)
+    write(os.path.join(net_dir, "ifindex"), str(ifindex))
+    write(os.path.join(net_dir, "mtu"), "1500")
+    write(os.path.join(net_dir, "operstate"), "up")
+    write(os.path.join(net_dir, "carrier"), "1")
+    if driver is not None:
+        device_dir = os.path.join(root, "devices", "pci0000:00", name)
+        os.makedirs(os.path.join(root, "bus", "pci", "drivers", driver),
+                    exist_ok=True)
+        os.makedirs(device_dir)
+        os.symlink(os.path.join(root, "bus", "pci", "drivers", driver),
+                   os.path.join(device_dir, "driver"))
+        os.symlink(device_dir, os.path.join(net_dir, "device"))
+    os.makedirs(os.path.join(root, "class", "net"), exist_ok=True)
+    os.symlink(net_dir, os.path.join(root, "class", "net", name))
+
+
+class TestNetInventory(unittest.TestCase):
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as root:
+            add_link(root, "eth0", "00:1b:21:aa:bb:cc", 2, "igb")
+            add_link(root, "tun0", "", 3)
+            inventory = net_inventory.get_net_inventory(root)
+            self.assertEqual(inventory.names(), ["eth0", "tun0"])
+            eth0 = inventory.get("eth0")
+            self.assertEqual(eth0.mac, "00:1b:21:aa:bb:cc")
+            self.assertEqual(eth0.driver, "igb")
+            self.assertEqual(eth0.mtu, 1500)
+            self.assertEqual(eth0.ifindex, 2)
+            self.assertEqual(inventory.mac("tun0"), None)
+            self.assertEqual(inventory.get("missing"), None)
+            with self.assertRaises(TypeError):
+                inventory.links["eth1"] = eth0
+            # The snapshot is reused until it is refreshed
+            add_link(root, "eth1", "00:1b:21:aa:bb:cd", 4)
+            self.assertIs(net_inventory.get_net_inventory(root), inventory)
+            net_inventory.refresh_net_inventory(root)
+            self.assertEqual(net_inventory.get_net_inventory(root).names(),
+                             ["eth0", "eth1", "tun0"])
+
+    def test_probe(self):
+        with tempfile.TemporaryDirectory() as root:
+            add_link(root, "eth0", "00:1b:21:aa:bb:cc", 2, "igb")
+            inventory = net_inventory.get_net_inventory(root)
+            info = inventory.probe("eth0")
+            self.assertEqual(info["driver"], "igb")
+            self.assertEqual(info["mac"], "00:1b:21:aa:bb:cc")
+            self.assertEqual(info["carrier"], 1)
+            self.assertIsNone(inventory.probe("missing"))
+            # A copy: the snapshot is not modified
+            info["driver"] = "e1000e"
+            self.assertEqual(inventory.probe("eth0")["driver"], "igb")
+
+    def test_running_system(self):
+        inventory = net_inventory.get_net_inventory()
+        self.assertIn("lo", inventory.names())
+        mac = inventory.mac("lo")
+        if mac is not None:
+            # The interfaces of the master devices are found from the
+            # inventory
+            self.assertIn("lo", edkms.interfaces_of_master_devices(
+                {"MASTER0_DEVICE": mac.upper()}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_packages.py
+"""
+import unittest
+import os
+import logging
+import tempfile
+
+from ethercat_igh_dkms import packages
+
+logger = logging.getLogger("test_packages")
+
+status_content = """Package: git
+Status: install ok installed
+Priority: optional
+Architecture: amd64
+Description: fast, scalable, distributed revision control system
+ Git is popular version control system designed to handle very large
+ projects with speed and efficiency.
+
+Package: libtool
+Status: deinstall ok config-files
+Architecture: all
+
+Package: make
+Status: install ok installed
+Architecture: amd64
+"""
+
+
+class TestPackages(unittest.TestCase):
+    def test_installed_packages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            status_file = os.path.join(tmp, "status")
+            with open(status_file, "w") as f:
+                f.write(status_content)
+            installed = packages.get_installed_packages(logger, status_file)
+        self.assertIn("git", installed)
+        self.assertIn("git:amd64", installed)
+        self.assertIn("make", installed)
+        self.assertNotIn("libtool", installed)
+
+    def test_apt_index_age(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(packages.apt_index_age(logger, tmp))
+            index = os.path.join(tmp, "deb.debian.org_debian_dists_stable_InRelease")
+            with open(index, "w") as f:
+                f.write("")
+            os.utime(index, (0, 0))
+            self.assertGreater(packages.apt_index_age(logger, tmp), 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
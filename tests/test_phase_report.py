@@ -0,0 +1,89 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_phase_report.py
+"""
+import unittest
+import os
+import json
+import time
+import subprocess
+import sys
+import tempfile
+
+from ethercat_igh_dkms import phase_report
+from ethercat_igh_dkms.phase_report import PhaseRecorder
+
+
+class TestPhaseReport(unittest.TestCase):
+    def test_nested_phases(self):
+        recorder = PhaseRecorder()
+        with recorder.phase("build"):
+            with recorder.phase("make"):
+                time.sleep(0.05)
+        with self.assertRaises(ValueError):
+            with recorder.phase("install"):
+                raise ValueError("failed")
+        phases = {p["path"]: p for p in recorder.report()["phases"]}
+        self.assertEqual(sorted(phases.keys()),
+                         ["build", "build/make", "install"])
+        self.assertEqual(phases["build/make"]["parent"], "build")
+        self.assertIsNone(phases["build"]["parent"])
+        self.assertEqual(phases["build"]["status"], "ok")
+        self.assertEqual(phases["install"]["status"], "error")
+        self.assertGreaterEqual(phases["build/make"]["wall_time"], 0.05)
+        self.assertGreaterEqual(phases["build"]["wall_time"],
+                                phases["build/make"]["wall_time"])
+
+    def test_resource_usage(self):
+        recorder = PhaseRecorder()
+        with recorder.phase("children"):
+            subprocess.run([sys.executable, "-c", "sum(range(3000000))"],
+                           check=True)
+        with recorder.phase("memory"):
+            # Raises the high-water mark of the process, every page is
+            # written to be resident
+            size = 256 * 1024 * 1024
+            buffer = bytearray(size)
+            buffer[::4096] = b"x" * (size // 4096)
+            del buffer
+        with recorder.phase("idle"):
+            pass
+        with tempfile.TemporaryFile() as f:
+            with recorder.phase("write"):
+                f.write(b"x" * (1 << 20))
+                f.flush()
+        phases = {p["path"]: p for p in recorder.report()["phases"]}
+        self.assertGreater(phases["children"]["children_cpu_time"], 0)
+        self.assertGreater(phases["memory"]["peak_rss_growth_kb"], 0)
+        # The peak is process-wide, it does not fall in a later phase
+        self.assertEqual(phases["idle"]["peak_rss_growth_kb"], 0)
+        self.assertGreaterEqual(phases["idle"]["process_peak_rss_kb"],
+                                phases["memory"]["process_peak_rss_kb"])
+        if 0 < len(phase_report.read_proc_io()):
+            self.assertGreaterEqual(phases["write"]["wchar"], 1 << 20)
+
+    def test_recorded_phase(self):
+        saved = phase_report.phase_recorder
+        phase_report.phase_recorder = PhaseRecorder()
+        try:
+            @phase_report.recorded_phase("decorated")
+            def decorated():
+                return phase_report.current_phase_name()
+
+            self.assertEqual(decorated(), "decorated")
+            self.assertIsNone(phase_report.current_phase_name())
+            with tempfile.TemporaryDirectory() as tmp:
+                report_file = os.path.join(tmp, "phases.json")
+                phase_report.phase_recorder.save(report_file)
+                with open(report_file, "r") as f:
+                    report = json.load(f)
+            self.assertEqual([p["name"] for p in report["phases"]],
+                             ["decorated"])
+        finally:
+            phase_report.phase_recorder = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
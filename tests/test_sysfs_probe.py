@@ -0,0 +1,133 @@
+#! /usr/bin/python3
+"""
+To run that test:
+poetry install --with test
+poetry run pytest -s tests/test_sysfs_probe.py
+"""
+import unittest
+import os
+import logging
+import tempfile
+
+from ethercat_igh_dkms import sysfs_probe
+from ethercat_igh_dkms.get_hw_info import get_hw_info, get_hw_type, get_more_hw_info
+
+logger = logging.getLogger("test_sysfs_probe")
+
+pci_ids_content = """#
+#	List of PCI ID's
+#
+0010  Allied Telesis, Inc (Wrong ID)
+8086  Intel Corporation
+	0007  82379AB
+	1533  I210 Gigabit Network Connection
+		8086 0001  Ethernet Server Adapter I210-T1
+		8086 0002  Ethernet Server Adapter I210-T1
+	1539  I211 Gigabit Network Connection
+10ec  Realtek Semiconductor Co., Ltd.
+	8168  RTL8111/8168/8411 PCI Express Gigabit Ethernet Controller
+
+# List of known device classes, subclasses and programming interfaces
+C 00  Unclassified device
+	00  Non-VGA unclassified device
+"""
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content + "\n")
+
+
+def make_sysfs(root):
+    # One PCI Ethernet board driven by igb and one virtual interface
+    address = "0000:03:00.0"
+    device_dir = os.path.join(root, "devices", "pci0000:00",
+                              "0000:00:1c.0", address)
+    write(os.path.join(device_dir, "vendor"), "0x8086")
+    write(os.path.join(device_dir, "device"), "0x1533")
+    write(os.path.join(device_dir, "subsystem_vendor"), "0x8086")
+    write(os.path.join(device_dir, "subsystem_device"), "0x0001")
+    write(os.path.join(device_dir, "class"), "0x020000")
+    write(os.path.join(device_dir, "numa_node"), "1")
+    os.makedirs(os.path.join(root, "bus", "pci", "drivers", "igb"))
+    os.makedirs(os.path.join(root, "bus", "pci", "devices"))
+    os.symlink(os.path.join(root, "bus", "pci", "drivers", "igb"),
+               os.path.join(device_dir, "driver"))
+    os.symlink(os.path.join(root, "bus", "pci"),
+               os.path.join(device_dir, "subsystem"))
+    os.symlink(device_dir, os.path.join(
+        root, "bus", "pci", "devices", address))
+    net_dir = os.path.join(device_dir, "net", "enp3s0")
+    write(os.path.join(net_dir, "address"), "00:1b:21:aa:bb:cc")
+    write(os.path.join(net_dir, "speed"), "1000")
+    write(os.path.join(net_dir, "carrier"), "1")
+    write(os.path.join(net_dir, "operstate"), "up")
+    os.symlink(device_dir, os.path.join(net_dir, "device"))
+    virtual_dir = os.path.join(root, "devices", "virtual", "net", "lo")
+    write(os.path.join(virtual_dir, "address"), "00:00:00:00:00:00")
+    os.makedirs(os.path.join(root, "class", "net"))
+    os.symlink(net_dir, os.path.join(root, "class", "net", "enp3s0"))
+    os.symlink(virtual_dir, os.path.join(root, "class", "net", "lo"))
+
+
+class TestSysfsProbe(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_sysfs(self.root)
+        pci_ids_file = os.path.join(self.root, "pci.ids")
+        with open(pci_ids_file, "w") as f:
+            f.write(pci_ids_content)
+        self.saved_pci_ids = sysfs_probe.pci_ids
+        sysfs_probe.pci_ids = sysfs_probe.PciIds([pci_ids_file])
+
+    def tearDown(self):
+        sysfs_probe.pci_ids = self.saved_pci_ids
+        self.tmp.cleanup()
+
+    def test_probe_net_interface(self):
+        self.assertEqual(sysfs_probe.list_net_interfaces(self.root),
+                         ["enp3s0", "lo"])
+        info = sysfs_probe.probe_net_interface("enp3s0", self.root)
+        self.assertEqual(info["bus"], "pci")
+        self.assertEqual(info["address"], "0000:03:00.0")
+        self.assertEqual(info["driver"], "igb")
+        self.assertEqual(info["vendor_id"], "8086")
+        self.assertEqual(info["device_id"], "1533")
+        self.assertEqual(info["numa_node"], 1)
+        self.assertEqual(info["speed"], 1000)
+        self.assertEqual(info["carrier"], 1)
+        self.assertEqual(info["mac"], "00:1b:21:aa:bb:cc")
+        info = sysfs_probe.probe_net_interface("lo", self.root)
+        self.assertEqual(info["bus"], None)
+        self.assertEqual(info["driver"], None)
+
+    def test_pci_ids(self):
+        pci_ids = sysfs_probe.pci_ids
+        self.assertEqual(pci_ids.vendor_name("8086"), "Intel Corporation")
+        self.assertEqual(pci_ids.device_name("8086", "1533"),
+                         "I210 Gigabit Network Connection")
+        self.assertEqual(pci_ids.device_name("8086", "1533", "8086", "0002"),
+                         "Ethernet Server Adapter I210-T1")
+        self.assertEqual(pci_ids.device_name("10EC", "8168"),
+                         "RTL8111/8168/8411 PCI Express Gigabit Ethernet Controller")
+        self.assertEqual(pci_ids.device_name("8086", "ffff"), None)
+        self.assertEqual(pci_ids.vendor_name("c 00"), None)
+        # Without pci.ids the ids are displayed
+        self.assertEqual(sysfs_probe.PciIds([]).vendor_name("8086"), None)
+
+    def test_get_more_hw_info(self):
+        hw_addr = get_hw_info("enp3s0", logger, self.root)
+        hw_type = get_hw_type("enp3s0", logger)
+        info = get_more_hw_info(
+            hw_addr, hw_type, logger, "enp3s0", self.root)
+        self.assertIn("03:00.0 Ethernet controller: Intel Corporation I210 Gigabit Network Connection [8086:1533]", info)
+        self.assertIn("Subsystem: Intel Corporation Ethernet Server Adapter I210-T1", info)
+        self.assertIn("Kernel driver in use: igb", info)
+        self.assertIn("Link: up, 1000 Mb/s", info)
+        self.assertEqual(get_hw_info("lo", logger, self.root), None)
+
+
+if __name__ == "__main__":
+    unittest.main()